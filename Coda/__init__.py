@@ -1,7 +1,123 @@
-from Coda._core.ws import Client
-from Coda.sharding import ShardedClient
-from Coda._core.entities import Guild, Channel, Author, Message, Poll
-from Coda._core.interactions import Interaction, Option
-from Coda._core.components import *
-from Coda._core.models import Embed, PollObject, Poll
-from Coda._core.constants import *
+"""
+Coda's public names are imported on first access, so `from Coda import Intents`
+does not pull in aiohttp and the networking stack.
+"""
+
+from importlib import import_module
+
+# typing.TYPE_CHECKING without importing typing.
+TYPE_CHECKING = False
+
+_EXPORTS = {
+    "Coda._core.ws": ("Client", "Webhook", "WebhookPool"),
+    "Coda._core.entities": (
+        "Guild",
+        "Role",
+        "Member",
+        "Channel",
+        "Author",
+        "Message",
+    ),
+    "Coda._core.interactions": ("Interaction", "Option", "SlashGroup"),
+    "Coda._core.http_interactions": ("InteractionServer",),
+    "Coda._core.autocomplete": ("PrefixIndex",),
+    "Coda._core.commands": ("Command", "CommandRouter"),
+    "Coda._core.routing": ("CustomIdRouter",),
+    "Coda._core.views": ("View", "persistent_view"),
+    "Coda._core.batching": ("MessageBatcher",),
+    "Coda._core.files": ("File",),
+    "Coda._core.log": ("setup_logging", "ColorFormatter", "JSONFormatter"),
+    "Coda._core.metrics": ("REGISTRY", "MetricsRegistry", "MetricsServer"),
+    "Coda._core.profiling": ("HandlerProfiler",),
+    "Coda._core.health": ("LoopLagMonitor", "lag_monitor"),
+    "Coda._core.snowflake": (
+        "snowflake",
+        "snowflake_time",
+        "time_snowflake",
+        "shard_for",
+    ),
+    "Coda._core.components": (
+        "Button",
+        "SelectOption",
+        "BaseSelect",
+        "StringSelect",
+        "UserSelect",
+        "RoleSelect",
+        "MentionableSelect",
+        "ChannelSelect",
+        "TextInput",
+        "ActionRow",
+    ),
+    "Coda._core.models": ("Embed", "PollObject", "Poll"),
+    "Coda._core.constants": (
+        "Intents",
+        "Permissions",
+        "OverwriteType",
+        "Colors",
+        "PresenceType",
+        "PresenceStatus",
+        "Event",
+        "AllowedMentions",
+        "PollLayoutStyle",
+        "InteractionType",
+        "InteractionResponseType",
+        "ApplicationCommandOptionType",
+        "ComponentType",
+        "ButtonStyle",
+        "TextInputStyle",
+        "ShardHealth",
+    ),
+}
+
+_LOCATIONS = {name: module for module, names in _EXPORTS.items() for name in names}
+
+__all__ = ["ShardedClient", *_LOCATIONS]
+
+
+def _sharded_client():
+    try:
+        return import_module("Coda.sharding").ShardedClient
+    except ImportError:
+        # The Cython extension is not built, use the pure Python implementation.
+        return import_module("Coda._core.ws").ShardedClient
+
+
+def __getattr__(name: str):
+    if name == "ShardedClient":
+        value = _sharded_client()
+    elif name in _LOCATIONS:
+        value = getattr(import_module(_LOCATIONS[name]), name)
+    else:
+        raise AttributeError(f"module 'Coda' has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+if TYPE_CHECKING:
+    from Coda._core.ws import Client, Webhook, WebhookPool, ShardedClient
+    from Coda._core.entities import Guild, Role, Member, Channel, Author, Message
+    from Coda._core.interactions import Interaction, Option, SlashGroup
+    from Coda._core.http_interactions import InteractionServer
+    from Coda._core.autocomplete import PrefixIndex
+    from Coda._core.commands import Command, CommandRouter
+    from Coda._core.routing import CustomIdRouter
+    from Coda._core.views import View, persistent_view
+    from Coda._core.batching import MessageBatcher
+    from Coda._core.files import File
+    from Coda._core.log import setup_logging, ColorFormatter, JSONFormatter
+    from Coda._core.metrics import REGISTRY, MetricsRegistry, MetricsServer
+    from Coda._core.profiling import HandlerProfiler
+    from Coda._core.health import LoopLagMonitor, lag_monitor
+    from Coda._core.snowflake import (
+        snowflake,
+        snowflake_time,
+        time_snowflake,
+        shard_for,
+    )
+    from Coda._core.components import *
+    from Coda._core.models import Embed, PollObject, Poll
+    from Coda._core.constants import *
@@ -0,0 +1,253 @@
+"""
+Command line entry point: `python -m Coda <command>`.
+
+    run MODULE[:ATTR]       run the client a bot module defines
+    profile MODULE[:ATTR]   run it with the handler profiler and print a report
+    bench                   gateway, REST and import benchmarks on a local fake
+    gateway-info            recommended shard count and session start limits
+
+A bot module defines its client (found as `client` or `bot` unless ATTR is
+given) without running it, and optionally `async def setup(client)` to register
+handlers, which is awaited after `register()`.
+"""
+
+import argparse
+import asyncio
+import importlib
+import importlib.util
+import logging
+import os
+import sys
+from typing import List, Tuple
+
+_log = logging.getLogger("coda.cli")
+
+
+def _load_client(target: str) -> Tuple[object, object]:
+    path, _, attr = target.partition(":")
+    if path.endswith(".py") or os.sep in path:
+        name = os.path.splitext(os.path.basename(path))[0]
+        spec = importlib.util.spec_from_file_location(name, path)
+        if spec is None:
+            raise SystemExit(f"Coda: Cannot load {path}")
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        sys.path.insert(0, os.path.dirname(os.path.abspath(path)))
+        spec.loader.exec_module(module)
+    else:
+        sys.path.insert(0, os.getcwd())
+        module = importlib.import_module(path)
+    for name in (attr,) if attr else ("client", "bot"):
+        client = getattr(module, name, None)
+        if client is not None:
+            return client, getattr(module, "setup", None)
+    raise SystemExit(
+        f"Coda: {path} defines no {attr or 'client or bot'}, pass MODULE:ATTR"
+    )
+
+
+def _shard_ids(value: str) -> List[int]:
+    shard_ids = []
+    for part in value.split(","):
+        first, _, last = part.partition("-")
+        shard_ids.extend(range(int(first), int(last or first) + 1))
+    return shard_ids
+
+
+def _cluster(value: str) -> Tuple[int, int]:
+    index, _, count = value.partition("/")
+    index, count = int(index), int(count)
+    if not 0 <= index < count:
+        raise argparse.ArgumentTypeError("expected INDEX/COUNT with INDEX < COUNT")
+    return index, count
+
+
+async def _gateway_bot(token: str) -> dict:
+    from aiohttp import ClientSession
+    from ._core.ws import FetchGatewayBot
+
+    async with ClientSession() as session:
+        return await FetchGatewayBot(session, f"Bot {token}")
+
+
+def _configure_shards(client, args) -> None:
+    wants_shards = args.shards is not None or args.shard_ids or args.cluster
+    if not hasattr(client, "shard_ids"):
+        if wants_shards:
+            raise SystemExit("Coda: Shard options need a ShardedClient")
+        return
+    if args.shards is not None:
+        client.shard_count = 0 if args.shards == "auto" else int(args.shards)
+    if args.shard_ids:
+        client.shard_ids = args.shard_ids
+    elif args.cluster:
+        if not client.shard_count:
+            client.shard_count = asyncio.run(
+                _gateway_bot(client._auth.partition(" ")[2])
+            )["shards"]
+        # Contiguous blocks, so each cluster owns whole identify buckets.
+        index, count = args.cluster
+        per_cluster, extra = divmod(client.shard_count, count)
+        first = index * per_cluster + min(index, extra)
+        client.shard_ids = list(range(first, first + per_cluster + (index < extra)))
+    _log.info(
+        "Running shards %s of %s",
+        client.shard_ids if client.shard_ids is not None else "all",
+        client.shard_count or "the recommended count",
+    )
+
+
+def _serve(args, profile: bool = False) -> None:
+    from ._core.log import setup_logging
+
+    setup_logging(logging.DEBUG if args.debug else logging.INFO, json=args.json_logs)
+    client, module_setup = _load_client(args.target)
+    _configure_shards(client, args)
+    profiler = None
+
+    async def setup(client):
+        nonlocal profiler
+        if module_setup is not None:
+            await module_setup(client)
+        if args.metrics_port:
+            from ._core.metrics import MetricsServer
+
+            await MetricsServer(host=args.metrics_host, port=args.metrics_port).start()
+        if profile:
+            profiler = client.profile_handlers(
+                args.slow_threshold, args.blocking_threshold
+            )
+
+    client.run(
+        setup,
+        use_uvloop=not args.no_uvloop,
+        executor_workers=args.executor_workers,
+    )
+    if profiler is not None:
+        print("\n".join(profiler.report(args.top, args.sort)) or "No handler ran.")
+
+
+def _bench(args) -> None:
+    import tempfile
+    from .bench import measure_rest, replay, write_synthetic_recording
+    from .bench.imports import measure_imports
+
+    logging.basicConfig(level=logging.ERROR)
+    results = {}
+    if args.suite in ("all", "gateway"):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "synthetic.bin")
+            write_synthetic_recording(path, args.guilds, args.messages, args.messages)
+            results["gateway"] = asyncio.run(replay(path))
+    if args.suite in ("all", "rest"):
+        results["rest"] = asyncio.run(
+            measure_rest(args.requests, args.concurrency, inject_429=args.inject_429)
+        )
+    if args.suite in ("all", "imports"):
+        results["imports"] = measure_imports(runs=args.import_runs)
+    if args.json:
+        import orjson
+
+        print(
+            orjson.dumps(
+                {name: report.to_dict() for name, report in results.items()},
+                option=orjson.OPT_INDENT_2,
+            ).decode()
+        )
+        return
+    for name, report in results.items():
+        print(f"[{name}]\n{report}\n")
+
+
+def _gateway_info(args) -> None:
+    token = (
+        args.token or os.environ.get("CODA_TOKEN") or os.environ.get("DISCORD_TOKEN")
+    )
+    if not token:
+        raise SystemExit("Coda: Pass --token or set CODA_TOKEN")
+    if args.base_url:
+        from ._core.http import set_base_url
+
+        set_base_url(args.base_url)
+    data = asyncio.run(_gateway_bot(token))
+    if args.json:
+        import orjson
+
+        print(orjson.dumps(data, option=orjson.OPT_INDENT_2).decode())
+        return
+    limit = data["session_start_limit"]
+    print(f"url:                 {data['url']}")
+    print(f"recommended shards:  {data['shards']}")
+    print(f"sessions remaining:  {limit['remaining']}/{limit['total']}")
+    print(f"limit resets in:     {limit['reset_after'] / 1000:.0f}s")
+    print(f"max concurrency:     {limit['max_concurrency']}")
+
+
+def _add_run_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("target", metavar="MODULE[:ATTR]", help="module or .py file")
+    shards = parser.add_argument_group("sharding (ShardedClient only)")
+    shards.add_argument("--shards", metavar="N|auto", help="total shard count")
+    shards.add_argument(
+        "--shard-ids", type=_shard_ids, metavar="IDS", help="e.g. 0-3,8"
+    )
+    shards.add_argument(
+        "--cluster",
+        type=_cluster,
+        metavar="INDEX/COUNT",
+        help="run this cluster's contiguous block of the shards",
+    )
+    parser.add_argument("--no-uvloop", action="store_true")
+    parser.add_argument("--executor-workers", type=int)
+    parser.add_argument("--metrics-port", type=int, help="serve Prometheus metrics")
+    parser.add_argument("--metrics-host", default="127.0.0.1")
+    parser.add_argument("--debug", action="store_true")
+    parser.add_argument("--json-logs", action="store_true")
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m Coda")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="run a bot module")
+    _add_run_arguments(run)
+    run.set_defaults(func=_serve)
+
+    profile = commands.add_parser(
+        "profile", help="run a bot module with the handler profiler"
+    )
+    _add_run_arguments(profile)
+    profile.add_argument("--slow-threshold", type=float, default=1.0)
+    profile.add_argument("--blocking-threshold", type=float, default=0.05)
+    profile.add_argument("--top", type=int, default=20)
+    profile.add_argument(
+        "--sort", choices=("cpu", "wall", "calls", "max_wall", "errors"), default="cpu"
+    )
+    profile.set_defaults(func=lambda args: _serve(args, profile=True))
+
+    bench = commands.add_parser("bench", help="benchmarks against a local fake")
+    bench.add_argument(
+        "suite", nargs="?", choices=("all", "gateway", "rest", "imports"), default="all"
+    )
+    bench.add_argument("--guilds", type=int, default=100)
+    bench.add_argument("--messages", type=int, default=10000)
+    bench.add_argument("--requests", type=int, default=2000)
+    bench.add_argument("--concurrency", type=int, default=50)
+    bench.add_argument("--inject-429", type=float, default=0.0)
+    bench.add_argument("--import-runs", type=int, default=5)
+    bench.add_argument("--json", action="store_true")
+    bench.set_defaults(func=_bench)
+
+    info = commands.add_parser(
+        "gateway-info", help="recommended shards and session start limits"
+    )
+    info.add_argument("--token", help="bot token, defaults to $CODA_TOKEN")
+    info.add_argument("--base-url", help=argparse.SUPPRESS)
+    info.add_argument("--json", action="store_true")
+    info.set_defaults(func=_gateway_info)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Tuple, Union
+
+
+class PrefixIndex:
+    """
+    Case-insensitive prefix index over a (large) set of autocomplete choices.
+
+    Entries are kept sorted by their folded name, so a lookup is a binary search
+    followed by a scan of at most `limit` matches, independent of the set size.
+    """
+
+    def __init__(self, choices: Iterable[Union[str, Tuple[str, Any]]] = ()):
+        entries = []
+        for choice in choices:
+            name, value = choice if isinstance(choice, tuple) else (choice, choice)
+            entries.append((name.casefold(), name, value))
+        entries.sort(key=lambda entry: entry[0])
+        self._keys = [entry[0] for entry in entries]
+        self._choices = [{"name": entry[1], "value": entry[2]} for entry in entries]
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def search(self, prefix: str, limit: int = 25) -> List[Dict[str, Any]]:
+        """
+        Return up to `limit` choices whose name starts with `prefix`.
+        """
+        key = prefix.casefold()
+        keys = self._keys
+        index = bisect_left(keys, key)
+        end = min(index + limit, len(keys))
+        matches = []
+        while index < end and keys[index].startswith(key):
+            matches.append(self._choices[index])
+            index += 1
+        return matches
@@ -0,0 +1,180 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Tuple
+from .models import Embed
+
+_log = logging.getLogger("coda.batching")
+
+# Discord's per-message limits
+MAX_CONTENT = 2000
+MAX_EMBEDS = 10
+MAX_EMBED_TOTAL = 6000
+
+# One batcher per channel ID, however many `Channel` objects point at it, for
+# as long as it has messages queued: a flush that empties it drops it.
+_batchers: Dict[str, "MessageBatcher"] = {}
+
+
+def _split_content(content: str, limit: int = MAX_CONTENT) -> List[str]:
+    """
+    Split text into chunks of at most `limit` characters, on line breaks where
+    possible.
+    """
+    if len(content) <= limit:
+        return [content]
+    chunks = []
+    current = ""
+    for line in content.split("\n"):
+        while len(line) > limit:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(line[:limit])
+            line = line[limit:]
+        if current and len(current) + 1 + len(line) > limit:
+            chunks.append(current)
+            current = line
+        else:
+            current = f"{current}\n{line}" if current else line
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _embed_size(embed: Any) -> int:
+    """
+    Characters of an embed (an `Embed` or its dict) that count towards the
+    total of all embeds of a message.
+    """
+    tree = embed._tree if isinstance(embed, Embed) else embed
+    size = len(tree.get("title") or "") + len(tree.get("description") or "")
+    for field in tree.get("fields") or ():
+        size += len(field.get("name") or "") + len(field.get("value") or "")
+    size += len((tree.get("footer") or {}).get("text") or "")
+    size += len((tree.get("author") or {}).get("name") or "")
+    return size
+
+
+class MessageBatcher:
+    """
+    Coalesces the messages sent to one channel within `window` seconds into as
+    few messages as the limits allow (2000 characters of content, joined with
+    line breaks, and 10 embeds of at most 6000 characters in total per
+    message), sent in order.
+
+    Obtained through `Channel.batched()`. `send()` returns a future resolving
+    to the `Message` its content ended up in; it does not have to be awaited
+    (failures nobody awaits are logged). Flushes of one channel run one at a
+    time; batches of different channels are flushed concurrently, each one
+    through the shared rate limiter.
+    """
+
+    def __init__(self, channel, window: float = 0.5):
+        self.channel = channel
+        self.window = window
+        self._pending: List[Tuple[str, List[Any], asyncio.Future]] = []
+        self._timer = None
+        self._flushing = None
+        self._lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def send(self, content: str = None, embeds: List[Any] = None) -> asyncio.Future:
+        if not content and not embeds:
+            raise ValueError("No arguments provided")
+        # Evicted after its last flush but still held by the caller: register
+        # again, or hand over to the batcher that replaced it, so one channel
+        # never has two batchers sending concurrently.
+        batcher = _batchers.setdefault(self.channel.id, self)
+        if batcher is not self:
+            return batcher.send(content, embeds)
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((content or "", list(embeds or ()), future))
+        if self._timer is None:
+            self._timer = loop.call_later(self.window, self._on_window)
+        return future
+
+    def _on_window(self) -> None:
+        self._timer = None
+        self._start_flush()
+
+    def _start_flush(self) -> None:
+        # Waits for a flush still sending, then picks up what arrived meanwhile.
+        self._flushing = asyncio.get_running_loop().create_task(self.flush())
+
+    @staticmethod
+    def _pack(
+        pending: List[Tuple[str, List[Any], asyncio.Future]],
+    ) -> List[Tuple[List[str], List[Any], List[asyncio.Future]]]:
+        messages = []
+        parts, length, embeds, embed_size, futures = [], 0, [], 0, []
+        for content, item_embeds, future in pending:
+            for chunk in _split_content(content) if content else ():
+                if parts and length + 1 + len(chunk) > MAX_CONTENT:
+                    messages.append((parts, embeds, futures))
+                    parts, length, embeds, embed_size, futures = [], 0, [], 0, []
+                length += len(chunk) + (1 if parts else 0)
+                parts.append(chunk)
+            for embed in item_embeds:
+                size = _embed_size(embed)
+                if embeds and (
+                    len(embeds) == MAX_EMBEDS or embed_size + size > MAX_EMBED_TOTAL
+                ):
+                    messages.append((parts, embeds, futures))
+                    parts, length, embeds, embed_size, futures = [], 0, [], 0, []
+                embeds.append(embed)
+                embed_size += size
+            futures.append(future)
+        if parts or embeds:
+            messages.append((parts, embeds, futures))
+        return messages
+
+    async def flush(self) -> None:
+        """
+        Send everything queued so far now, after any flush still sending.
+        """
+        async with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            pending, self._pending = self._pending, []
+            for parts, embeds, futures in self._pack(pending):
+                try:
+                    message = await self.channel.send(
+                        content="\n".join(parts) or None, embeds=embeds or None
+                    )
+                except Exception as error:
+                    _log.error(
+                        "Batched send to channel %s failed: %s", self.channel.id, error
+                    )
+                    for future in futures:
+                        if not future.done():
+                            future.set_exception(error)
+                            # Logged above, so an unawaited future stays quiet.
+                            future.exception()
+                    continue
+                for future in futures:
+                    if not future.done():
+                        future.set_result(message)
+            if (
+                not self._pending
+                and self._timer is None
+                and _batchers.get(self.channel.id) is self
+            ):
+                del _batchers[self.channel.id]
+
+    @staticmethod
+    async def flush_all() -> None:
+        """
+        Flush the batches of every channel concurrently, e.g. before shutting down.
+        """
+        await asyncio.gather(*(batcher.flush() for batcher in list(_batchers.values())))
+
+
+def batcher_for(channel, window: float) -> MessageBatcher:
+    batcher = _batchers.get(channel.id)
+    if batcher is None:
+        batcher = _batchers[channel.id] = MessageBatcher(channel, window)
+    return batcher
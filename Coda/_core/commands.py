@@ -0,0 +1,425 @@
+import asyncio
+import inspect
+import re
+import types
+import typing
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+from .trie import PrefixTrie, _END
+from .entities import Author, Channel
+from .exceptions import BadArgument, UnSufficientArguments
+from .snowflake import SnowflakeLike, snowflake
+
+_USER_MENTION = re.compile(r"<@!?(\d+)>")
+_CHANNEL_MENTION = re.compile(r"<#(\d+)>")
+_TRUE = frozenset({"true", "t", "yes", "y", "on", "1", "enable", "enabled"})
+_FALSE = frozenset({"false", "f", "no", "n", "off", "0", "disable", "disabled"})
+
+
+def _to_int(raw: str, message, client) -> int:
+    try:
+        return int(raw)
+    except ValueError:
+        raise BadArgument(f"Coda: {raw!r} is not an integer") from None
+
+
+def _to_float(raw: str, message, client) -> float:
+    try:
+        return float(raw)
+    except ValueError:
+        raise BadArgument(f"Coda: {raw!r} is not a number") from None
+
+
+def _to_bool(raw: str, message, client) -> bool:
+    lowered = raw.lower()
+    if lowered in _TRUE:
+        return True
+    if lowered in _FALSE:
+        return False
+    raise BadArgument(f"Coda: {raw!r} is not a boolean")
+
+
+def _to_str(raw: str, message, client) -> str:
+    return raw
+
+
+def _to_author(raw: str, message, client) -> Author:
+    match = _USER_MENTION.fullmatch(raw)
+    user_id = match.group(1) if match else raw
+    if not user_id.isdigit():
+        raise BadArgument(f"Coda: {raw!r} is not a user mention or ID")
+    for user in getattr(message, "mentions", None) or ():
+        if user["id"] == user_id:
+            return Author(user)
+    return Author({"id": user_id})
+
+
+async def _to_channel(raw: str, message, client) -> Channel:
+    match = _CHANNEL_MENTION.fullmatch(raw)
+    channel_id = match.group(1) if match else raw
+    if not channel_id.isdigit():
+        raise BadArgument(f"Coda: {raw!r} is not a channel mention or ID")
+    return await client.get_channel(channel_id)
+
+
+_CONVERTERS: Dict[Any, Callable] = {
+    int: _to_int,
+    float: _to_float,
+    bool: _to_bool,
+    str: _to_str,
+    Author: _to_author,
+    Channel: _to_channel,
+}
+
+
+def _call_converter(annotation: Callable) -> Callable:
+    """
+    Use a callable annotation as a converter of the raw string. Whatever it raises
+    (e.g. a TypeError from a class that does not take a string) surfaces as
+    `BadArgument`, like the failures of the built-in converters.
+    """
+    name = getattr(annotation, "__name__", repr(annotation))
+
+    def convert(raw: str, message, client) -> Any:
+        try:
+            return annotation(raw)
+        except BadArgument:
+            raise
+        except Exception as error:
+            raise BadArgument(
+                f"Coda: {raw!r} is not a valid {name} ({error})"
+            ) from error
+
+    return convert
+
+
+def _converter_for(annotation) -> Callable:
+    if annotation is inspect.Parameter.empty or annotation is Any:
+        return _to_str
+    if typing.get_origin(annotation) in (Union, types.UnionType):
+        # Optional[X] converts as X, the default covers the missing case
+        members = [a for a in typing.get_args(annotation) if a is not type(None)]
+        if len(members) == 1:
+            return _converter_for(members[0])
+    if annotation in _CONVERTERS:
+        return _CONVERTERS[annotation]
+    if callable(annotation):
+        # Any other callable taking the raw string works as a converter
+        return _call_converter(annotation)
+    return _to_str
+
+
+class _Parameter:
+    def __init__(self, name: str, kind, converter: Callable, default: Any):
+        self.name = name
+        self.kind = kind
+        self.converter = converter
+        self.default = default
+        self.required = default is inspect.Parameter.empty
+        self.is_async = inspect.iscoroutinefunction(converter)
+
+
+def _next_token(text: str, index: int) -> Tuple[Optional[str], int]:
+    """
+    Read one whitespace-separated token starting at `index`, honouring double
+    quotes. Returns `(None, len(text))` once the text is exhausted.
+    """
+    length = len(text)
+    while index < length and text[index].isspace():
+        index += 1
+    if index >= length:
+        return None, length
+    if text[index] == '"':
+        end = text.find('"', index + 1)
+        if end == -1:
+            raise BadArgument("Coda: Unclosed quote in arguments")
+        return text[index + 1 : end], end + 1
+    end = index
+    while end < length and not text[end].isspace():
+        end += 1
+    return text[index:end], end
+
+
+def compile_signature(coro: Callable) -> List[_Parameter]:
+    """
+    Build the converter pipeline of a command from its signature, once, at
+    registration. The first parameter receives the `Message` and is skipped.
+
+    Positional parameters consume one (optionally quoted) token each, `*args`
+    consumes every remaining token and a keyword-only parameter receives the rest
+    of the message verbatim (greedy). Annotations pick the converter: int, float,
+    bool, str, Author (user mention or ID), Channel (channel mention or ID) or any
+    callable accepting the raw string.
+    """
+    try:
+        hints = typing.get_type_hints(coro)
+    except Exception:
+        hints = {}
+    parameters = list(inspect.signature(coro).parameters.values())[1:]
+    compiled = []
+    for parameter in parameters:
+        if parameter.kind == inspect.Parameter.VAR_KEYWORD:
+            continue
+        annotation = hints.get(parameter.name, parameter.annotation)
+        compiled.append(
+            _Parameter(
+                parameter.name,
+                parameter.kind,
+                _converter_for(annotation),
+                parameter.default,
+            )
+        )
+    return compiled
+
+
+class Command:
+    """
+    Represents a registered prefix command.
+
+    A command becomes a group as soon as subcommands are registered on it through
+    `Command.command()`; the group's own callback runs when no subcommand matches.
+    """
+
+    def __init__(
+        self,
+        coro: Callable,
+        name: str,
+        aliases: Iterable[str] = None,
+        parent: "Command" = None,
+    ):
+        self.coro = coro
+        self.name = name
+        self.aliases = tuple(aliases or ())
+        self.parent = parent
+        self.subcommands: Dict[str, "Command"] = {}
+        self.parameters = compile_signature(coro)
+        self._on_error: Optional[Callable] = None
+
+    @property
+    def qualified_name(self) -> str:
+        if self.parent:
+            return f"{self.parent.qualified_name} {self.name}"
+        return self.name
+
+    @property
+    def error_handler(self) -> Optional[Callable]:
+        command = self
+        while command is not None:
+            if command._on_error is not None:
+                return command._on_error
+            command = command.parent
+        return None
+
+    def command(self, name: str = None, aliases: Iterable[str] = None):
+        """
+        Decorator to register a subcommand of this command.
+        """
+
+        def wrapper(coro: Callable):
+            command = Command(coro, name or coro.__name__, aliases, parent=self)
+            for key in (command.name, *command.aliases):
+                self.subcommands[key] = command
+            return command
+
+        return wrapper
+
+    def error(self, coro: Callable):
+        """
+        Decorator to register the error handler of this command (and of its
+        subcommands that have none). It is called as `handler(message, error)`.
+        """
+        self._on_error = coro
+        return coro
+
+    async def parse(self, message, arguments: str, client) -> Tuple[list, dict]:
+        """
+        Convert the raw argument string into the positional and keyword arguments
+        of the callback.
+        """
+        args = []
+        kwargs = {}
+        index = 0
+        for parameter in self.parameters:
+            if parameter.kind == inspect.Parameter.KEYWORD_ONLY:
+                rest = arguments[index:].strip()
+                index = len(arguments)
+                if not rest:
+                    if parameter.required:
+                        raise UnSufficientArguments(
+                            f"Coda: Missing required argument {parameter.name!r}"
+                        )
+                    continue
+                kwargs[parameter.name] = await self._convert(
+                    parameter, rest, message, client
+                )
+                continue
+            if parameter.kind == inspect.Parameter.VAR_POSITIONAL:
+                while True:
+                    token, index = _next_token(arguments, index)
+                    if token is None:
+                        break
+                    args.append(await self._convert(parameter, token, message, client))
+                continue
+            token, index = _next_token(arguments, index)
+            if token is None:
+                if parameter.required:
+                    raise UnSufficientArguments(
+                        f"Coda: Missing required argument {parameter.name!r}"
+                    )
+                args.append(parameter.default)
+                continue
+            args.append(await self._convert(parameter, token, message, client))
+        if arguments[index:].strip():
+            raise UnSufficientArguments(
+                f"Coda: Arguments limit exceeded for {self.qualified_name!r}"
+            )
+        return args, kwargs
+
+    @staticmethod
+    async def _convert(parameter: _Parameter, raw: str, message, client) -> Any:
+        if parameter.is_async:
+            return await parameter.converter(raw, message, client)
+        return parameter.converter(raw, message, client)
+
+    def __call__(self, *args, **kwargs):
+        return self.coro(*args, **kwargs)
+
+    def __repr__(self):
+        return f"<Command {self.qualified_name!r}>"
+
+
+class CommandRouter:
+    """
+    Matches message content against the registered prefix commands.
+
+    Prefixes live in a `PrefixTrie`; a message whose first character cannot start
+    any prefix is rejected with one set lookup. Per-guild prefixes come from
+    `prefix_resolver(guild_id)` (called with the ID as an int, sync or async,
+    returning a string, an iterable of strings or None for the defaults) and are
+    compiled into a trie once per guild.
+    The first message of a guild waits for the resolver; the client runs that
+    match in its own task (see `needs_resolve`) so the gateway reader does not.
+    An empty prefix matches every message.
+    """
+
+    def __init__(
+        self,
+        prefixes: Union[str, Iterable[str]],
+        prefix_resolver: Callable = None,
+        mention_prefix: bool = False,
+    ):
+        self.prefixes = [prefixes] if isinstance(prefixes, str) else list(prefixes)
+        self.prefix_resolver = prefix_resolver
+        self.mention_prefix = mention_prefix
+        self._mentions: List[str] = []
+        self._commands: Dict[str, Command] = {}
+        self._trie = self._compile(self.prefixes)
+        self._guild_tries: Dict[int, PrefixTrie] = {}
+        self._resolving: Dict[int, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._commands)
+
+    def __bool__(self) -> bool:
+        return bool(self._commands)
+
+    def _compile(self, prefixes: Iterable[str]) -> PrefixTrie:
+        trie = PrefixTrie()
+        for prefix in prefixes:
+            trie.insert(prefix, False)
+        for mention in self._mentions:
+            trie.insert(mention, True)
+        return trie
+
+    def set_user_id(self, user_id: str) -> None:
+        """
+        Enable `<@id>` / `<@!id>` as prefixes once the bot's user ID is known.
+        """
+        if not self.mention_prefix or not user_id:
+            return
+        self._mentions = [f"<@{user_id}>", f"<@!{user_id}>"]
+        self._trie = self._compile(self.prefixes)
+        self._guild_tries.clear()
+
+    def invalidate_prefix(self, guild_id: SnowflakeLike = None) -> None:
+        """
+        Drop the cached prefixes of a guild (or of every guild) so the resolver is
+        called again on the next message.
+        """
+        if guild_id is None:
+            self._guild_tries.clear()
+        else:
+            self._guild_tries.pop(snowflake(guild_id), None)
+
+    def add(self, command: Command) -> None:
+        for key in (command.name, *command.aliases):
+            self._commands[key] = command
+
+    def get(self, name: str) -> Optional[Command]:
+        return self._commands.get(name)
+
+    def needs_resolve(self, guild_id: SnowflakeLike = None) -> bool:
+        """
+        Whether matching a message of this guild calls the prefix resolver.
+        """
+        return (
+            self.prefix_resolver is not None
+            and guild_id is not None
+            and snowflake(guild_id) not in self._guild_tries
+        )
+
+    async def _guild_trie(self, guild_id: int) -> PrefixTrie:
+        # Messages arriving while the resolver runs share its result.
+        pending = self._resolving.get(guild_id)
+        if pending is None:
+            pending = self._resolving[guild_id] = asyncio.ensure_future(
+                self._resolve(guild_id)
+            )
+            pending.add_done_callback(lambda _: self._resolving.pop(guild_id, None))
+        return await pending
+
+    async def _resolve(self, guild_id: int) -> PrefixTrie:
+        prefixes = self.prefix_resolver(guild_id)
+        if inspect.isawaitable(prefixes):
+            prefixes = await prefixes
+        if prefixes is None:
+            trie = self._trie
+        else:
+            trie = self._compile([prefixes] if isinstance(prefixes, str) else prefixes)
+        self._guild_tries[guild_id] = trie
+        return trie
+
+    async def match(
+        self, content: str, guild_id: SnowflakeLike = None
+    ) -> Optional[Tuple[Command, str]]:
+        """
+        Resolve the command invoked by `content`.
+
+        Returns `(command, argument_string)` or None when the message is not a command.
+        """
+        if self.prefix_resolver is not None and guild_id is not None:
+            guild_id = snowflake(guild_id)
+            trie = self._guild_tries.get(guild_id)
+            if trie is None:
+                trie = await self._guild_trie(guild_id)
+        else:
+            trie = self._trie
+        root = trie.root
+        if not content or (content[0] not in root and _END not in root):
+            return None
+        # Longest prefix first, so "!!" wins over "!" when both are registered.
+        for length, is_mention in reversed(list(trie.prefixes(content))):
+            rest = content[length:]
+            if is_mention:
+                rest = rest.lstrip()
+            name, _, arguments = rest.partition(" ")
+            command = self._commands.get(name)
+            if command is None:
+                continue
+            while command.subcommands and arguments:
+                name, _, tail = arguments.partition(" ")
+                subcommand = command.subcommands.get(name)
+                if subcommand is None:
+                    break
+                command, arguments = subcommand, tail
+            return command, arguments
+        return None
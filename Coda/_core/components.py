@@ -1,8 +1,26 @@
+import orjson
 from .constants import ComponentType, ButtonStyle, TextInputStyle
 from typing import Optional, List, Union
 
 
-class Button:
+class _Component:
+    """
+    Base of the components an ActionRow holds. Freezing the row freezes its
+    components, after which setting their attributes raises.
+    """
+
+    _frozen = False
+
+    def __setattr__(self, name: str, value) -> None:
+        if self._frozen:
+            raise ValueError(f"Coda: Cannot modify a frozen {type(self).__name__}")
+        object.__setattr__(self, name, value)
+
+    def _freeze(self) -> None:
+        object.__setattr__(self, "_frozen", True)
+
+
+class Button(_Component):
     """
     Represents a Discord Button component.
     """
@@ -41,7 +59,7 @@ class Button:
         return payload
 
 
-class SelectOption:
+class SelectOption(_Component):
     """
     Represents an option in a Select Menu.
     """
@@ -70,7 +88,7 @@ class SelectOption:
         return payload
 
 
-class BaseSelect:
+class BaseSelect(_Component):
     """
     Base class for all Discord Select Menu types.
     """
@@ -129,6 +147,12 @@ class StringSelect(BaseSelect):
         )
         self.options = options
 
+    def _freeze(self) -> None:
+        for option in self.options:
+            option._freeze()
+        self.options = tuple(self.options)
+        super()._freeze()
+
     @property
     def tree(self) -> dict:
         payload = super().tree
@@ -158,6 +182,11 @@ class ChannelSelect(BaseSelect):
         super().__init__(custom_id, type=ComponentType.CHANNEL_SELECT, **kwargs)
         self.channel_types = channel_types
 
+    def _freeze(self) -> None:
+        if self.channel_types:
+            self.channel_types = tuple(self.channel_types)
+        super()._freeze()
+
     @property
     def tree(self) -> dict:
         payload = super().tree
@@ -166,7 +195,7 @@ class ChannelSelect(BaseSelect):
         return payload
 
 
-class TextInput:
+class TextInput(_Component):
     """
     Represents a Text Input component for use in Modals.
     """
@@ -232,6 +261,7 @@ class ActionRow:
         ] = None,
     ):
         self.components = components or []
+        self._frozen = None
 
     def add_component(
         self,
@@ -245,11 +275,28 @@ class ActionRow:
             TextInput,
         ],
     ):
+        if self._frozen is not None:
+            raise ValueError("Coda: Cannot modify a frozen ActionRow")
         self.components.append(component)
         return self
 
+    def freeze(self) -> "ActionRow":
+        """
+        Serialize the row and its components once and reuse the bytes in every
+        payload it is sent with. Neither the row nor its components can be
+        modified afterwards.
+        """
+        if self._frozen is None:
+            self._frozen = orjson.Fragment(orjson.dumps(self.tree))
+            self.components = tuple(self.components)
+            for component in self.components:
+                component._freeze()
+        return self
+
     @property
     def tree(self) -> dict:
+        if self._frozen is not None:
+            return self._frozen
         return {
             "type": ComponentType.ACTION_ROW.value,
             "components": [c.tree for c in self.components],
@@ -1,21 +1,202 @@
-from typing import Union, List, Dict, Any, Optional
+import asyncio
+import time
+from typing import Union, List, Dict, Any, Optional, AsyncIterator, Callable
 from aiohttp import ClientSession
-from .constants import __base_url__, AllowedMentions
+from .constants import __base_url__, AllowedMentions, Permissions
 from .models import Embed
 from .payloads import MessagePayload, InteractionPayload
 from .components import ActionRow
+from .views import View, attach_view
+from .batching import MessageBatcher, batcher_for
+from .files import File
 from .exceptions import *
 from .http import _request
 from .models import ObjectBuilder, Poll
+from .snowflake import SnowflakeLike, snowflake, snowflake_time
+
+# Bulk delete only accepts messages younger than 14 days; keep a minute of margin.
+_BULK_DELETE_MAX_AGE = 14 * 24 * 3600 - 60
+
+
+class Role(ObjectBuilder):
+    """
+    Represents a Discord Role.
+    """
+
+    id: str
+    name: str
+    color: int
+    hoist: bool
+    position: int
+    permissions: int
+    managed: bool
+    mentionable: bool
+
+    def __init__(self, tree) -> None:
+        super().__init__(tree)
+        # Discord serializes permission bitsets as strings
+        self.permissions = int(tree.get("permissions", 0))
+
+
+class Member(ObjectBuilder):
+    """
+    Represents a cached Discord Guild Member.
+    """
+
+    id: str
+    user: "Author"
+    nick: Optional[str]
+    roles: List[str]
+    joined_at: str
+
+    def __init__(self, tree) -> None:
+        super().__init__(tree)
+        self.id = tree["user"]["id"] if "user" in tree else tree.get("id")
+        self.roles = tree.get("roles", [])
 
 
 class Guild:
     """
-    Represents a shorthand Discord Guild object.
+    Represents a cached Discord Guild.
+
+    Keeps the roles, channels and members received over the gateway so
+    permissions can be resolved from memory through `permissions_for`. They are
+    keyed by int IDs, like the client caches; lookups take an int or a string.
     """
 
-    def __init__(self, **kwargs) -> None:
-        self.id = kwargs["id"]
+    def __init__(self, tree: Dict[str, Any] = None, **kwargs) -> None:
+        tree = tree or {}
+        self.id = kwargs.get("id") or tree["id"]
+        self._id = snowflake(self.id)
+        self.name = tree.get("name")
+        self.owner_id = tree.get("owner_id")
+        self.roles: Dict[int, Role] = {}
+        self.members: Dict[int, Member] = {}
+        self.channels: Dict[int, "Channel"] = {}
+        # role id -> permission bitmask, and role-set -> base permissions
+        self._role_permissions: Dict[int, int] = {}
+        self._base_permissions: Dict[tuple, int] = {}
+        for role in tree.get("roles", ()):
+            self.add_role(role)
+        for member in tree.get("members", ()):
+            self.add_member(member)
+
+    def update(self, data: Dict[str, Any]) -> None:
+        """
+        Apply a GUILD_UPDATE payload.
+        """
+        self.name = data.get("name", self.name)
+        self.owner_id = data.get("owner_id", self.owner_id)
+        if "roles" in data:
+            self.roles.clear()
+            self._role_permissions.clear()
+            for role in data["roles"]:
+                self.add_role(role)
+        self._base_permissions.clear()
+
+    def add_role(self, data: Dict[str, Any]) -> Role:
+        role = Role(data)
+        role_id = snowflake(role.id)
+        self.roles[role_id] = role
+        self._role_permissions[role_id] = role.permissions
+        self._base_permissions.clear()
+        return role
+
+    def remove_role(self, role_id: SnowflakeLike) -> None:
+        role_id = snowflake(role_id)
+        self.roles.pop(role_id, None)
+        self._role_permissions.pop(role_id, None)
+        self._base_permissions.clear()
+
+    def add_member(self, data: Dict[str, Any]) -> Member:
+        member = Member(data)
+        self.members[snowflake(member.id)] = member
+        return member
+
+    def remove_member(self, user_id: SnowflakeLike) -> None:
+        self.members.pop(snowflake(user_id), None)
+
+    def get_member(self, user_id: SnowflakeLike) -> Optional[Member]:
+        return self.members.get(snowflake(user_id))
+
+    def _is_owner(self, user_id: int) -> bool:
+        return self.owner_id is not None and user_id == snowflake(self.owner_id)
+
+    def base_permissions(
+        self, user_id: SnowflakeLike, roles: List[SnowflakeLike] = None
+    ) -> int:
+        """
+        Compute the guild-wide permissions of a member from the cached role bitmasks.
+
+        `roles` can be passed when the member is not cached (e.g. taken from a
+        MESSAGE_CREATE `member` object).
+        """
+        user_id = snowflake(user_id)
+        if self._is_owner(user_id):
+            return Permissions.ALL.value
+        if roles is None:
+            member = self.members.get(user_id)
+            roles = member.roles if member else ()
+        key = tuple(map(snowflake, roles))
+        permissions = self._base_permissions.get(key)
+        if permissions is None:
+            role_permissions = self._role_permissions
+            permissions = role_permissions.get(self._id, 0)  # @everyone
+            for role_id in key:
+                permissions |= role_permissions.get(role_id, 0)
+            if permissions & Permissions.ADMINISTRATOR.value:
+                permissions = Permissions.ALL.value
+            self._base_permissions[key] = permissions
+        return permissions
+
+    def permissions_for(
+        self,
+        user_id: SnowflakeLike,
+        channel: "Channel" = None,
+        roles: List[SnowflakeLike] = None,
+    ) -> int:
+        """
+        Resolve the effective permissions of a member in a channel, applying the
+        channel's permission overwrites. No network I/O is performed.
+        """
+        user_id = snowflake(user_id)
+        if roles is None:
+            member = self.members.get(user_id)
+            roles = member.roles if member else ()
+        permissions = self.base_permissions(user_id, roles)
+        if channel is None or permissions == Permissions.ALL.value:
+            return permissions
+
+        overwrites = channel.overwrites
+        everyone = overwrites.get(self._id)
+        if everyone:
+            permissions = (permissions & ~everyone[1]) | everyone[0]
+        allow = deny = 0
+        for role_id in roles:
+            overwrite = overwrites.get(snowflake(role_id))
+            if overwrite:
+                allow |= overwrite[0]
+                deny |= overwrite[1]
+        permissions = (permissions & ~deny) | allow
+        member_overwrite = overwrites.get(user_id)
+        if member_overwrite:
+            permissions = (permissions & ~member_overwrite[1]) | member_overwrite[0]
+        return permissions
+
+    def has_permissions(
+        self,
+        user_id: SnowflakeLike,
+        channel: "Channel" = None,
+        *permissions: Permissions,
+        roles: List[SnowflakeLike] = None,
+    ) -> bool:
+        """
+        Check whether a member holds all of the given permissions in a channel.
+        """
+        required = 0
+        for permission in permissions:
+            required |= permission.value
+        return self.permissions_for(user_id, channel, roles) & required == required
 
 
 class Channel(ObjectBuilder):
@@ -42,6 +223,20 @@ class Channel(ObjectBuilder):
         self._session = kwargs["session"]
         self._auth = kwargs["auth"]
         self.kwargs = kwargs
+        self._overwrites = None
+
+    @property
+    def overwrites(self) -> Dict[int, tuple]:
+        """
+        Permission overwrites indexed by int target ID as `(allow, deny)`
+        bitmasks. Built once on first access.
+        """
+        if self._overwrites is None:
+            self._overwrites = {
+                snowflake(o["id"]): (int(o.get("allow", 0)), int(o.get("deny", 0)))
+                for o in getattr(self, "permission_overwrites", None) or ()
+            }
+        return self._overwrites
 
     async def get_message(self, message_id):
         """
@@ -69,12 +264,16 @@ class Channel(ObjectBuilder):
         allowed_mentions: AllowedMentions = None,
         reference_message_id: str = None,
         components: List[ActionRow] = None,
+        view: View = None,
+        files: List[File] = None,
     ):
         """
         Send a message to this channel.
         """
-        if not any([content, embeds, sticker_ids, poll, components]):
+        if not any([content, embeds, sticker_ids, poll, components, view, files]):
             raise ValueError("No arguments provided")
+        if view is not None:
+            components = attach_view(components, view)
         payload = MessagePayload(
             content=content,
             embeds=embeds,
@@ -89,13 +288,26 @@ class Channel(ObjectBuilder):
             "POST",
             f"{__base_url__}channels/{self.id}/messages",
             json=payload,
+            files=files,
         )
-        return Message(
+        message = Message(
             tree=data,
             session=self._session,
             auth=self._auth,
             channel=self,
         )
+        if view is not None:
+            view.message = message
+        return message
+
+    def batched(self, window: float = 0.5) -> MessageBatcher:
+        """
+        Return the coalescing sender of this channel: messages sent through it
+        within `window` seconds are merged into as few messages as possible.
+        The window is set by the call that creates the batcher; it is dropped
+        once a flush leaves it empty.
+        """
+        return batcher_for(self, window)
 
     async def delete(self):
         """
@@ -115,15 +327,137 @@ class Channel(ObjectBuilder):
             self._session,
             "GET",
             f"{__base_url__}channels/{self.id}/pins",
-            json={"before": before, "limit": limit},
+            params={
+                key: value
+                for key, value in (("before", before), ("limit", limit))
+                if value is not None
+            },
         )
         return [
             Message(tree=pin, session=self._session, auth=self._auth, channel=self)
             for pin in data
         ]
 
+    async def _fetch_history(self, limit: int, **cursor) -> List[dict]:
+        return await _request(
+            self._session,
+            "GET",
+            f"{__base_url__}channels/{self.id}/messages",
+            params={"limit": limit, **cursor},
+        )
+
+    async def history(
+        self, limit: Optional[int] = 100, before: str = None, after: str = None
+    ) -> AsyncIterator["Message"]:
+        """
+        Iterate over the channel's messages, newest first, or oldest first when
+        only `after` is given. `limit=None` walks the whole history.
+
+        Pages of 100 are requested with `before`/`after` cursors and the next page
+        is already being fetched while the current one is consumed.
+        """
+        ascending = after is not None and before is None
+        remaining = limit
+
+        def fetch(cursor: Optional[str]) -> tuple:
+            count = 100 if remaining is None else min(100, remaining)
+            if ascending:
+                request = self._fetch_history(count, after=cursor)
+            elif cursor is not None:
+                request = self._fetch_history(count, before=cursor)
+            else:
+                request = self._fetch_history(count)
+            return asyncio.create_task(request), count
+
+        if remaining == 0:
+            return
+        page_task, requested = fetch(after if ascending else before)
+        try:
+            while page_task is not None:
+                page = await page_task
+                page_task = None
+                exhausted = len(page) < requested
+                if ascending:
+                    # The API returns every page newest first.
+                    page.reverse()
+                elif after is not None:
+                    # before and after cannot be combined: page down from `before`
+                    # and stop at `after`.
+                    kept = [m for m in page if int(m["id"]) > int(after)]
+                    exhausted = exhausted or len(kept) < len(page)
+                    page = kept
+                if remaining is not None:
+                    page = page[:remaining]
+                    remaining -= len(page)
+                if page and not exhausted and (remaining is None or remaining > 0):
+                    page_task, requested = fetch(page[-1]["id"])
+                for data in page:
+                    yield Message(
+                        tree=data, session=self._session, auth=self._auth, channel=self
+                    )
+        finally:
+            if page_task is not None:
+                page_task.cancel()
+
+    async def delete_messages(self, message_ids: List[str]) -> None:
+        """
+        Delete up to 100 messages younger than 14 days in one request.
+        """
+        if len(message_ids) == 1:
+            await self._delete_message(message_ids[0])
+            return
+        await _request(
+            self._session,
+            "POST",
+            f"{__base_url__}channels/{self.id}/messages/bulk-delete",
+            json={"messages": list(message_ids)},
+        )
+
+    async def _delete_message(self, message_id: str) -> None:
+        await _request(
+            self._session,
+            "DELETE",
+            f"{__base_url__}channels/{self.id}/messages/{message_id}",
+        )
+
+    async def purge(
+        self,
+        limit: Optional[int] = 100,
+        before: str = None,
+        after: str = None,
+        check: Callable[["Message"], bool] = None,
+    ) -> int:
+        """
+        Delete messages from the channel, walking `history()` with the same
+        arguments and keeping only those `check` accepts. Returns how many were
+        deleted.
 
-class Author:
+        Messages younger than 14 days are removed through the bulk-delete
+        endpoint, 100 per request; older ones, which it rejects, are deleted one
+        by one.
+        """
+        deleted = 0
+        chunk = []
+        cutoff = time.time() - _BULK_DELETE_MAX_AGE
+        async for message in self.history(limit=limit, before=before, after=after):
+            if check is not None and not check(message):
+                continue
+            if snowflake_time(message.id) > cutoff:
+                chunk.append(message.id)
+                if len(chunk) == 100:
+                    await self.delete_messages(chunk)
+                    deleted += len(chunk)
+                    chunk = []
+            else:
+                await self._delete_message(message.id)
+                deleted += 1
+        if chunk:
+            await self.delete_messages(chunk)
+            deleted += len(chunk)
+        return deleted
+
+
+class Author(ObjectBuilder):
     """
     Represents a Discord User/Author object.
     """
@@ -191,6 +525,8 @@ class Message(ObjectBuilder):
         poll: Poll = None,
         allowed_mentions: Union[AllowedMentions, Dict] = None,
         components: List[ActionRow] = None,
+        view: View = None,
+        files: List[File] = None,
     ):
         """
         Reply to this message.
@@ -199,8 +535,10 @@ class Message(ObjectBuilder):
         automatically be sent as an interaction follow-up. Otherwise,
         it sends a standard message reply.
         """
-        if not any([content, embeds, sticker_ids, poll, components]):
+        if not any([content, embeds, sticker_ids, poll, components, view, files]):
             raise ValueError("No arguments provided")
+        if view is not None:
+            components = attach_view(components, view)
 
         # If we have an interaction token, we can use it to reply as a follow-up
         if (
@@ -218,8 +556,9 @@ class Message(ObjectBuilder):
                 "POST",
                 f"{__base_url__}webhooks/{self._application_id}/{self._interaction_token}",
                 json=payload,
+                files=files,
             )
-            return Message(
+            message = Message(
                 data,
                 self._session,
                 self._auth,
@@ -227,6 +566,9 @@ class Message(ObjectBuilder):
                 interaction_token=self._interaction_token,
                 application_id=self._application_id,
             )
+            if view is not None:
+                view.message = message
+            return message
 
         # Standard message reply
         payload = MessagePayload(
@@ -244,10 +586,14 @@ class Message(ObjectBuilder):
             "POST",
             f"{__base_url__}channels/{self.channel.id}/messages",
             json=payload,
+            files=files,
         )
-        return Message(
+        message = Message(
             tree=data, session=self._session, auth=self._auth, channel=self.channel
         )
+        if view is not None:
+            view.message = message
+        return message
 
     async def edit(
         self, new_content: str = None, embed: dict = None, embeds: list = None
@@ -3,6 +3,11 @@ class UnSufficientArguments(Exception):
         super().__init__(*args)
 
 
+class BadArgument(Exception):
+    def __init__(self, *args: object) -> None:
+        super().__init__(*args)
+
+
 class BadRequest(Exception):
     def __init__(self, message="BAD REQUEST"):
         super().__init__(message)
@@ -0,0 +1,123 @@
+import io
+import os
+import orjson
+from aiohttp import MultipartWriter
+from typing import BinaryIO, List, Union
+
+
+class _Borrowed(io.RawIOBase):
+    """
+    Read-through view of a caller's file object that aiohttp may close without
+    closing the caller's file, so the same object can be streamed again on a
+    retry.
+    """
+
+    def __init__(self, fp: BinaryIO):
+        self._fp = fp
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        return self._fp.read(size)
+
+    def readinto(self, buffer) -> int:
+        data = self._fp.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
+    def seekable(self) -> bool:
+        return self._fp.seekable()
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        return self._fp.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self._fp.tell()
+
+    def fileno(self) -> int:
+        return self._fp.fileno()
+
+    def close(self) -> None:
+        pass
+
+
+class File:
+    """
+    A file to attach to a message.
+
+    `fp` is a path, a binary file object or a bytes-like object (bytes,
+    bytearray, memoryview). Paths and file objects are streamed in chunks while
+    the request is sent rather than read into memory; paths are opened for each
+    attempt and file objects are rewound to their initial position, so rate
+    limited requests can be retried.
+    """
+
+    def __init__(
+        self,
+        fp: Union[str, os.PathLike, BinaryIO, bytes, bytearray, memoryview],
+        filename: str = None,
+        description: str = None,
+        spoiler: bool = False,
+    ):
+        self.fp = fp
+        if filename is None:
+            if isinstance(fp, (str, os.PathLike)):
+                filename = os.path.basename(fp)
+            else:
+                filename = os.path.basename(getattr(fp, "name", "") or "file")
+        if spoiler and not filename.startswith("SPOILER_"):
+            filename = f"SPOILER_{filename}"
+        self.filename = filename
+        self.description = description
+        self._start = (
+            fp.tell()
+            if hasattr(fp, "read") and hasattr(fp, "seekable") and fp.seekable()
+            else None
+        )
+        self._opened = None
+
+    def _open(self):
+        """
+        Return the object to stream for one request attempt.
+        """
+        if isinstance(self.fp, (str, os.PathLike)):
+            self._opened = open(self.fp, "rb")
+            return self._opened
+        if isinstance(self.fp, io.BytesIO):
+            return self.fp.getvalue()[self._start :]
+        if hasattr(self.fp, "read"):
+            if self._start is not None:
+                self.fp.seek(self._start)
+            return _Borrowed(self.fp)
+        return self.fp
+
+    def _close(self) -> None:
+        if self._opened is not None:
+            self._opened.close()
+            self._opened = None
+
+
+def build_multipart(payload: dict, files: List[File]) -> MultipartWriter:
+    """
+    Build the multipart/form-data body of a request with attachments: the JSON
+    payload (with its `attachments` metadata) followed by one part per file.
+    """
+    payload = dict(payload or {})
+    payload["attachments"] = [
+        (
+            {"id": index, "filename": file.filename, "description": file.description}
+            if file.description
+            else {"id": index, "filename": file.filename}
+        )
+        for index, file in enumerate(files)
+    ]
+    writer = MultipartWriter("form-data")
+    part = writer.append(orjson.dumps(payload), {"Content-Type": "application/json"})
+    part.set_content_disposition("form-data", name="payload_json")
+    for index, file in enumerate(files):
+        part = writer.append(file._open(), {"Content-Type": "application/octet-stream"})
+        part.set_content_disposition(
+            "form-data", name=f"files[{index}]", filename=file.filename
+        )
+    return writer
@@ -0,0 +1,118 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Callable, List, Optional
+from .constants import ShardHealth
+from .metrics import REGISTRY
+
+_log = logging.getLogger("coda.health")
+
+# Heartbeat round trip (seconds) from which a shard counts as degraded.
+DEGRADED_LATENCY = 1.0
+
+LOOP_LAG = REGISTRY.histogram(
+    "coda_event_loop_lag_seconds",
+    "How late the event loop woke up the lag sampler.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+SHARD_HEALTH = REGISTRY.gauge(
+    "coda_shard_health",
+    "Shard health: 0 healthy, 1 degraded, 2 zombie.",
+    ("shard",),
+)
+
+
+class LoopLagMonitor:
+    """
+    Samples how late the event loop runs a timer every `interval` seconds.
+
+    The status is derived from the largest lag of the last `window` samples:
+    DEGRADED from `degraded_threshold`, ZOMBIE from `zombie_threshold`, a lag
+    at which heartbeats are about to be missed. Callbacks registered with
+    `on_lag` are called as `callback(lag, status)` whenever the status changes,
+    in both directions, e.g. to shed load while the loop is behind.
+
+    One monitor is shared by every shard of the process (they share the loop),
+    see `lag_monitor`.
+    """
+
+    def __init__(
+        self,
+        interval: float = 0.5,
+        degraded_threshold: float = 0.25,
+        zombie_threshold: float = 5.0,
+        window: int = 10,
+    ):
+        self.interval = interval
+        self.degraded_threshold = degraded_threshold
+        self.zombie_threshold = zombie_threshold
+        self.lag = 0.0
+        self.status = ShardHealth.HEALTHY
+        self._samples = deque(maxlen=window)
+        self._histogram = LOOP_LAG.labels()
+        self._callbacks: List[Callable] = []
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def max_lag(self) -> float:
+        """
+        The largest lag of the current window.
+        """
+        return max(self._samples, default=0.0)
+
+    def on_lag(self, callback: Callable):
+        """
+        Decorator registering a function or coroutine called with `(lag, status)`
+        when the loop status changes.
+        """
+        self._callbacks.append(callback)
+        return callback
+
+    def _status_for(self, lag: float) -> ShardHealth:
+        if lag >= self.zombie_threshold:
+            return ShardHealth.ZOMBIE
+        if lag >= self.degraded_threshold:
+            return ShardHealth.DEGRADED
+        return ShardHealth.HEALTHY
+
+    def record(self, lag: float) -> None:
+        self.lag = lag
+        self._samples.append(lag)
+        self._histogram.observe(lag)
+        status = self._status_for(self.max_lag)
+        if status is self.status:
+            return
+        self.status = status
+        log = _log.info if status is ShardHealth.HEALTHY else _log.warning
+        log("Event loop lagging %.3fs, shard status now %s", lag, status.name)
+        for callback in self._callbacks:
+            try:
+                result = callback(lag, status)
+                if asyncio.iscoroutine(result):
+                    asyncio.get_running_loop().create_task(result)
+            except Exception:
+                _log.exception("Loop lag callback %r failed", callback)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.record(max(0.0, loop.time() - expected))
+
+    def start(self) -> "LoopLagMonitor":
+        """
+        Start sampling on the running loop, if not running yet.
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return self
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+# Started by the first shard that connects.
+lag_monitor = LoopLagMonitor()
@@ -1,12 +1,16 @@
 import re
 import asyncio
+import logging
 import orjson
-from colorama import Fore
 from datetime import datetime, UTC
 from typing import Any, Dict
 from aiohttp import ClientSession
 from .constants import __base_url__
 from .exceptions import BadRequest, Unauthorized, Forbidden, NotFound, TooManyRequests
+from .files import build_multipart
+from .metrics import HTTP_REQUESTS, HTTP_RATE_LIMITED, HTTP_RATE_LIMIT_WAIT
+
+_log = logging.getLogger("coda.http")
 
 __status_codes__ = {
     400: BadRequest,
@@ -25,8 +29,13 @@ class Bucket:
     Discord's X-RateLimit headers.
     """
 
-    def __init__(self):
+    def __init__(self, key: str = "", route: str = None):
+        self.key = key
+        # Metrics are labelled by the route template, never by the key, which
+        # holds webhook/interaction tokens and one entry per resource.
+        self.route = route or key
         self.lock = asyncio.Lock()
+        self._requests = {}
         self.remaining = 1
         self.limit = 1
         self.reset_at = 0
@@ -49,14 +58,19 @@ class Bucket:
 
                 wait_time = self.reset_at - now
                 if wait_time > 0:
-                    print(
-                        f"Coda: {Fore.CYAN}Rate limit bucket full. Waiting {wait_time:.2f}s{Fore.RESET}"
-                    )
+                    _log.debug("Rate limit bucket full. Waiting %.2fs", wait_time)
+                    _rate_limit_wait.inc(wait_time)
                     await asyncio.sleep(wait_time)
                 else:
                     self.remaining = self.limit - 1
                     return
 
+    def count(self, status: int) -> None:
+        counter = self._requests.get(status)
+        if counter is None:
+            counter = self._requests[status] = HTTP_REQUESTS.labels(self.route, status)
+        counter.inc()
+
     def update(self, headers: dict):
         """
         Update bucket state from Discord's response headers.
@@ -83,9 +97,8 @@ class RateLimiter:
         now = datetime.now(UTC).timestamp()
         if now < self.global_wait_until:
             wait_time = self.global_wait_until - now
-            print(
-                f"Coda: {Fore.RED}Global backoff active. Waiting {wait_time:.2f}s{Fore.RESET}"
-            )
+            _log.debug("Global backoff active. Waiting %.2fs", wait_time)
+            _rate_limit_wait.inc(wait_time)
             await asyncio.sleep(wait_time)
 
     def set_global_backoff(self, retry_after: float):
@@ -99,18 +112,61 @@ class RateLimiter:
         Identify and return the rate limit bucket for a specific endpoint.
         Uses regex to normalize paths (e.g., grouping all message deletions).
         """
-        path = url.split(__base_url__)[-1]
+        path = _API_PREFIX.sub("", url.partition("?")[0], count=1)
+        # Webhook (and interaction follow-up) routes keep their ID and token, so
+        # every webhook is limited on its own.
         route = re.sub(r"messages/\d+", "messages/:id", path)
         route = re.sub(r"reactions/[^/]+", "reactions/:emoji", route)
         key = f"{method} {route}"
 
         if key not in self.buckets:
-            self.buckets[key] = Bucket()
+            self.buckets[key] = Bucket(key, f"{method} {route_template(path)}")
         return self.buckets[key]
 
 
+# Everything up to the API root, with or without a version, of any host.
+_API_PREFIX = re.compile(r"^.*?/api/(?:v\d+/)?")
+_TOKEN_ROUTE = re.compile(r"^(webhooks|interactions)/\d+/[^/]+")
+_SNOWFLAKE = re.compile(r"(?<=/)\d+(?=/|$)|^\d+(?=/|$)")
+
+
+def route_template(path: str) -> str:
+    """
+    A path with its IDs, tokens and emojis replaced by placeholders
+    (`channels/:id/messages`, `webhooks/:id/:token`), for bounded metric labels.
+    """
+    route = _TOKEN_ROUTE.sub(r"\1/:id/:token", path)
+    route = re.sub(r"reactions/[^/]+", "reactions/:emoji", route)
+    return _SNOWFLAKE.sub(":id", route)
+
+
 _rate_limiter = RateLimiter()
 
+_rate_limit_wait = HTTP_RATE_LIMIT_WAIT.labels()
+_global_rate_limited = HTTP_RATE_LIMITED.labels("global")
+_bucket_rate_limited = HTTP_RATE_LIMITED.labels("bucket")
+
+_api_root = "https://discord.com/api/"
+_base_url = __base_url__
+
+
+def set_base_url(url: str) -> None:
+    """
+    Point every REST request (and the gateway lookup) at another API root,
+    e.g. a local fake server. Pass `__base_url__` to restore Discord's.
+    """
+    global _base_url
+    _base_url = url if url.endswith("/") else url + "/"
+
+
+def _resolve_url(url: str) -> str:
+    if _base_url == __base_url__ or not url.startswith(_api_root):
+        return url
+    path = url[len(_api_root) :]
+    if path.startswith("v10/"):
+        path = path[4:]
+    return _base_url + path
+
 
 async def _request(session: ClientSession, method: str, url: str, **kwargs) -> Any:
     """
@@ -118,14 +174,40 @@ async def _request(session: ClientSession, method: str, url: str, **kwargs) -> A
     Handles proactive rate limiting, global backoffs, and error code mapping.
     """
     bucket = _rate_limiter.get_bucket(method, url)
+    url = _resolve_url(url)
+    files = kwargs.pop("files", None)
+    body = kwargs.pop("json", None)
+    if body is not None and not files:
+        # Serialize once with orjson (aiohttp would use the stdlib json module on
+        # every attempt); frozen components and embeds are embedded as-is.
+        kwargs["data"] = orjson.dumps(body)
+        kwargs["headers"] = {
+            **(kwargs.get("headers") or {}),
+            "Content-Type": "application/json",
+        }
 
     while True:
         await _rate_limiter.wait_global()
         await bucket.wait()
 
-        async with session.request(method, url, **kwargs) as response:
+        if files:
+            # A streamed body can only be sent once, rebuild it for every attempt.
+            writer = build_multipart(body, files)
+            kwargs["data"] = writer
+            kwargs["headers"] = {
+                **(kwargs.get("headers") or {}),
+                "Content-Type": writer.content_type,
+            }
+
+        try:
+            response = await session.request(method, url, **kwargs)
+        finally:
+            for file in files or ():
+                file._close()
+        async with response:
             # Update bucket from headers
             bucket.update(response.headers)
+            bucket.count(response.status)
 
             if response.status == 429:
                 data = await response.json(loads=orjson.loads)
@@ -133,14 +215,18 @@ async def _request(session: ClientSession, method: str, url: str, **kwargs) -> A
                 is_global = data.get("global", False)
 
                 if is_global:
+                    _global_rate_limited.inc()
                     _rate_limiter.set_global_backoff(retry_after)
-                    print(
-                        f"Coda: {Fore.RED}GLOBAL Rate limit hit. Retrying in {retry_after}s{Fore.RESET}"
-                    )
+                    _log.warning("GLOBAL Rate limit hit. Retrying in %ss", retry_after)
                 else:
-                    print(
-                        f"Coda: {Fore.YELLOW}Bucket Rate limit hit ({method} {url}). Retrying in {retry_after}s{Fore.RESET}"
+                    _log.warning(
+                        "Bucket Rate limit hit (%s %s). Retrying in %ss",
+                        method,
+                        url,
+                        retry_after,
                     )
+                    _bucket_rate_limited.inc()
+                    _rate_limit_wait.inc(retry_after)
                     await asyncio.sleep(retry_after)
                 continue
 
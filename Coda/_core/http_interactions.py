@@ -0,0 +1,175 @@
+import asyncio
+import logging
+import time
+import orjson
+from .constants import InteractionType, InteractionResponseType
+from .interactions import EPHEMERAL, InteractionCallback
+
+try:
+    from nacl.signing import VerifyKey
+    from nacl.exceptions import BadSignatureError
+except ImportError:
+    VerifyKey = None
+
+_log = logging.getLogger("coda.interactions")
+
+
+class InteractionServer:
+    """
+    HTTP endpoint for Discord's outgoing interaction webhooks (the "Interactions
+    Endpoint URL" of the application), as an alternative to receiving
+    interactions over the gateway.
+
+    Requests are verified against the application's Ed25519 public key and
+    routed through the client's slash command, autocomplete, view, component
+    and modal handlers. The handler's initial response is sent back in the HTTP
+    response body instead of through a separate callback request. If the
+    handler has not responded after `defer_after` seconds, the endpoint answers
+    with a deferred response (ephemeral with `ephemeral_defer`) and later
+    responses become edits or follow-ups. A handler that ends without
+    responding gets a 500, so Discord reports the failure instead of showing
+    "thinking..." forever. Requests signed more than `timestamp_tolerance`
+    seconds away from now are rejected as replays.
+
+    Each instance is stateless apart from the client's registrations, so any
+    number of them can run behind a load balancer. Requires PyNaCl.
+    """
+
+    def __init__(
+        self,
+        client,
+        public_key: str,
+        host: str = "0.0.0.0",
+        port: int = 8080,
+        path: str = "/interactions",
+        defer_after: float = 2.5,
+        ephemeral_defer: bool = False,
+        timestamp_tolerance: float = 60.0,
+    ):
+        if VerifyKey is None:
+            raise ImportError(
+                "Coda: The HTTP interactions endpoint requires PyNaCl (pip install pynacl)"
+            )
+        self.client = client
+        self.host = host
+        self.port = port
+        self.path = path
+        self.defer_after = defer_after
+        self.ephemeral_defer = ephemeral_defer
+        self.timestamp_tolerance = timestamp_tolerance
+        self._verify_key = VerifyKey(bytes.fromhex(public_key))
+        self._runner = None
+
+    def verify(self, signature: str, timestamp: str, body: bytes) -> bool:
+        try:
+            if abs(time.time() - int(timestamp)) > self.timestamp_tolerance:
+                return False
+        except ValueError:
+            return False
+        try:
+            self._verify_key.verify(timestamp.encode() + body, bytes.fromhex(signature))
+        except (BadSignatureError, ValueError):
+            return False
+        return True
+
+    def _deferred_response(self, data: dict) -> dict:
+        if data["type"] == InteractionType.MESSAGE_COMPONENT.value:
+            return {"type": InteractionResponseType.DEFERRED_UPDATE_MESSAGE.value}
+        if data["type"] == InteractionType.APPLICATION_COMMAND_AUTOCOMPLETE.value:
+            return {
+                "type": InteractionResponseType.APPLICATION_COMMAND_AUTOCOMPLETE_RESULT.value,
+                "data": {"choices": []},
+            }
+        payload = {
+            "type": InteractionResponseType.DEFERRED_CHANNEL_MESSAGE_WITH_SOURCE.value
+        }
+        if self.ephemeral_defer:
+            payload["data"] = {"flags": EPHEMERAL}
+        return payload
+
+    async def _handle(self, request: "web.Request") -> "web.StreamResponse":
+        from aiohttp import web
+
+        body = await request.read()
+        if not self.verify(
+            request.headers.get("X-Signature-Ed25519", ""),
+            request.headers.get("X-Signature-Timestamp", ""),
+            body,
+        ):
+            return web.Response(status=401, text="invalid request signature")
+        data = orjson.loads(body)
+        if data["type"] == InteractionType.PING.value:
+            return web.Response(
+                body=orjson.dumps({"type": InteractionResponseType.PONG.value}),
+                content_type="application/json",
+            )
+
+        callback = InteractionCallback()
+        task = await self.client._dispatch_interaction(data, callback)
+        if task is None:
+            return web.Response(status=404, text="unhandled interaction")
+        try:
+            await asyncio.wait(
+                (callback.response, task),
+                timeout=self.defer_after,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if callback.response.done():
+                payload = callback.response.result()
+            elif task.done():
+                # Ended (or failed, which the dispatcher logs) without responding;
+                # deferring would leave the user looking at "thinking..." forever.
+                callback.response.cancel()
+                _log.warning(
+                    "Interaction %s handler finished without responding", data["id"]
+                )
+                return web.Response(status=500, text="interaction not answered")
+            else:
+                callback.deferred = True
+                callback.response.cancel()
+                payload = self._deferred_response(data)
+                callback.deferred_flags = payload.get("data", {}).get("flags")
+                _log.debug(
+                    "Interaction %s not answered within %ss, deferred",
+                    data["id"],
+                    self.defer_after,
+                )
+            response = web.Response(
+                body=orjson.dumps(payload), content_type="application/json"
+            )
+            await response.prepare(request)
+            await response.write_eof()
+        finally:
+            callback.sent.set()
+        return response
+
+    async def start(self) -> "InteractionServer":
+        # Imported here so gateway-only clients do not load aiohttp's server side.
+        from aiohttp import web
+
+        app = web.Application()
+        app.router.add_post(self.path, self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        if not self.port:
+            self.port = site._server.sockets[0].getsockname()[1]
+        _log.info(
+            "Interactions endpoint listening on %s:%s%s",
+            self.host,
+            self.port,
+            self.path,
+        )
+        return self
+
+    async def stop(self) -> None:
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.stop()
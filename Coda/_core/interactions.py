@@ -1,4 +1,6 @@
-from typing import Any, Dict, List, Optional
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 from aiohttp import ClientSession
 from .constants import (
     __base_url__,
@@ -11,12 +13,23 @@ from .payloads import InteractionPayload
 from .entities import Guild, Channel, Message
 from .models import Poll
 from .components import ActionRow
+from .views import View, attach_view
+from .files import File
 from .http import _request
+from .exceptions import NotFound
+
+_log = logging.getLogger("coda.interactions")
+
+# Message flag that shows a response only to the invoking user.
+EPHEMERAL = 1 << 6
 
 
 class Option:
     """
     Represents an option for a slash command.
+
+    `choices` takes a list of `{"name": ..., "value": ...}` dicts, `autocomplete`
+    marks the option as served by a handler registered with `autocomplete()`.
     """
 
     def __init__(
@@ -25,19 +38,125 @@ class Option:
         type: ApplicationCommandOptionType,
         description: str = "---",
         required: bool = False,
+        choices: List[Dict[str, Any]] = None,
+        autocomplete: bool = False,
     ):
         self.name = name
         self.description = description
         self.type = type.value
         self.required = required
+        self.choices = choices
+        self.autocomplete = autocomplete
 
     def to_dict(self) -> Dict[str, Any]:
-        return {
+        payload = {
             "name": self.name,
             "description": self.description,
             "type": self.type,
             "required": self.required,
         }
+        if self.choices:
+            payload["choices"] = self.choices
+        if self.autocomplete:
+            payload["autocomplete"] = True
+        return payload
+
+
+class SlashGroup:
+    """
+    Represents a slash command group (a top-level command or a SUB_COMMAND_GROUP).
+
+    Subcommands registered through `.command()` are added to the group's options
+    and to the shard's path table, so routing an invocation is one dict lookup.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        register: Callable,
+        parent_path: tuple = (),
+    ):
+        self.name = name
+        self.description = description
+        self.path = (*parent_path, name)
+        self.options: List[Dict[str, Any]] = []
+        self._register = register
+
+    def command(
+        self,
+        name: str = None,
+        description: str = "---",
+        options: List[Option] = None,
+    ):
+        """
+        Decorator to register a subcommand of this group.
+        """
+
+        def wrapper(coro: Callable):
+            cmd_name = name or coro.__name__
+            self.options.append(
+                {
+                    "type": ApplicationCommandOptionType.SUB_COMMAND.value,
+                    "name": cmd_name,
+                    "description": description,
+                    "options": [opt.to_dict() for opt in options or ()],
+                }
+            )
+            self._register((*self.path, cmd_name), coro)
+            return coro
+
+        return wrapper
+
+    def group(self, name: str, description: str = "---") -> "SlashGroup":
+        """
+        Create a nested subcommand group (Discord allows one level of nesting).
+        """
+        if len(self.path) > 1:
+            raise ValueError("Coda: Subcommand groups cannot be nested any further")
+        group = SlashGroup(name, description, self._register, self.path)
+        self.options.append(
+            {
+                "type": ApplicationCommandOptionType.SUB_COMMAND_GROUP.value,
+                "name": name,
+                "description": description,
+                "options": group.options,
+            }
+        )
+        return group
+
+
+def resolve_command_path(data: Dict[str, Any]) -> Tuple[tuple, List[Dict]]:
+    """
+    Walk the SUB_COMMAND/SUB_COMMAND_GROUP options of an application command
+    interaction and return `(path, leaf_options)`.
+    """
+    path = [data.get("name")]
+    options = data.get("options") or []
+    while options and options[0]["type"] in (
+        ApplicationCommandOptionType.SUB_COMMAND.value,
+        ApplicationCommandOptionType.SUB_COMMAND_GROUP.value,
+    ):
+        path.append(options[0]["name"])
+        options = options[0].get("options") or []
+    return tuple(path), options
+
+
+class InteractionCallback:
+    """
+    Hands the initial response of an interaction received over HTTP to the
+    endpoint that holds the request open, so it goes out in the response body.
+
+    `deferred` is set when the endpoint had to answer on its own (the handler
+    did not respond in time) with a deferred response, sent with
+    `deferred_flags`.
+    """
+
+    def __init__(self):
+        self.response = asyncio.get_running_loop().create_future()
+        self.sent = asyncio.Event()
+        self.deferred = False
+        self.deferred_flags = None
 
 
 class Interaction:
@@ -45,9 +164,16 @@ class Interaction:
     Represents a Discord Interaction (Slash Command, Component Click, Modal Submit).
     """
 
-    def __init__(self, session: ClientSession, data: Dict[str, Any], auth: str):
+    def __init__(
+        self,
+        session: ClientSession,
+        data: Dict[str, Any],
+        auth: str,
+        callback: InteractionCallback = None,
+    ):
         self._session = session
         self._auth = auth
+        self._callback = callback
         self.id = data["id"]
         self.application_id = data["application_id"]
         self.token = data["token"]
@@ -107,10 +233,14 @@ class Interaction:
         ephemeral: bool = False,
         poll: Poll = None,
         components: List[ActionRow] = None,
+        view: View = None,
+        files: List[File] = None,
     ):
         """
         Respond to the interaction with a message.
         """
+        if view is not None:
+            components = attach_view(components, view)
 
         payload = InteractionPayload(
             type=InteractionResponseType.CHANNEL_MESSAGE_WITH_SOURCE,
@@ -121,27 +251,151 @@ class Interaction:
             components=components,
         ).payload_tree
 
+        data = await self._send_callback(payload, files)
+
+        if not ephemeral:
+            if data is None:
+                data = await self._fetch_original()
+            message = Message(
+                data,
+                self._session,
+                self._auth,
+                self.channel,
+                interaction_token=self.token,
+                application_id=self.application_id,
+            )
+            if view is not None:
+                view.message = message
+            return message
+
+    async def _send_callback(
+        self, payload: dict, files: List[File] = None
+    ) -> Union[dict, None]:
+        """
+        Send the initial response, in the HTTP response body when the interaction
+        came through `InteractionServer`. Returns the message when the response
+        had to be delivered as an edit or follow-up of a deferral.
+        """
+        callback = self._callback
+        if callback is not None:
+            if not callback.response.done():
+                if files:
+                    # Attachments cannot go in the HTTP response body: defer there
+                    # and upload them with the edit of the deferred message.
+                    callback.deferred = True
+                    callback.deferred_flags = payload["data"].get("flags")
+                    callback.response.set_result(
+                        {
+                            "type": InteractionResponseType.DEFERRED_CHANNEL_MESSAGE_WITH_SOURCE.value,
+                            "data": {"flags": callback.deferred_flags},
+                        }
+                    )
+                    await callback.sent.wait()
+                    return await self._respond_after_deferral(payload, files)
+                callback.response.set_result(payload)
+                await callback.sent.wait()
+                return None
+            if callback.deferred:
+                # The deferral has to reach Discord before the message it creates
+                # can be edited.
+                await callback.sent.wait()
+                return await self._respond_after_deferral(payload, files)
         await _request(
             self._session,
             "POST",
             f"{__base_url__}interactions/{self.id}/{self.token}/callback",
             json=payload,
+            files=files,
         )
+        return None
 
-        if not ephemeral:
-            data = await _request(
-                self._session,
-                "GET",
-                f"{__base_url__}webhooks/{self.application_id}/{self.token}/messages/@original",
+    async def _respond_after_deferral(
+        self, payload: dict, files: List[File] = None
+    ) -> Union[dict, None]:
+        kind = payload["type"]
+        if kind in (
+            InteractionResponseType.DEFERRED_CHANNEL_MESSAGE_WITH_SOURCE.value,
+            InteractionResponseType.DEFERRED_UPDATE_MESSAGE.value,
+        ):
+            return None
+        if (
+            kind
+            == InteractionResponseType.APPLICATION_COMMAND_AUTOCOMPLETE_RESULT.value
+        ):
+            # The endpoint already answered with no choices; there is nothing
+            # to deliver them to any more.
+            _log.warning(
+                "Interaction %s autocomplete answered too late, dropped", self.id
             )
-            return Message(
-                data,
+            return None
+        webhook_url = f"{__base_url__}webhooks/{self.application_id}/{self.token}"
+        if (
+            kind == InteractionResponseType.CHANNEL_MESSAGE_WITH_SOURCE.value
+            and self.type == InteractionType.MESSAGE_COMPONENT.value
+        ):
+            return await _request(
+                self._session, "POST", webhook_url, json=payload["data"], files=files
+            )
+        if (
+            kind == InteractionResponseType.CHANNEL_MESSAGE_WITH_SOURCE.value
+            and (payload["data"].get("flags") or 0) & EPHEMERAL
+            and not (self._callback.deferred_flags or 0) & EPHEMERAL
+        ):
+            # The deferral was public and editing it cannot make it ephemeral:
+            # drop its placeholder and answer with an ephemeral follow-up.
+            await _request(self._session, "DELETE", f"{webhook_url}/messages/@original")
+            return await _request(
+                self._session, "POST", webhook_url, json=payload["data"], files=files
+            )
+        if kind in (
+            InteractionResponseType.CHANNEL_MESSAGE_WITH_SOURCE.value,
+            InteractionResponseType.UPDATE_MESSAGE.value,
+        ):
+            return await _request(
                 self._session,
-                self._auth,
-                self.channel,
-                interaction_token=self.token,
-                application_id=self.application_id,
+                "PATCH",
+                f"{webhook_url}/messages/@original",
+                json=payload["data"],
+                files=files,
             )
+        raise RuntimeError(
+            "Coda: The interaction was already deferred by the HTTP endpoint"
+        )
+
+    async def _fetch_original(self) -> dict:
+        url = f"{__base_url__}webhooks/{self.application_id}/{self.token}/messages/@original"
+        if self._callback is None:
+            return await _request(self._session, "GET", url)
+        # Over HTTP the response body has only just been written, Discord may not
+        # have created the message yet on the first try.
+        for delay in (0.05, 0.2, 0.5):
+            try:
+                return await _request(self._session, "GET", url)
+            except NotFound:
+                await asyncio.sleep(delay)
+        return await _request(self._session, "GET", url)
+
+    async def autocomplete_response(self, choices: List[Any]):
+        """
+        Answer an autocomplete interaction with up to 25 choices.
+
+        Choices can be `{"name": ..., "value": ...}` dicts, `(name, value)` tuples
+        or plain values (used as both name and value).
+        """
+        normalized = []
+        for choice in choices[:25]:
+            if isinstance(choice, dict):
+                normalized.append(choice)
+            elif isinstance(choice, tuple):
+                normalized.append({"name": str(choice[0]), "value": choice[1]})
+            else:
+                normalized.append({"name": str(choice), "value": choice})
+        await self._send_callback(
+            {
+                "type": InteractionResponseType.APPLICATION_COMMAND_AUTOCOMPLETE_RESULT.value,
+                "data": {"choices": normalized},
+            }
+        )
 
     async def modal_response(
         self, title: str, custom_id: str, components: List[ActionRow]
@@ -157,12 +411,7 @@ class Interaction:
                 "components": [c.tree for c in components],
             },
         }
-        await _request(
-            self._session,
-            "POST",
-            f"{__base_url__}interactions/{self.id}/{self.token}/callback",
-            json=payload,
-        )
+        await self._send_callback(payload)
 
     async def defer(self, ephemeral: bool = False):
         """
@@ -174,12 +423,7 @@ class Interaction:
             ephemeral=ephemeral,
         ).payload_tree
 
-        await _request(
-            self._session,
-            "POST",
-            f"{__base_url__}interactions/{self.id}/{self.token}/callback",
-            json=payload,
-        )
+        await self._send_callback(payload)
 
     async def follow_up(
         self,
@@ -187,10 +431,14 @@ class Interaction:
         embeds: list = None,
         ephemeral: bool = False,
         components: List[ActionRow] = None,
+        view: View = None,
+        files: List[File] = None,
     ):
         """
         Send a follow-up message.
         """
+        if view is not None:
+            components = attach_view(components, view)
 
         payload = InteractionPayload(
             content=content, embeds=embeds, ephemeral=ephemeral, components=components
@@ -201,8 +449,9 @@ class Interaction:
             "POST",
             f"{__base_url__}webhooks/{self.application_id}/{self.token}",
             json=payload,
+            files=files,
         )
-        return Message(
+        message = Message(
             data,
             self._session,
             self._auth,
@@ -210,6 +459,9 @@ class Interaction:
             interaction_token=self.token,
             application_id=self.application_id,
         )
+        if view is not None:
+            view.message = message
+        return message
 
     async def edit_response(
         self, content: str = None, embeds: list = None, message_id: str = "@original"
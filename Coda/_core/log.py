@@ -0,0 +1,155 @@
+import atexit
+import copy
+import logging
+import logging.handlers
+import queue
+import time
+import orjson
+from colorama import Fore
+from typing import Optional
+
+# Every logger of the library lives under "coda": "coda.gateway" (shard
+# connections and heartbeats), "coda.http" (REST requests and rate limits),
+# "coda.interactions", "coda.commands", "coda.dispatch" (handler errors),
+# "coda.sharding", "coda.timers", "coda.metrics", "coda.profiling" (slow
+# handlers), "coda.health" (event loop lag), "coda.runner" and "coda.cli".
+_log = logging.getLogger("coda")
+
+# LogRecord attributes; anything else on a record came from `extra=`.
+_RECORD_ATTRS = frozenset(
+    logging.LogRecord("", 0, "", 0, "", (), None).__dict__.keys()
+    | {"message", "asctime", "taskName"}
+)
+
+_formatter = logging.Formatter()
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def _exc_text(formatter: logging.Formatter, record: logging.LogRecord) -> str:
+    if record.exc_info:
+        return formatter.formatException(record.exc_info)
+    return record.exc_text or ""
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to the listener thread with their message merged and the
+    traceback rendered, but leaves the formatting to the listener's handler.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class ColorFormatter(logging.Formatter):
+    """
+    Human readable console output, colored by level:
+    `Coda: <message> [YYYY-MM-DD HH:MM]` in UTC.
+    """
+
+    converter = time.gmtime
+
+    LEVEL_COLORS = {
+        logging.DEBUG: Fore.LIGHTBLACK_EX,
+        logging.INFO: Fore.GREEN,
+        logging.WARNING: Fore.YELLOW,
+        logging.ERROR: Fore.RED,
+        logging.CRITICAL: Fore.LIGHTRED_EX,
+    }
+
+    def __init__(self):
+        super().__init__(datefmt="%Y-%m-%d %H:%M")
+
+    def format(self, record: logging.LogRecord) -> str:
+        color = self.LEVEL_COLORS.get(record.levelno, "")
+        line = f"Coda: {color}{record.getMessage()}{Fore.RESET} [{self.formatTime(record, self.datefmt)}]"
+        exc_text = _exc_text(self, record)
+        return f"{line}\n{exc_text}" if exc_text else line
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    One JSON object per line, for log collectors: time (ISO 8601, UTC), level,
+    logger and message, plus any `extra=` fields of the record (e.g. shard_id)
+    and the formatted exception, if any.
+    """
+
+    converter = time.gmtime
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": f"{time.strftime('%Y-%m-%dT%H:%M:%S', self.converter(record.created))}.{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        exc_text = _exc_text(self, record)
+        if exc_text:
+            entry["exc_info"] = exc_text
+        return orjson.dumps(entry, default=str).decode()
+
+
+def setup_logging(
+    level: int = logging.INFO,
+    handler: logging.Handler = None,
+    json: bool = False,
+    use_queue: bool = True,
+) -> logging.Logger:
+    """
+    Attach a handler to the "coda" logger.
+
+    `handler` defaults to a stream handler on stderr, formatted with
+    `ColorFormatter`, or `JSONFormatter` when `json` is set (a handler passed
+    in keeps its own formatter). With `use_queue`, records are handed to a
+    `QueueHandler` and written by a background thread, so the event loop never
+    blocks on the output. Calling it again replaces the previous setup.
+    """
+    global _listener
+    if handler is None:
+        handler = logging.StreamHandler()
+        handler.setFormatter(JSONFormatter() if json else ColorFormatter())
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    for previous in list(_log.handlers):
+        _log.removeHandler(previous)
+    if use_queue:
+        records = queue.SimpleQueue()
+        _listener = logging.handlers.QueueListener(
+            records, handler, respect_handler_level=True
+        )
+        _listener.start()
+        _log.addHandler(_QueueHandler(records))
+    else:
+        _log.addHandler(handler)
+    _log.setLevel(level)
+    _log.propagate = False
+    return _log
+
+
+def _default_logging(debug: bool) -> None:
+    """
+    Install the default console output unless the application configured
+    logging itself (handlers on "coda" or on the root logger).
+    """
+    if _log.handlers or logging.getLogger().handlers:
+        if debug:
+            _log.setLevel(logging.DEBUG)
+        return
+    setup_logging(logging.DEBUG if debug else logging.INFO)
+
+
+@atexit.register
+def _stop_listener() -> None:
+    # Drain the queue on exit so the last records are not lost.
+    if _listener is not None:
+        _listener.stop()
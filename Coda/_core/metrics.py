@@ -0,0 +1,390 @@
+import logging
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Tuple
+
+_log = logging.getLogger("coda.metrics")
+
+# Latency buckets (seconds) for dispatch, handler and request timings.
+DEFAULT_BUCKETS = (
+    0.0001,
+    0.0005,
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra="") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class _GaugeChild:
+    __slots__ = ("value", "function")
+
+    def __init__(self):
+        self.value = 0.0
+        self.function = None
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """
+        Read the value from `function` when the metrics are collected instead,
+        e.g. the size of a cache.
+        """
+        self.function = function
+
+    def get(self) -> float:
+        return self.function() if self.function is not None else self.value
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._children: Dict[Tuple[str, ...], object] = {}
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values) -> object:
+        """
+        Return the child of this label combination. Bind it once and keep it
+        around on hot paths, updating a bound child is a plain attribute write.
+        """
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.label_names):
+                raise ValueError(
+                    f"Coda: {self.name} takes the labels {self.label_names}"
+                )
+            child = self._children[key] = self._new_child()
+        return child
+
+    def _samples(self) -> List[Tuple[str, str, float]]:
+        raise NotImplementedError
+
+    def collect(self) -> Dict[Tuple[str, ...], object]:
+        raise NotImplementedError
+
+    def expose(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        for suffix, labels, value in self._samples():
+            lines.append(f"{self.name}{suffix}{labels} {value!r}")
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """
+    A monotonically increasing value.
+    """
+
+    kind = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def collect(self) -> Dict[Tuple[str, ...], float]:
+        return {key: child.value for key, child in list(self._children.items())}
+
+    def _samples(self):
+        return [
+            ("", _format_labels(self.label_names, key), value)
+            for key, value in self.collect().items()
+        ]
+
+
+class Gauge(_Metric):
+    """
+    A value that goes up and down, set directly or read from a function.
+    """
+
+    kind = "gauge"
+
+    def _new_child(self) -> _GaugeChild:
+        return _GaugeChild()
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+    def remove(self, *values, function: Callable[[], float] = None) -> None:
+        """
+        Drop the child of this label combination. With `function`, only while
+        the child still reads from it, so an owner that was replaced (e.g. a
+        restarted shard) cannot drop its successor's value.
+        """
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is not None and (function is None or child.function is function):
+            del self._children[key]
+
+    def collect(self) -> Dict[Tuple[str, ...], float]:
+        values = {}
+        for key, child in list(self._children.items()):
+            try:
+                values[key] = float(child.get())
+            except Exception:
+                _log.exception("Gauge %s%s failed", self.name, key)
+        return values
+
+    def _samples(self):
+        return [
+            ("", _format_labels(self.label_names, key), value)
+            for key, value in self.collect().items()
+        ]
+
+
+class Histogram(_Metric):
+    """
+    Distribution of observed values over fixed buckets.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def collect(self) -> Dict[Tuple[str, ...], dict]:
+        values = {}
+        for key, child in list(self._children.items()):
+            cumulative, total = {}, 0
+            for bound, count in zip(self.buckets + (float("inf"),), child.counts):
+                total += count
+                cumulative[bound] = total
+            values[key] = {
+                "buckets": cumulative,
+                "sum": child.sum,
+                "count": child.count,
+            }
+        return values
+
+    def _samples(self):
+        samples = []
+        for key, value in self.collect().items():
+            for bound, count in value["buckets"].items():
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                samples.append(
+                    (
+                        "_bucket",
+                        _format_labels(self.label_names, key, f'le="{le}"'),
+                        count,
+                    )
+                )
+            labels = _format_labels(self.label_names, key)
+            samples.append(("_sum", labels, value["sum"]))
+            samples.append(("_count", labels, value["count"]))
+        return samples
+
+
+class MetricsRegistry:
+    """
+    The set of metrics exposed together.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Coda: Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labels=()) -> Counter:
+        return self.register(Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels=()) -> Gauge:
+        return self.register(Gauge(name, documentation, labels))
+
+    def histogram(
+        self, name: str, documentation: str, labels=(), buckets=DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def get(self, name: str) -> _Metric:
+        return self._metrics[name]
+
+    def snapshot(self) -> Dict[str, dict]:
+        """
+        Current values of every metric: `{name: {label values: value}}`, where
+        the value of a histogram is a dict of cumulative buckets, sum and count.
+        """
+        return {name: metric.collect() for name, metric in self._metrics.items()}
+
+    def expose(self) -> str:
+        """
+        Render every metric in the Prometheus text exposition format.
+        """
+        return "\n".join(metric.expose() for metric in self._metrics.values()) + "\n"
+
+
+# Metrics of the library, updated by the gateway, REST and dispatch code.
+REGISTRY = MetricsRegistry()
+
+GATEWAY_EVENTS = REGISTRY.counter(
+    "coda_gateway_events_total", "Dispatch events received.", ("shard", "event")
+)
+DISPATCH_LATENCY = REGISTRY.histogram(
+    "coda_dispatch_latency_seconds",
+    "Time from receiving a gateway frame until its dispatch is processed.",
+    ("shard",),
+)
+HANDLER_DURATION = REGISTRY.histogram(
+    "coda_handler_duration_seconds",
+    "Run time of event, command and interaction handlers.",
+    ("handler",),
+)
+HANDLER_ERRORS = REGISTRY.counter(
+    "coda_handler_errors_total", "Handlers that raised.", ("handler",)
+)
+HTTP_REQUESTS = REGISTRY.counter(
+    "coda_http_requests_total", "REST requests sent.", ("route", "status")
+)
+HTTP_RATE_LIMITED = REGISTRY.counter(
+    "coda_http_rate_limited_total", "429 responses received.", ("scope",)
+)
+HTTP_RATE_LIMIT_WAIT = REGISTRY.counter(
+    "coda_http_rate_limit_wait_seconds_total",
+    "Time spent waiting on rate limits.",
+)
+HEARTBEAT_RTT = REGISTRY.gauge(
+    "coda_gateway_heartbeat_rtt_seconds",
+    "Round trip time of the last acknowledged heartbeat.",
+    ("shard",),
+)
+RECONNECTS = REGISTRY.counter(
+    "coda_gateway_reconnects_total", "Gateway reconnections.", ("shard",)
+)
+CACHE_SIZE = REGISTRY.gauge(
+    "coda_cache_size", "Entries in the client caches.", ("shard", "cache")
+)
+
+
+class MetricsServer:
+    """
+    Local HTTP endpoint serving a registry in the Prometheus text format, for
+    scraping. Bind it to localhost (the default) unless the port is firewalled.
+    """
+
+    def __init__(
+        self,
+        registry: MetricsRegistry = REGISTRY,
+        host: str = "127.0.0.1",
+        port: int = 9100,
+        path: str = "/metrics",
+    ):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.path = path
+        self._runner = None
+
+    async def _handle(self, request) -> "web.Response":
+        from aiohttp import web
+
+        return web.Response(
+            text=self.registry.expose(),
+            content_type="text/plain",
+            charset="utf-8",
+            headers={"X-Content-Type-Options": "nosniff"},
+        )
+
+    async def start(self) -> "MetricsServer":
+        # Imported here so clients that never serve metrics do not load aiohttp's
+        # server side.
+        from aiohttp import web
+
+        app = web.Application()
+        app.router.add_get(self.path, self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        if not self.port:
+            self.port = site._server.sockets[0].getsockname()[1]
+        _log.info(
+            "Metrics endpoint listening on %s:%s%s", self.host, self.port, self.path
+        )
+        return self
+
+    async def stop(self) -> None:
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.stop()
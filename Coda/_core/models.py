@@ -1,3 +1,4 @@
+import orjson
 from enum import Enum
 from typing import Any, Dict, List, Optional
 from .constants import PollLayoutStyle
@@ -35,7 +36,7 @@ class Embed:
         image: str = None,
         timestamp=None,
     ) -> None:
-        self.tree = {
+        self._tree = {
             "title": title,
             "description": description,
             "color": color.value if isinstance(color, Enum) else color or None,
@@ -43,12 +44,27 @@ class Embed:
             "fields": [],
         }
         if timestamp:
-            self.embed_tree["timestamp"] = timestamp
+            self._tree["timestamp"] = timestamp
+        self._frozen = None
 
-    async def add_field(self, name: str, value: str, inline: bool):
-        self.embed_tree["fields"].append(
-            {"name": name, "value": value, "inline": inline}
-        )
+    @property
+    def tree(self) -> Any:
+        return self._frozen if self._frozen is not None else self._tree
+
+    def add_field(self, name: str, value: str, inline: bool = False) -> "Embed":
+        if self._frozen is not None:
+            raise ValueError("Coda: Cannot modify a frozen Embed")
+        self._tree["fields"].append({"name": name, "value": value, "inline": inline})
+        return self
+
+    def freeze(self) -> "Embed":
+        """
+        Serialize the embed once and reuse the bytes in every payload it is sent
+        with. A frozen embed cannot be modified.
+        """
+        if self._frozen is None:
+            self._frozen = orjson.Fragment(orjson.dumps(self._tree))
+        return self
 
 
 class PollMediaObject:
@@ -0,0 +1,238 @@
+import asyncio
+import cProfile
+import logging
+import pstats
+import tracemalloc
+import types
+from time import perf_counter, thread_time
+from typing import Any, Callable, Dict, List, Optional
+
+_log = logging.getLogger("coda.profiling")
+
+_PROFILE_MODES = ("cprofile", "tracemalloc")
+
+
+@types.coroutine
+def _forward(yielded: Any):
+    # Hand what the wrapped coroutine yielded (a future, or None for a bare
+    # yield) to the task driving us, and pass its reply back in.
+    return (yield yielded)
+
+
+def handler_name(target: Callable) -> str:
+    return getattr(target, "__qualname__", None) or type(target).__name__
+
+
+def _summarize(value: Any, limit: int = 120) -> str:
+    if isinstance(value, dict):
+        keys = ("t", "id", "guild_id", "channel_id", "custom_id", "name")
+        text = ", ".join(f"{key}={value[key]!r}" for key in keys if key in value)
+        text = f"{{{text or ', '.join(map(str, list(value)[:8]))}}}"
+    elif hasattr(value, "id") and not isinstance(value, (str, bytes)):
+        text = f"{type(value).__name__}(id={value.id!r})"
+    else:
+        text = repr(value)
+    return text if len(text) <= limit else text[: limit - 3] + "..."
+
+
+class HandlerStats:
+    """
+    Aggregated timings of one handler. Times are in seconds; `cpu` only counts
+    the handler's own steps, not the tasks that ran while it was suspended, and
+    `longest_step` is the longest the handler held the event loop at once.
+    """
+
+    __slots__ = ("calls", "errors", "wall", "cpu", "max_wall", "longest_step")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.max_wall = 0.0
+        self.longest_step = 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class _Sample:
+    def __init__(self, mode: str, calls: int, future: asyncio.Future):
+        self.mode = mode
+        self.remaining = calls
+        # Sampled invocations still running; the result waits for all of them.
+        self.active = 0
+        self.future = future
+        self.profile = cProfile.Profile() if mode == "cprofile" else None
+        self.snapshot = None
+        if mode == "tracemalloc":
+            self._stop_tracing = not tracemalloc.is_tracing()
+            if self._stop_tracing:
+                tracemalloc.start()
+            self.snapshot = tracemalloc.take_snapshot()
+
+    def finish(self) -> None:
+        if self.future.done():
+            return
+        if self.profile is not None:
+            self.future.set_result(pstats.Stats(self.profile))
+            return
+        stats = tracemalloc.take_snapshot().compare_to(self.snapshot, "lineno")
+        if self._stop_tracing:
+            tracemalloc.stop()
+        self.future.set_result(stats)
+
+
+class HandlerProfiler:
+    """
+    Opt-in instrumentation of every handler a client triggers (see
+    `WebSocket.profile_handlers`).
+
+    Each invocation is driven step by step to record its wall time, its CPU
+    time and the longest single step, aggregated per handler in `stats`.
+    Invocations taking longer than `slow_threshold` in total, or holding the
+    event loop longer than `blocking_threshold` in one step, which is what
+    delays heartbeats, are logged on "coda.profiling" with the event and a
+    summary of the payload.
+
+    `sample()` profiles the next invocations of one handler with cProfile or
+    tracemalloc on demand.
+    """
+
+    def __init__(
+        self, slow_threshold: float = 1.0, blocking_threshold: float = 0.05
+    ) -> None:
+        self.slow_threshold = slow_threshold
+        self.blocking_threshold = blocking_threshold
+        self.stats: Dict[str, HandlerStats] = {}
+        self._samples: Dict[str, _Sample] = {}
+
+    def sample(
+        self, handler: str, mode: str = "cprofile", calls: int = 1
+    ) -> asyncio.Future:
+        """
+        Profile the next `calls` invocations of the handler named `handler`
+        (its `__qualname__` or `__name__`).
+
+        The returned future resolves to a `pstats.Stats` for "cprofile", which
+        only covers the handler's own steps, or to a list of
+        `tracemalloc.StatisticDiff` for "tracemalloc". Memory is traced process
+        wide, so allocations of tasks running while the handler is suspended
+        are included.
+        """
+        if mode not in _PROFILE_MODES:
+            raise ValueError(f"Coda: mode must be one of {_PROFILE_MODES}")
+        if handler in self._samples:
+            raise ValueError(f"Coda: {handler} is already being sampled")
+        future = asyncio.get_running_loop().create_future()
+        self._samples[handler] = _Sample(mode, calls, future)
+        future.add_done_callback(lambda _: self._samples.pop(handler, None))
+        return future
+
+    def _take_sample(self, target: Callable, name: str) -> Optional[_Sample]:
+        if not self._samples:
+            return None
+        sample = self._samples.get(name) or self._samples.get(
+            getattr(target, "__name__", None)
+        )
+        # Checked and taken in one go (no await in between), so concurrent
+        # invocations cannot overshoot the budget.
+        if sample is None or sample.remaining <= 0 or sample.future.done():
+            return None
+        sample.remaining -= 1
+        sample.active += 1
+        return sample
+
+    def wrap(self, target: Callable, args: tuple, kwargs: dict, describe=None):
+        """
+        Return the coroutine of `target(*args, **kwargs)`, instrumented.
+        `describe` is called for the event name when the invocation is logged.
+        """
+        name = handler_name(target)
+        return self._run(
+            name,
+            target(*args, **kwargs),
+            self._take_sample(target, name),
+            args,
+            kwargs,
+            describe,
+        )
+
+    async def _run(self, name, coro, sample, args, kwargs, describe):
+        stats = self.stats.get(name)
+        if stats is None:
+            stats = self.stats[name] = HandlerStats()
+        profile = sample.profile if sample is not None else None
+        started = perf_counter()
+        cpu = longest = 0.0
+        value, error, failed = None, None, False
+        try:
+            while True:
+                step_started, step_cpu = perf_counter(), thread_time()
+                if profile is not None:
+                    profile.enable()
+                try:
+                    if error is not None:
+                        yielded = coro.throw(error)
+                    else:
+                        yielded = coro.send(value)
+                except StopIteration as stop:
+                    return stop.value
+                except Exception:
+                    failed = True
+                    raise
+                finally:
+                    if profile is not None:
+                        profile.disable()
+                    cpu += thread_time() - step_cpu
+                    longest = max(longest, perf_counter() - step_started)
+                try:
+                    value, error = await _forward(yielded), None
+                except BaseException as exc:
+                    value, error = None, exc
+        finally:
+            coro.close()
+            wall = perf_counter() - started
+            stats.calls += 1
+            stats.errors += failed
+            stats.wall += wall
+            stats.cpu += cpu
+            stats.max_wall = max(stats.max_wall, wall)
+            stats.longest_step = max(stats.longest_step, longest)
+            if sample is not None:
+                sample.active -= 1
+                if sample.remaining <= 0 and not sample.active:
+                    sample.finish()
+            if wall >= self.slow_threshold or longest >= self.blocking_threshold:
+                self._report(name, wall, cpu, longest, args, kwargs, describe)
+
+    def _report(self, name, wall, cpu, longest, args, kwargs, describe) -> None:
+        payload = ", ".join(
+            [_summarize(arg) for arg in args]
+            + [f"{key}={_summarize(value)}" for key, value in kwargs.items()]
+        )
+        _log.warning(
+            "Slow handler %s (event %s): %.1fms wall, %.1fms CPU, longest step %.1fms; payload: %s",
+            name,
+            (describe() if describe is not None else None) or "?",
+            wall * 1000,
+            cpu * 1000,
+            longest * 1000,
+            payload,
+            extra={"handler": name, "wall": wall, "cpu": cpu, "longest_step": longest},
+        )
+
+    def report(self, top: int = 10, key: str = "cpu") -> List[str]:
+        """
+        The `top` handlers sorted by one of the `HandlerStats` fields, as lines
+        of text.
+        """
+        ranked = sorted(
+            self.stats.items(), key=lambda item: getattr(item[1], key), reverse=True
+        )
+        return [
+            f"{name}: {stats.calls} calls, {stats.errors} errors, "
+            f"{stats.wall * 1000:.1f}ms wall, {stats.cpu * 1000:.1f}ms CPU, "
+            f"max {stats.max_wall * 1000:.1f}ms, longest step {stats.longest_step * 1000:.1f}ms"
+            for name, stats in ranked[:top]
+        ]
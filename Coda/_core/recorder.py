@@ -0,0 +1,65 @@
+import struct
+import time
+from typing import Iterator, Tuple
+
+__header__ = b"CODAREC1"
+
+# offset (seconds since recording start), frame kind, payload length
+_RECORD = struct.Struct("<dBI")
+
+FRAME_TEXT = 0
+FRAME_BINARY = 1
+# Written when the shard opens a new gateway connection; the zlib stream of the
+# frames that follow starts from a fresh context.
+FRAME_RESET = 2
+
+
+class GatewayRecorder:
+    """
+    Records raw gateway frames, exactly as received (still zlib-compressed when
+    transport compression is on), together with their arrival time.
+
+    Start the recording before the shard connects, otherwise the compressed
+    stream cannot be decoded on replay.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.frames = 0
+        self._file = open(path, "wb", buffering=1 << 20)
+        self._file.write(__header__)
+        self._start = time.perf_counter()
+
+    def write(self, binary: bool, data) -> None:
+        if isinstance(data, str):
+            data = data.encode()
+        self._file.write(
+            _RECORD.pack(
+                time.perf_counter() - self._start,
+                FRAME_BINARY if binary else FRAME_TEXT,
+                len(data),
+            )
+        )
+        self._file.write(data)
+        self.frames += 1
+
+    def mark_reset(self) -> None:
+        self._file.write(
+            _RECORD.pack(time.perf_counter() - self._start, FRAME_RESET, 0)
+        )
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+
+
+def read_recording(path: str) -> Iterator[Tuple[float, int, bytes]]:
+    """
+    Iterate over the `(offset, kind, data)` records of a recording file.
+    """
+    with open(path, "rb") as file:
+        if file.read(len(__header__)) != __header__:
+            raise ValueError(f"{path} is not a Coda gateway recording")
+        while header := file.read(_RECORD.size):
+            offset, kind, length = _RECORD.unpack(header)
+            yield offset, kind, file.read(length)
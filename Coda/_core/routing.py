@@ -0,0 +1,111 @@
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from .trie import PrefixTrie
+
+_PLACEHOLDER = re.compile(r"\{(\w+)(?::(\w+))?\}")
+
+# placeholder type -> (pattern, converter)
+_TYPES: Dict[str, Tuple[str, Callable]] = {
+    "str": (r".+?", str),
+    "int": (r"-?\d+", int),
+    "float": (r"-?\d+(?:\.\d+)?", float),
+}
+
+
+class _Template:
+    def __init__(self, template: str, handler: Callable):
+        self.template = template
+        self.handler = handler
+        self.converters: List[Tuple[str, Callable]] = []
+        first = _PLACEHOLDER.search(template)
+        self.prefix = template[: first.start()]
+        pattern = []
+        index = len(self.prefix)
+        for match in _PLACEHOLDER.finditer(template, index):
+            name, kind = match.group(1), match.group(2) or "str"
+            if kind not in _TYPES:
+                raise ValueError(
+                    f"Coda: Unknown placeholder type {kind!r} in custom_id {template!r}"
+                )
+            regex, converter = _TYPES[kind]
+            pattern.append(re.escape(template[index : match.start()]))
+            pattern.append(f"({regex})")
+            self.converters.append((name, converter))
+            index = match.end()
+        pattern.append(re.escape(template[index:]))
+        # Matched from the end of the static prefix, which the trie already checked.
+        self.regex = re.compile("".join(pattern))
+
+    def match(self, custom_id: str) -> Optional[Dict[str, Any]]:
+        match = self.regex.fullmatch(custom_id, len(self.prefix))
+        if match is None:
+            return None
+        return {
+            name: converter(value)
+            for (name, converter), value in zip(self.converters, match.groups())
+        }
+
+
+class CustomIdRouter:
+    """
+    Routes component and modal `custom_id`s to their handlers.
+
+    Plain IDs are matched with one dict lookup. Templates such as
+    `"vote:{poll_id:int}:{choice}"` (placeholder types: str, int, float) are
+    compiled at registration and filed in a `PrefixTrie` under their static
+    prefix, so only the templates whose prefix the ID starts with are tried,
+    longest prefix first. Parsed placeholders are returned as keyword arguments.
+    """
+
+    def __init__(self):
+        self._exact: Dict[str, Callable] = {}
+        self._templates = PrefixTrie()
+        self._template_ids = set()
+
+    def __len__(self) -> int:
+        return len(self._exact) + len(self._template_ids)
+
+    def __contains__(self, custom_id: str) -> bool:
+        return self.match(custom_id) is not None
+
+    def add(self, custom_id: str, handler: Callable) -> None:
+        if not _PLACEHOLDER.search(custom_id):
+            self._exact[custom_id] = handler
+            return
+        template = _Template(custom_id, handler)
+        bucket = self._templates.get(template.prefix)
+        if bucket is None:
+            bucket = []
+            self._templates.insert(template.prefix, bucket)
+        bucket[:] = [t for t in bucket if t.template != custom_id]
+        bucket.append(template)
+        self._template_ids.add(custom_id)
+
+    def remove(self, custom_id: str) -> None:
+        if custom_id in self._exact:
+            del self._exact[custom_id]
+            return
+        if custom_id not in self._template_ids:
+            return
+        self._template_ids.discard(custom_id)
+        prefix = custom_id[: _PLACEHOLDER.search(custom_id).start()]
+        bucket = self._templates.get(prefix)
+        bucket[:] = [t for t in bucket if t.template != custom_id]
+        if not bucket:
+            self._templates.remove(prefix)
+
+    def match(self, custom_id: str) -> Optional[Tuple[Callable, Dict[str, Any]]]:
+        """
+        Return `(handler, kwargs)` for `custom_id`, or None when nothing matches.
+        """
+        handler = self._exact.get(custom_id)
+        if handler is not None:
+            return handler, {}
+        if not self._templates:
+            return None
+        for _, bucket in reversed(list(self._templates.prefixes(custom_id))):
+            for template in bucket:
+                kwargs = template.match(custom_id)
+                if kwargs is not None:
+                    return template.handler, kwargs
+        return None
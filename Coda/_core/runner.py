@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import os
+import signal
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Iterable, Optional
+import orjson
+from .batching import MessageBatcher
+from .health import lag_monitor
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+_log = logging.getLogger("coda.runner")
+
+# Any close code but 1000 and 1001 keeps the Discord session alive for a while,
+# so the next start can resume it instead of identifying again.
+RESUMABLE_CLOSE_CODE = 4000
+
+
+def new_event_loop(use_uvloop: bool = True) -> asyncio.AbstractEventLoop:
+    """
+    A uvloop event loop when uvloop is installed (and wanted), else asyncio's.
+    """
+    if use_uvloop and uvloop is not None:
+        return uvloop.new_event_loop()
+    return asyncio.new_event_loop()
+
+
+def load_sessions(path: Optional[str], shards: Iterable) -> None:
+    """
+    Restore the gateway sessions saved by `save_sessions`, so the shards resume
+    them on connect.
+    """
+    if not path or not os.path.exists(path):
+        return
+    try:
+        with open(path, "rb") as file:
+            states = orjson.loads(file.read())
+    except (OSError, orjson.JSONDecodeError):
+        return
+    for shard in shards:
+        state = states.get(str(shard.shard_id))
+        if state is not None:
+            shard.restore_session(state)
+            _log.info(
+                "Shard %s resuming session %s", shard.shard_id, state["session_id"]
+            )
+
+
+def save_sessions(path: Optional[str], shards: Iterable) -> None:
+    """
+    Write the `{shard_id: session_state}` map of the shards to `path`.
+    """
+    if not path:
+        return
+    states = {}
+    for shard in shards:
+        state = shard.session_state()
+        if state is not None:
+            states[str(shard.shard_id)] = state
+    with open(path, "wb") as file:
+        file.write(orjson.dumps(states, option=orjson.OPT_INDENT_2))
+
+
+async def shutdown(client, shards: Iterable) -> None:
+    """
+    Flush pending batched messages, close every gateway connection with a
+    resumable close code (saving the sessions to the client's `session_file`)
+    and close the HTTP session.
+    """
+    shards = list(shards)
+    await MessageBatcher.flush_all()
+    for shard in shards:
+        shard._cancel_tasks()
+        if shard.ws is not None and not shard.ws.closed:
+            await shard.ws.close(code=RESUMABLE_CLOSE_CODE)
+    save_sessions(getattr(client, "_session_file", None), shards)
+    lag_monitor.stop()
+    if client.session is not None and not client.session.closed:
+        await client.session.close()
+    _log.info("Client stopped.")
+
+
+async def _serve(
+    client,
+    shards: Callable[[], Iterable],
+    setup: Optional[Callable[..., Awaitable]],
+    stop_with_connection: bool,
+) -> None:
+    loop = asyncio.get_running_loop()
+    stopping = asyncio.Event()
+    handled = []
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stopping.set)
+            handled.append(sig)
+        except (NotImplementedError, RuntimeError):
+            # No loop signal handlers on Windows, Ctrl+C raises KeyboardInterrupt
+            # out of run_until_complete and the task is cancelled instead.
+            pass
+    try:
+        await client.register()
+        if setup is not None:
+            await setup(client)
+        load_sessions(getattr(client, "_session_file", None), shards())
+        connection = loop.create_task(client.connect())
+        stopper = loop.create_task(stopping.wait())
+        await asyncio.wait((connection, stopper), return_when=asyncio.FIRST_COMPLETED)
+        if connection.done() and connection.exception() is not None:
+            raise connection.exception()
+        if not stop_with_connection:
+            await stopper
+        _log.info("Shutting down.")
+        stopper.cancel()
+        connection.cancel()
+    finally:
+        for sig in handled:
+            loop.remove_signal_handler(sig)
+        await shutdown(client, shards())
+
+
+def _cancel_all(loop: asyncio.AbstractEventLoop) -> None:
+    tasks = asyncio.all_tasks(loop)
+    for task in tasks:
+        task.cancel()
+    loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+
+
+def run(
+    client,
+    shards: Callable[[], Iterable],
+    setup: Optional[Callable[..., Awaitable]] = None,
+    use_uvloop: bool = True,
+    executor_workers: Optional[int] = None,
+    stop_with_connection: bool = False,
+) -> None:
+    """
+    Run `client` on a new event loop until SIGINT/SIGTERM, then shut it down
+    gracefully. See `Client.run`.
+    """
+    loop = new_event_loop(use_uvloop)
+    asyncio.set_event_loop(loop)
+    if executor_workers is not None:
+        loop.set_default_executor(
+            ThreadPoolExecutor(executor_workers, thread_name_prefix="coda")
+        )
+    _log.debug("Running on %s", type(loop).__module__)
+    try:
+        loop.run_until_complete(_serve(client, shards, setup, stop_with_connection))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        try:
+            _cancel_all(loop)
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.run_until_complete(loop.shutdown_default_executor())
+        finally:
+            asyncio.set_event_loop(None)
+            loop.close()
@@ -1,35 +1,66 @@
 # shard_manager.pyx
 # cython: language_level=3
 import asyncio
+import logging
 from aiohttp import ClientSession
-from colorama import Fore
 from typing import Union, Iterable
-from ._core.ws import FetchClientData, WebSocket
+from ._core.ws import FetchClientData, FetchGatewayBot, WebSocket
+from ._core.http import set_base_url
+from ._core.log import _default_logging
+from ._core.profiling import HandlerProfiler
+from ._core.snowflake import shard_for
+from ._core.runner import run as _run
+
+_log = logging.getLogger("coda.sharding")
 
 cdef class ShardedClient:
-    cdef public str prefix, _auth
-    cdef public object intents, shards, session
+    cdef public str _auth
+    cdef public object prefix, intents, shards, session
+    cdef public object _prefix_resolver, _sync_cache, shard_ids, _shard_map
+    cdef public object _session_file
+    cdef public double _guilds_ready_timeout
+    cdef public bint _mention_prefix
     cdef public int shard_count
     cdef public bint _debug
     cdef public bint _compress
+    cdef public bint _lazy_guilds
 
     def __init__(
         self,
         token: str,
         intents: Union[Iterable[Intents], int],
-        prefix: str,
+        prefix: Union[str, Iterable[str]],
         shard_count: int,
         debug: bool = False,
         compress: bool = True,
         session: ClientSession = None,
+        lazy_guilds: bool = False,
+        base_url: str = None,
+        prefix_resolver: callable = None,
+        mention_prefix: bool = False,
+        sync_cache: str = None,
+        shard_ids: Iterable[int] = None,
+        session_file: str = None,
+        guilds_ready_timeout: float = 2.0,
     ):
+        self._session_file = session_file
+        self._guilds_ready_timeout = guilds_ready_timeout
         self.intents = intents
         self.prefix = prefix
+        self._prefix_resolver = prefix_resolver
+        self._mention_prefix = mention_prefix
+        self._sync_cache = sync_cache
         self.shard_count = shard_count
+        self.shard_ids = list(shard_ids) if shard_ids is not None else None
         self._debug = debug
+        _default_logging(debug)
         self._compress = compress
+        self._lazy_guilds = lazy_guilds
+        if base_url:
+            set_base_url(base_url)
         self.session = session
         self.shards = []
+        self._shard_map = {}
         self._auth = f"Bot {token}"
 
     async def register(self):
@@ -39,12 +70,22 @@ cdef class ShardedClient:
                     "content-type": "application/json",  
                 })
         gatway_data, client_info = await FetchClientData(self.session, self._auth)
-        for shard_id in range(self.shard_count):
+        if not self.shard_count:
+            self.shard_count = (await FetchGatewayBot(self.session, self._auth))["shards"]
+        shard_ids = self.shard_ids if self.shard_ids is not None else range(self.shard_count)
+        if any(not 0 <= shard_id < self.shard_count for shard_id in shard_ids):
+            raise ValueError(f"Coda: Shard IDs must be between 0 and {self.shard_count - 1}")
+        for shard_id in shard_ids:
             shard = WebSocket(
                 intents=self.intents,
                 prefix=self.prefix,
                 debug=self._debug,
                 compress=self._compress,
+                lazy_guilds=self._lazy_guilds,
+                guilds_ready_timeout=self._guilds_ready_timeout,
+                prefix_resolver=self._prefix_resolver,
+                mention_prefix=self._mention_prefix,
+                sync_cache=self._sync_cache,
                 _gateway_data=gatway_data,
                 _client_info=client_info,
                 _shard_id=shard_id,
@@ -53,11 +94,28 @@ cdef class ShardedClient:
                 auth=self._auth,
             )
             self.shards.append(shard)
+            self._shard_map[shard_id] = shard
 
-    async def connect(self, grace_period: int = 3):
+    async def connect(self, grace_period: int = 3, sync_app_commands: bool = True):
+        if sync_app_commands and self.shards:
+            await self.shards[0].sync_commands()
         for shard in self.shards:
-            asyncio.create_task(shard.connect())
+            asyncio.create_task(shard.connect(sync_app_commands=False))
             await asyncio.sleep(grace_period)
+    def run(self, setup=None, use_uvloop: bool = True, executor_workers: int = None):
+        _run(self, lambda: self.shards, setup, use_uvloop, executor_workers)
+
+    def health(self):
+        return {shard.shard_id: shard.health() for shard in self.shards}
+
+    def shard_for(self, guild_id):
+        return self._shard_map.get(shard_for(guild_id, self.shard_count))
+
+    def profile_handlers(self, slow_threshold: float = 1.0, blocking_threshold: float = 0.05):
+        profiler = HandlerProfiler(slow_threshold, blocking_threshold)
+        for shard in self.shards:
+            shard.profile_handlers(profiler=profiler)
+        return profiler
     async def stop_shard(self, shard: WebSocket_Handler):
         shard._keep_alive_task.cancel()
         await shard.ws.close()
@@ -67,8 +125,9 @@ cdef class ShardedClient:
             await shard.ws.close()
     async def stop(self):
         for shard in self.shards:
+            shard._cancel_tasks()
             if shard.ws is not None:
                 await shard.ws.close()
         if self.session is not None:
             await self.session.close()
-        print(f"coda: {Fore.RED}All shards stopped.{Fore.RESET}")
\ No newline at end of file
+        _log.info("All shards stopped.")
\ No newline at end of file
@@ -0,0 +1,37 @@
+from typing import Union
+
+# Discord epoch (2015-01-01) in milliseconds, for snowflake timestamps.
+DISCORD_EPOCH = 1420070400000
+
+SnowflakeLike = Union[int, str]
+
+
+def snowflake(value: SnowflakeLike) -> int:
+    """
+    An ID as an int, whether Discord sent it as a string or the user passed an
+    int. Caches are keyed by these so both forms find the same entry.
+    """
+    return value if type(value) is int else int(value)
+
+
+def snowflake_time(value: SnowflakeLike) -> float:
+    """
+    Creation time of a snowflake as a Unix timestamp in seconds.
+    """
+    return ((snowflake(value) >> 22) + DISCORD_EPOCH) / 1000
+
+
+def time_snowflake(timestamp: float, high: bool = False) -> int:
+    """
+    The lowest snowflake created at `timestamp` (Unix seconds), or the highest
+    with `high`, for `before`/`after` bounds in pagination.
+    """
+    value = (int(timestamp * 1000) - DISCORD_EPOCH) << 22
+    return value | 0x3FFFFF if high else value
+
+
+def shard_for(guild_id: SnowflakeLike, shard_count: int) -> int:
+    """
+    The ID of the shard that receives the events of a guild.
+    """
+    return (snowflake(guild_id) >> 22) % shard_count
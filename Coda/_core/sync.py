@@ -0,0 +1,89 @@
+import hashlib
+import os
+import orjson
+from typing import Any, Dict, List, Optional
+
+# Scope key of global commands; guild-scoped commands are keyed by guild ID.
+GLOBAL_SCOPE = "global"
+
+
+def command_payloads(tree: Dict[str, dict]) -> Dict[str, List[dict]]:
+    """
+    Split the slash command registration tree into the bulk-overwrite payload of
+    every scope (global or one guild).
+    """
+    scopes: Dict[str, List[dict]] = {}
+    for data in tree.values():
+        payload = {
+            "name": data["name"],
+            "description": data["description"],
+            "type": 1,  # Chat Input
+            "options": data["options"],
+        }
+        for scope in data.get("guild_ids") or (GLOBAL_SCOPE,):
+            scopes.setdefault(str(scope), []).append(payload)
+    return scopes
+
+
+def _normalize_option(option: Dict[str, Any]) -> dict:
+    normalized = {
+        "type": option["type"],
+        "name": option["name"],
+        "description": option.get("description", ""),
+        "required": bool(option.get("required", False)),
+    }
+    if option.get("choices"):
+        normalized["choices"] = [
+            {"name": choice["name"], "value": choice["value"]}
+            for choice in option["choices"]
+        ]
+    if option.get("autocomplete"):
+        normalized["autocomplete"] = True
+    if option.get("options"):
+        normalized["options"] = [_normalize_option(o) for o in option["options"]]
+    return normalized
+
+
+def normalize_commands(commands: List[Dict[str, Any]]) -> List[dict]:
+    """
+    Reduce commands (local payloads or the API's answer, which carries ids,
+    versions and defaults) to the fields Coda registers, in a stable order.
+    """
+    return sorted(
+        (
+            {
+                "type": command.get("type", 1),
+                "name": command["name"],
+                "description": command.get("description", ""),
+                "options": [_normalize_option(o) for o in command.get("options") or ()],
+            }
+            for command in commands
+        ),
+        key=lambda command: (command["type"], command["name"]),
+    )
+
+
+def commands_hash(commands: List[Dict[str, Any]]) -> str:
+    return hashlib.sha256(
+        orjson.dumps(normalize_commands(commands), option=orjson.OPT_SORT_KEYS)
+    ).hexdigest()
+
+
+def load_sync_cache(path: Optional[str]) -> Dict[str, str]:
+    """
+    Read the `{scope: hash}` map written by the last successful sync.
+    """
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "rb") as file:
+            return orjson.loads(file.read())
+    except (OSError, orjson.JSONDecodeError):
+        return {}
+
+
+def save_sync_cache(path: Optional[str], hashes: Dict[str, str]) -> None:
+    if not path:
+        return
+    with open(path, "wb") as file:
+        file.write(orjson.dumps(hashes, option=orjson.OPT_INDENT_2))
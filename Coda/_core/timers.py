@@ -0,0 +1,82 @@
+import asyncio
+import logging
+from math import ceil
+from typing import Callable, Dict, Hashable, List, Tuple
+
+_log = logging.getLogger("coda.timers")
+
+
+class TimerWheel:
+    """
+    Hashed timer wheel: every timeout lives in one of `slots` buckets and a
+    single task advances the wheel once per `resolution` seconds, so scheduling,
+    rescheduling and cancelling are O(1) and thousands of pending timeouts cost
+    one sleeping task instead of one each.
+
+    Callbacks are plain callables run on the event loop; they fire up to one
+    `resolution` late.
+    """
+
+    def __init__(self, resolution: float = 1.0, slots: int = 512):
+        self.resolution = resolution
+        self._slots: List[Dict[Hashable, Tuple[int, Callable]]] = [
+            {} for _ in range(slots)
+        ]
+        self._where: Dict[Hashable, int] = {}
+        self._cursor = 0
+        self._task = None
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._where
+
+    def schedule(self, key: Hashable, delay: float, callback: Callable) -> None:
+        """
+        Call `callback()` in `delay` seconds, replacing any timer set for `key`.
+        """
+        self.cancel(key)
+        ticks = max(1, ceil(delay / self.resolution))
+        slot = (self._cursor + ticks) % len(self._slots)
+        self._slots[slot][key] = ((ticks - 1) // len(self._slots), callback)
+        self._where[key] = slot
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def cancel(self, key: Hashable) -> bool:
+        slot = self._where.pop(key, None)
+        if slot is None:
+            return False
+        del self._slots[slot][key]
+        return True
+
+    def _advance(self) -> None:
+        self._cursor = (self._cursor + 1) % len(self._slots)
+        bucket = self._slots[self._cursor]
+        expired = []
+        for key, (rounds, callback) in bucket.items():
+            if rounds:
+                bucket[key] = (rounds - 1, callback)
+            else:
+                expired.append((key, callback))
+        for key, callback in expired:
+            del bucket[key]
+            del self._where[key]
+            try:
+                callback()
+            except Exception as error:
+                _log.exception("Timer callback for %r failed: %s", key, error)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time()
+        while self._where:
+            deadline += self.resolution
+            await asyncio.sleep(max(0.0, deadline - loop.time()))
+            # Catch up on ticks missed while the loop was blocked.
+            while True:
+                self._advance()
+                if loop.time() < deadline + self.resolution or not self._where:
+                    break
+                deadline += self.resolution
@@ -0,0 +1,80 @@
+from typing import Any, Iterator, Optional, Tuple
+
+# Terminal marker; never collides with a key character since those are 1-length.
+_END = ""
+
+
+class PrefixTrie:
+    """
+    A character trie mapping string keys to values, used for prefix lookups
+    (command prefixes, custom_id templates).
+
+    `root` is exposed so hot paths can reject text in a single first-character
+    membership test before walking the trie.
+    """
+
+    def __init__(self):
+        self.root: dict = {}
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __bool__(self) -> bool:
+        return self._size > 0
+
+    def insert(self, key: str, value: Any) -> None:
+        node = self.root
+        for char in key:
+            node = node.setdefault(char, {})
+        if _END not in node:
+            self._size += 1
+        node[_END] = value
+
+    def remove(self, key: str) -> None:
+        path = []
+        node = self.root
+        for char in key:
+            if char not in node:
+                return
+            path.append((node, char))
+            node = node[char]
+        if _END not in node:
+            return
+        del node[_END]
+        self._size -= 1
+        for parent, char in reversed(path):
+            if parent[char]:
+                break
+            del parent[char]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        node = self.root
+        for char in key:
+            node = node.get(char)
+            if node is None:
+                return default
+        return node.get(_END, default)
+
+    def prefixes(self, text: str) -> Iterator[Tuple[int, Any]]:
+        """
+        Yield `(length, value)` for every key that is a prefix of `text`, shortest first.
+        """
+        node = self.root
+        if _END in node:
+            yield 0, node[_END]
+        for index, char in enumerate(text):
+            node = node.get(char)
+            if node is None:
+                return
+            if _END in node:
+                yield index + 1, node[_END]
+
+    def longest_prefix(self, text: str) -> Optional[Tuple[int, Any]]:
+        """
+        Return `(length, value)` for the longest key that is a prefix of `text`.
+        """
+        match = None
+        for match in self.prefixes(text):
+            pass
+        return match
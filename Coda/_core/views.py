@@ -0,0 +1,257 @@
+import asyncio
+import itertools
+import secrets
+from typing import Callable, Dict, List, Optional, Union
+from .components import ActionRow, Button, BaseSelect, SelectOption, StringSelect
+from .constants import ButtonStyle
+from .metrics import CACHE_SIZE
+from .timers import TimerWheel
+
+# custom_ids of view components are "~<view id>:<item>", so they never collide
+# with IDs routed by `WebSocket.component`.
+VIEW_PREFIX = "~"
+
+# Per-process tag keeps the IDs of short-lived views from colliding with those
+# left on messages by a previous run.
+_process_tag = secrets.token_hex(3)
+_view_ids = itertools.count(1)
+
+
+class View:
+    """
+    A set of components bound to handlers, scoped to the message(s) the view is
+    sent with (`send(..., view=view)`).
+
+    The view and its handlers are dropped once `timeout` seconds pass without an
+    interaction (None disables expiry) or when `stop()` is called. Handlers are
+    called as `handler(interaction)`.
+    """
+
+    def __init__(self, timeout: Optional[float] = 180.0):
+        self.timeout = timeout
+        self.id = f"{next(_view_ids):x}{_process_tag}"
+        self.rows: List[ActionRow] = []
+        self.message = None
+        self._handlers: Dict[str, Callable] = {}
+        self._components: Dict[str, Union[Button, BaseSelect]] = {}
+        self._on_timeout: Optional[Callable] = None
+        self._store: Optional["ViewStore"] = None
+
+    def add_item(
+        self,
+        component: Union[Button, BaseSelect],
+        callback: Callable = None,
+        row: int = None,
+    ) -> "View":
+        """
+        Add a component, routed to `callback`. Link buttons take no callback.
+
+        Buttons fill the last row (up to 5 per row), selects take a row of their
+        own unless `row` says otherwise.
+        """
+        if callback is not None:
+            key = component.custom_id or str(len(self._handlers))
+            self._handlers[key] = callback
+            self._components[key] = component
+            component.custom_id = f"{VIEW_PREFIX}{self.id}:{key}"
+        if row is None:
+            last = self.rows[-1].components if self.rows else None
+            if (
+                last is None
+                or len(last) >= 5
+                or isinstance(component, BaseSelect)
+                or isinstance(last[0], BaseSelect)
+            ):
+                row = len(self.rows)
+            else:
+                row = len(self.rows) - 1
+        if row >= 5:
+            raise ValueError("Coda: A message holds at most 5 action rows")
+        while len(self.rows) <= row:
+            self.rows.append(ActionRow())
+        self.rows[row].add_component(component)
+        return self
+
+    def button(
+        self,
+        label: str = None,
+        style: ButtonStyle = ButtonStyle.PRIMARY,
+        emoji: dict = None,
+        disabled: bool = False,
+        row: int = None,
+        custom_id: str = None,
+    ):
+        """
+        Decorator adding a button routed to the decorated handler.
+        """
+
+        def wrapper(coro: Callable):
+            self.add_item(
+                Button(
+                    label=label,
+                    custom_id=custom_id,
+                    style=style,
+                    emoji=emoji,
+                    disabled=disabled,
+                ),
+                coro,
+                row,
+            )
+            return coro
+
+        return wrapper
+
+    def select(
+        self,
+        options: List[SelectOption],
+        placeholder: str = None,
+        min_values: int = 1,
+        max_values: int = 1,
+        row: int = None,
+        custom_id: str = None,
+    ):
+        """
+        Decorator adding a string select routed to the decorated handler.
+        """
+
+        def wrapper(coro: Callable):
+            self.add_item(
+                StringSelect(
+                    custom_id=custom_id,
+                    options=options,
+                    placeholder=placeholder,
+                    min_values=min_values,
+                    max_values=max_values,
+                ),
+                coro,
+                row,
+            )
+            return coro
+
+        return wrapper
+
+    def on_timeout(self, coro: Callable):
+        """
+        Decorator to register a coroutine called (without arguments) when the view expires.
+        """
+        self._on_timeout = coro
+        return coro
+
+    def _rebind(self, view_id: str) -> None:
+        self.id = view_id
+        for key, component in self._components.items():
+            component.custom_id = f"{VIEW_PREFIX}{view_id}:{key}"
+
+    def stop(self) -> None:
+        """
+        Stop routing interactions to this view and drop its handlers.
+        """
+        if self._store is not None:
+            self._store.remove(self.id)
+
+
+class ViewStore:
+    """
+    Live views by ID, with their expiry managed by one `TimerWheel`.
+
+    Persistent views are rebuilt on demand: a factory registered under a name
+    (see `persistent_view`) is called with the key encoded in the custom_id the
+    first time a component of a view that is not live any more is used, e.g.
+    after a restart.
+    """
+
+    def __init__(self, wheel: TimerWheel = None):
+        self.wheel = wheel if wheel is not None else TimerWheel()
+        self._views: Dict[str, View] = {}
+        self._factories: Dict[str, Callable[[str], View]] = {}
+
+    def __len__(self) -> int:
+        return len(self._views)
+
+    def add(self, view: View) -> View:
+        self._views[view.id] = view
+        view._store = self
+        self._touch(view)
+        return view
+
+    def remove(self, view_id: str) -> Optional[View]:
+        view = self._views.pop(view_id, None)
+        if view is not None:
+            self.wheel.cancel(view_id)
+            view._store = None
+        return view
+
+    def register(self, name: str, factory: Callable[[str], View]) -> None:
+        if "." in name or ":" in name:
+            raise ValueError("Coda: Persistent view names cannot contain '.' or ':'")
+        self._factories[name] = factory
+
+    def _touch(self, view: View) -> None:
+        if view.timeout is not None:
+            self.wheel.schedule(view.id, view.timeout, lambda: self._expire(view.id))
+
+    def _expire(self, view_id: str) -> None:
+        view = self.remove(view_id)
+        if view is not None and view._on_timeout is not None:
+            asyncio.get_running_loop().create_task(view._on_timeout())
+
+    def get(self, view_id: str) -> Optional[View]:
+        view = self._views.get(view_id)
+        if view is None and "." in view_id:
+            name, _, key = view_id.partition(".")
+            factory = self._factories.get(name)
+            if factory is not None:
+                view = factory(key)
+                view._rebind(view_id)
+                self.add(view)
+        return view
+
+    def resolve(self, custom_id: str) -> Optional[Callable]:
+        """
+        Return the handler of a view component's custom_id, or None when its view
+        expired or is unknown. Using a view resets its timeout.
+        """
+        view_id, _, key = custom_id[len(VIEW_PREFIX) :].partition(":")
+        view = self.get(view_id)
+        if view is None:
+            return None
+        handler = view._handlers.get(key)
+        if handler is not None:
+            self._touch(view)
+        return handler
+
+
+def attach_view(components: Optional[List[ActionRow]], view: View) -> List[ActionRow]:
+    """
+    Start routing `view` and return the components of a message sent with it.
+    """
+    _view_store.add(view)
+    return (components or []) + view.rows
+
+
+# Shared by every shard of the process: a click can reach any of them.
+_view_store = ViewStore()
+CACHE_SIZE.labels("*", "views").set_function(lambda: len(_view_store))
+
+
+def persistent_view(name: str):
+    """
+    Decorator registering a factory of persistent views.
+
+    The factory takes a key (any string without ':', such as a ticket ID) and
+    returns a `View` (usually with `timeout=None`). Calling the decorated
+    factory builds a view whose custom_ids carry the name and key, so after a
+    restart the view is rebuilt through the factory when it is next used.
+    """
+
+    def wrapper(factory: Callable[[str], View]):
+        _view_store.register(name, factory)
+
+        def build(key: str) -> View:
+            view = factory(key)
+            view._rebind(f"{name}.{key}")
+            return view
+
+        return build
+
+    return wrapper
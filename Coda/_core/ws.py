@@ -1,11 +1,13 @@
 import asyncio
+import logging
+import weakref
 from aiohttp import ClientSession, ClientConnectionError, WSMsgType
 import zlib
+from functools import partial
+from time import perf_counter
 import orjson
 from os import name as os_name
-from colorama import Fore
-from typing import Union, Iterable, List, NoReturn
-from datetime import datetime, UTC
+from typing import Any, Awaitable, Callable, Dict, Union, Iterable, List, NoReturn
 from .constants import (
     __base_url__,
     PresenceStatus,
@@ -13,12 +15,108 @@ from .constants import (
     Event,
     Intents,
     InteractionType,
+    ShardHealth,
 )
 from .entities import Guild, Channel, Message
-from .models import PollObject
-from .interactions import Interaction, Option
-from .http import _request
-from .exceptions import UnSufficientArguments
+from .models import Embed, PollObject
+from .exceptions import NotFound
+from .interactions import Interaction, Option, SlashGroup, resolve_command_path
+from .http import _request, set_base_url
+from .recorder import GatewayRecorder
+from .files import File
+from .commands import Command, CommandRouter
+from .routing import CustomIdRouter
+from .views import VIEW_PREFIX, _view_store
+from .log import _default_logging
+from .runner import run as _run
+from .health import DEGRADED_LATENCY, SHARD_HEALTH, lag_monitor
+from .profiling import HandlerProfiler, handler_name
+from .snowflake import SnowflakeLike, shard_for, snowflake
+from .metrics import (
+    CACHE_SIZE,
+    DISPATCH_LATENCY,
+    GATEWAY_EVENTS,
+    HANDLER_DURATION,
+    HANDLER_ERRORS,
+    HEARTBEAT_RTT,
+    RECONNECTS,
+)
+from .sync import (
+    GLOBAL_SCOPE,
+    command_payloads,
+    commands_hash,
+    load_sync_cache,
+    save_sync_cache,
+)
+
+_log = logging.getLogger("coda.gateway")
+_shard_log = logging.getLogger("coda.sharding")
+_interactions_log = logging.getLogger("coda.interactions")
+_commands_log = logging.getLogger("coda.commands")
+_dispatch_log = logging.getLogger("coda.dispatch")
+
+# Duration histogram and error counter of each handler, by handler name.
+_handler_metrics = {}
+
+
+def _handler_done(metrics: tuple, started: float, task: asyncio.Task) -> None:
+    metrics[0].observe(perf_counter() - started)
+    if not task.cancelled() and task.exception() is not None:
+        metrics[1].inc()
+        _dispatch_log.error(
+            "Handler %s failed: %s",
+            metrics[2],
+            task.exception(),
+            exc_info=task.exception(),
+        )
+
+
+def _weak_gauge(gauge, labels: tuple, shard, read: Callable) -> tuple:
+    """
+    Read a gauge of `shard` through a weak reference, so the metrics registry
+    does not keep the shard alive. Returns what `_drop_gauges` takes.
+    """
+    ref = weakref.ref(shard)
+
+    def function() -> float:
+        shard = ref()
+        return read(shard) if shard is not None else 0.0
+
+    gauge.labels(*labels).set_function(function)
+    return gauge, labels, function
+
+
+def _drop_gauges(gauges: List[tuple]) -> None:
+    for gauge, labels, function in gauges:
+        gauge.remove(*labels, function=function)
+
+
+# Guild events carry their guild's ID as "id" instead of "guild_id".
+_GUILD_EVENTS = frozenset({"GUILD_CREATE", "GUILD_UPDATE", "GUILD_DELETE"})
+
+# Dispatch events `_ws_loop` builds entities or updates caches for. Anything
+# else only reaches raw handlers registered through `WebSocket.on_raw`.
+_HANDLED_DISPATCHES = frozenset(
+    {
+        "READY",
+        "MESSAGE_CREATE",
+        "MESSAGE_UPDATE",
+        "MESSAGE_DELETE",
+        "INTERACTION_CREATE",
+        "GUILD_CREATE",
+        "GUILD_UPDATE",
+        "GUILD_DELETE",
+        "GUILD_ROLE_CREATE",
+        "GUILD_ROLE_UPDATE",
+        "GUILD_ROLE_DELETE",
+        "GUILD_MEMBER_ADD",
+        "GUILD_MEMBER_UPDATE",
+        "GUILD_MEMBER_REMOVE",
+        "CHANNEL_CREATE",
+        "CHANNEL_UPDATE",
+        "CHANNEL_DELETE",
+    }
+)
 
 
 class Reloop(Exception):
@@ -40,6 +138,15 @@ async def FetchClientData(session: ClientSession, auth: str):
     return data1, data2
 
 
+async def FetchGatewayBot(session: ClientSession, auth: str) -> dict:
+    """
+    The bot's gateway URL, recommended shard count and session start limits.
+    """
+    return await _request(
+        session, "GET", f"{__base_url__}gateway/bot", headers={"Authorization": auth}
+    )
+
+
 class ShardedClient:
     """
     WARNING:
@@ -51,19 +158,45 @@ class ShardedClient:
         self,
         token: str,
         intents: Union[Iterable[Intents], int],
-        prefix: str,
+        prefix: Union[str, Iterable[str]],
         shard_count: int,
         debug: bool = False,
         compress: bool = True,
         session: ClientSession = None,
+        lazy_guilds: bool = False,
+        base_url: str = None,
+        prefix_resolver: callable = None,
+        mention_prefix: bool = False,
+        sync_cache: str = None,
+        shard_ids: Iterable[int] = None,
+        session_file: str = None,
+        guilds_ready_timeout: float = 2.0,
     ):
+        """
+        `shard_count` 0 uses the count Discord recommends. `shard_ids` limits
+        this process to some of the shards (e.g. one cluster of a larger bot),
+        by default it runs all of them. `session_file` is where `run()` saves
+        the shards' gateway sessions on shutdown, to resume them on the next
+        start.
+        """
+        self._session_file = session_file
         self.intents = intents
         self.prefix = prefix
+        self._prefix_resolver = prefix_resolver
+        self._mention_prefix = mention_prefix
+        self._sync_cache = sync_cache
         self.shard_count = shard_count
+        self.shard_ids = list(shard_ids) if shard_ids is not None else None
         self._debug = debug
+        _default_logging(debug)
         self._compress = compress
+        self._lazy_guilds = lazy_guilds
+        self._guilds_ready_timeout = guilds_ready_timeout
+        if base_url:
+            set_base_url(base_url)
         self.session = session
         self.shards = []
+        self._shard_map = {}
         self._auth = f"Bot {token}"
 
     async def register(self):
@@ -71,8 +204,8 @@ class ShardedClient:
         Initialize the shards based on the provided shard count.
         Fetches gateway and client info before spawning WebSocket instances.
         """
-        print(
-            f"{Fore.RED}The python fallback for the Cython sharding implementation is being run.{Fore.RESET}"
+        _shard_log.info(
+            "The python fallback for the Cython sharding implementation is being run."
         )
         if not self.session:
             self.session = ClientSession(
@@ -82,12 +215,28 @@ class ShardedClient:
                 }
             )
         gateway_data, client_info = await FetchClientData(self.session, self._auth)
-        for shard_id in range(self.shard_count):
+        if not self.shard_count:
+            self.shard_count = (await FetchGatewayBot(self.session, self._auth))[
+                "shards"
+            ]
+        shard_ids = (
+            self.shard_ids if self.shard_ids is not None else range(self.shard_count)
+        )
+        if any(not 0 <= shard_id < self.shard_count for shard_id in shard_ids):
+            raise ValueError(
+                f"Coda: Shard IDs must be between 0 and {self.shard_count - 1}"
+            )
+        for shard_id in shard_ids:
             shard = WebSocket(
                 intents=self.intents,
                 prefix=self.prefix,
                 debug=self._debug,
                 compress=self._compress,
+                lazy_guilds=self._lazy_guilds,
+                guilds_ready_timeout=self._guilds_ready_timeout,
+                prefix_resolver=self._prefix_resolver,
+                mention_prefix=self._mention_prefix,
+                sync_cache=self._sync_cache,
                 _gateway_data=gateway_data,
                 _client_info=client_info,
                 _shard_id=shard_id,
@@ -96,27 +245,71 @@ class ShardedClient:
                 auth=self._auth,
             )
             self.shards.append(shard)
+            self._shard_map[shard_id] = shard
 
-    async def connect(self, grace_period: int = 3):
+    async def connect(self, grace_period: int = 3, sync_app_commands: bool = True):
         """
         Start the connection loop for all registered shards.
 
+        Application commands are synced once for the whole cluster (from the first
+        shard's registrations) before any shard connects, not once per shard.
+
         Args:
             grace_period (int): Seconds to wait between starting each shard to avoid identify 429s.
         """
+        if sync_app_commands and self.shards:
+            await self.shards[0].sync_commands()
         for shard in self.shards:
-            asyncio.create_task(shard.connect())
+            asyncio.create_task(shard.connect(sync_app_commands=False))
             await asyncio.sleep(grace_period)
 
+    def profile_handlers(
+        self, slow_threshold: float = 1.0, blocking_threshold: float = 0.05
+    ) -> HandlerProfiler:
+        """
+        Instrument the handlers of every shard with one shared `HandlerProfiler`.
+        Call after `register()`.
+        """
+        profiler = HandlerProfiler(slow_threshold, blocking_threshold)
+        for shard in self.shards:
+            shard.profile_handlers(profiler=profiler)
+        return profiler
+
+    def run(
+        self,
+        setup: Callable[["ShardedClient"], Awaitable] = None,
+        use_uvloop: bool = True,
+        executor_workers: int = None,
+    ) -> None:
+        """
+        Register, connect every shard and run until SIGINT/SIGTERM, see
+        `Client.run`. Register handlers on the shards in `setup(client)`.
+        """
+        _run(self, lambda: self.shards, setup, use_uvloop, executor_workers)
+
+    def health(self) -> Dict[int, ShardHealth]:
+        """
+        The health of every shard, by shard ID (see `WebSocket.health`).
+        """
+        return {shard.shard_id: shard.health() for shard in self.shards}
+
+    def shard_for(self, guild_id: SnowflakeLike) -> Union["WebSocket", None]:
+        """
+        The shard receiving the events of a guild, or None when this process
+        does not run it (see `shard_ids`).
+        """
+        return self._shard_map.get(shard_for(guild_id, self.shard_count))
+
     async def stop(self):
         """
         Stop all shards and close the HTTP session.
         """
         for shard in self.shards:
+            shard._cancel_tasks()
             if shard.ws:
                 await shard.ws.close()
         await self.session.close()
-        print(f"Coda: {Fore.RED}All shards stopped.{Fore.RESET}")
+        _shard_log.info("All shards stopped.")
 
 
 class Webhook:
@@ -129,19 +322,14 @@ class Webhook:
         self.session = session
         self.webhook_url = webhook_url
 
-    async def send(
-        self,
+    @staticmethod
+    def _payload(
         content: str = None,
         username: str = None,
         avatar_url: str = None,
-        embed: dict = None,
-        embeds: list = None,
-    ):
-        """
-        Send a message via the webhook.
-        """
-        if not any([content, username, avatar_url, embed, embeds]):
-            raise Exception("No argument passed")
+        embed: Embed = None,
+        embeds: List[Embed] = None,
+    ) -> dict:
         payload = {}
         if content:
             payload["content"] = content
@@ -149,10 +337,36 @@ class Webhook:
             payload["username"] = username
         if avatar_url:
             payload["avatar_url"] = avatar_url
-        if embeds:
-            payload["embeds"] = embeds
+        if embed or embeds:
+            payload["embeds"] = ([embed.tree] if embed else []) + [
+                embed_item.tree for embed_item in embeds or ()
+            ]
+        return payload
 
-        return await _request(self.session, "POST", self.webhook_url, json=payload)
+    async def send(
+        self,
+        content: str = None,
+        username: str = None,
+        avatar_url: str = None,
+        embed: Embed = None,
+        embeds: List[Embed] = None,
+        files: List[File] = None,
+        wait: bool = False,
+    ):
+        """
+        Send a message via the webhook.
+        With `wait=True` Discord confirms the message and it is returned.
+        """
+        if not any([content, embed, embeds, files]):
+            raise ValueError("No arguments provided")
+        return await _request(
+            self.session,
+            "POST",
+            self.webhook_url,
+            json=self._payload(content, username, avatar_url, embed, embeds),
+            files=files,
+            params={"wait": "true"} if wait else None,
+        )
 
     async def info(self):
         return await _request(self.session, "GET", self.webhook_url)
@@ -164,6 +378,89 @@ class Webhook:
         return True
 
 
+class WebhookPool:
+    """
+    Broadcasts one message to many webhooks concurrently.
+
+    The payload is serialized once and the same bytes are posted to every
+    webhook, at most `concurrency` requests at a time. Every webhook has a rate
+    limit bucket of its own, so a slow or limited target does not hold up the
+    others. Failures are reported per webhook instead of aborting the broadcast.
+    """
+
+    def __init__(
+        self,
+        session: ClientSession,
+        webhook_urls: Iterable[str] = (),
+        concurrency: int = 50,
+        prune_missing: bool = False,
+    ):
+        self.session = session
+        self.webhook_urls = list(dict.fromkeys(webhook_urls))
+        self.prune_missing = prune_missing
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    def __len__(self) -> int:
+        return len(self.webhook_urls)
+
+    def add(self, webhook_url: str) -> None:
+        if webhook_url not in self.webhook_urls:
+            self.webhook_urls.append(webhook_url)
+
+    def remove(self, webhook_url: str) -> None:
+        if webhook_url in self.webhook_urls:
+            self.webhook_urls.remove(webhook_url)
+
+    async def _post(self, webhook_url: str, **kwargs):
+        async with self._semaphore:
+            try:
+                return await _request(self.session, "POST", webhook_url, **kwargs)
+            except NotFound as error:
+                # The webhook (or its channel) was deleted.
+                if self.prune_missing:
+                    self.remove(webhook_url)
+                return error
+            except Exception as error:
+                return error
+
+    async def broadcast(
+        self,
+        content: str = None,
+        username: str = None,
+        avatar_url: str = None,
+        embed: Embed = None,
+        embeds: List[Embed] = None,
+        files: List[File] = None,
+        wait: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Send a message through every webhook of the pool.
+
+        Returns a dict mapping each webhook URL to its result: the response
+        (the message with `wait=True`, else None) or the exception raised for
+        that webhook. With `prune_missing`, webhooks answering 404 are dropped
+        from the pool.
+        """
+        if not any([content, embed, embeds, files]):
+            raise ValueError("No arguments provided")
+        payload = Webhook._payload(content, username, avatar_url, embed, embeds)
+        kwargs = {"params": {"wait": "true"} if wait else None}
+        if files:
+            # Attachments are streamed again for every webhook; the JSON part is
+            # built from the same frozen payload.
+            kwargs.update(json=payload, files=files)
+        else:
+            kwargs.update(
+                data=orjson.dumps(payload),
+                headers={"Content-Type": "application/json"},
+            )
+        webhook_urls = list(self.webhook_urls)
+        results = await asyncio.gather(
+            *(self._post(webhook_url, **kwargs) for webhook_url in webhook_urls)
+        )
+        return dict(zip(webhook_urls, results))
+
+
 class WebSocket:
     """
     Represents a single shard connection to the Discord Gateway.
@@ -173,10 +470,15 @@ class WebSocket:
     def __init__(
         self,
         intents: Union[Iterable[Intents], int],
-        prefix: str,
+        prefix: Union[str, Iterable[str]],
         debug: bool = False,
         compress: bool = True,
         session=None,
+        lazy_guilds: bool = False,
+        guilds_ready_timeout: float = 2.0,
+        prefix_resolver: callable = None,
+        mention_prefix: bool = False,
+        sync_cache: str = None,
         _gateway_data: dict = None,
         _client_info: dict = None,
         _shard_id: int = 0,
@@ -189,6 +491,7 @@ class WebSocket:
             self.intents = intents.value
         self.prefix = prefix
         self._debug = debug
+        _default_logging(debug)
         self.decompressor = zlib.decompressobj() if compress else None
         self.session = session
         if _gateway_data:
@@ -205,29 +508,86 @@ class WebSocket:
             self.bio = ""
         self.shard_id = _shard_id
         self.shard_count = _shard_count
+        self._log = logging.LoggerAdapter(_log, {"shard_id": _shard_id})
         self.kwargs = kwargs
         self._auth = kwargs.get("auth", None)
         self.ws = None
         self._events_tree = {}
-        self._command_tree = {}
+        self._command_router = CommandRouter(
+            prefix, prefix_resolver=prefix_resolver, mention_prefix=mention_prefix
+        )
+        self._command_router.set_user_id(self.id)
         self._slash_commands_tree = {}
+        self._slash_paths = {}
+        self._autocomplete_handlers = {}
         self._polls_tree = {}
-        self._component_handlers = {}
-        self._modal_handlers = {}
+        self._component_handlers = CustomIdRouter()
+        self._modal_handlers = CustomIdRouter()
+        self._raw_events_tree = {}
+        self._dispatch_filter = None
         self._channels = {}
         self._guilds = {}
+        # Lazy guild mode keeps the raw GUILD_CREATE payloads and only builds
+        # the Guild/Channel objects the first time they are looked up.
+        self._lazy_guilds = lazy_guilds
+        self._lazy_guild_payloads = {}
+        self._lazy_channel_index = {}
+        # Role, member and channel events of lazy guilds, applied when the guild
+        # is built: {guild_id: {(kind, entity_id): data, or None once deleted}}.
+        self._lazy_guild_updates = {}
+        self._pending_guilds = set()
+        self._guilds_ready = asyncio.Event()
+        self._guilds_ready_timeout = guilds_ready_timeout
+        self._guilds_ready_task = None
+        self._last_guild_create = 0.0
+        self._recorder = None
+        self._sync_cache = sync_cache
+        self.session_id = None
+        self._last_sequence = None
+        self._resume_gateway_url = None
+        self.latency = None
+        self._heartbeat_sent = None
+        self._event_counters = {}
+        self._dispatch_latency = DISPATCH_LATENCY.labels(_shard_id)
+        self._heartbeat_rtt = HEARTBEAT_RTT.labels(_shard_id)
+        self._reconnects = RECONNECTS.labels(_shard_id)
+        self._profiler = None
+        self._heartbeat_interval = None
+        self._heartbeat_acked = True
+        self._gauges = [
+            _weak_gauge(
+                SHARD_HEALTH, (_shard_id,), self, lambda shard: shard.health().value
+            ),
+            _weak_gauge(
+                CACHE_SIZE,
+                (_shard_id, "guilds"),
+                self,
+                lambda shard: len(shard._guilds) + len(shard._lazy_guild_payloads),
+            ),
+            _weak_gauge(
+                CACHE_SIZE,
+                (_shard_id, "channels"),
+                self,
+                lambda shard: len(shard._channels),
+            ),
+        ]
+        # Shards that are never closed leave the registry once collected.
+        weakref.finalize(self, _drop_gauges, self._gauges)
 
-    async def _create_ws_connection(self):
+    async def _create_ws_connection(self, url: str = None):
+        url = url or self.gateway_url
         self.ws = (
             await self.session.ws_connect(
-                f"{self.gateway_url}/?v=10&encoding=json&compress=zlib-stream",
+                f"{url}/?v=10&encoding=json&compress=zlib-stream",
                 max_msg_size=0,
             )
             if self.decompressor
             else await self.session.ws_connect(
-                f"{self.gateway_url}/?v=10&encoding=json", max_msg_size=0
+                f"{url}/?v=10&encoding=json", max_msg_size=0
             )
         )
+        if self._recorder is not None:
+            self._recorder.mark_reset()
 
     async def _identify(self):
         await self.ws.send_bytes(
@@ -248,24 +608,58 @@ class WebSocket:
             )
         )
 
+    def session_state(self) -> Union[dict, None]:
+        """
+        What the next connection needs to resume this gateway session instead
+        of identifying again, or None before READY.
+        """
+        if self.session_id is None:
+            return None
+        return {
+            "session_id": self.session_id,
+            "seq": self._last_sequence,
+            "resume_gateway_url": self._resume_gateway_url,
+        }
+
+    def restore_session(self, state: dict) -> None:
+        """
+        Make the next `connect()` resume the session of `session_state()`, e.g.
+        one saved by a previous run. Discord does not replay READY or the guild
+        stream on a resume, so caches start empty. If the session expired, the
+        shard identifies again.
+        """
+        self.session_id = state["session_id"]
+        self._last_sequence = state["seq"]
+        self._resume_gateway_url = state["resume_gateway_url"]
+
     async def connect(self, sync_app_commands: bool = True) -> Union[None, NoReturn]:
-        await self._create_ws_connection()
-        await self._identify()
+        if self.session_id is not None:
+            await self._create_ws_connection(self._resume_gateway_url)
+            await self._resume()
+        else:
+            await self._create_ws_connection()
+            await self._identify()
         if sync_app_commands:
             await self.sync_commands()
-        print(
-            f"Coda: {Fore.GREEN}Shard {self.shard_id}/{self.shard_count}{Fore.RESET} connected to the {Fore.GREEN}gateway successfully{Fore.RESET} [{datetime.now(UTC).strftime('%Y-%m-%d %H:%M')}]"
+        self._log.info(
+            "Shard %s/%s connected to the gateway successfully",
+            self.shard_id,
+            self.shard_count,
         )
         if "on_setup" in self._events_tree:
             await self._trigger(self._events_tree["on_setup"])
+        lag_monitor.start()
         await self._ws_loop()
 
     async def _reconnect_to_ws(self) -> None:
+        self._reconnects.inc()
         self._keep_alive_task.cancel()
         await self.ws.close()
         await self._create_ws_connection()
-        print(
-            f"Coda: {Fore.LIGHTGREEN_EX}Shard {self.shard_id}/{self.shard_count} reconnected{Fore.RESET} to the {Fore.GREEN}gateway successfully{Fore.RESET} [{datetime.now(UTC).strftime('%Y-%m-%d %H:%M')}]"
+        self._log.info(
+            "Shard %s/%s reconnected to the gateway successfully",
+            self.shard_id,
+            self.shard_count,
         )
 
     async def _resume(self) -> None:
@@ -281,27 +675,88 @@ class WebSocket:
                 }
             )
         )
-        print(
-            f"Coda: {Fore.LIGHTGREEN_EX}Shard {self.shard_id}/{self.shard_count} resumed connection{Fore.RESET} to the {Fore.GREEN}gateway successfully{Fore.RESET} [{datetime.now(UTC).strftime('%Y-%m-%d %H:%M')}]"
+        self._log.info(
+            "Shard %s/%s resumed connection to the gateway successfully",
+            self.shard_id,
+            self.shard_count,
         )
 
     async def _ws_loop(self) -> None:
+        # Reconnects swap `self.ws` and keep reading here, so `connect()` lasts
+        # as long as the session does.
+        while await self._read_ws():
+            pass
+
+    async def _read_ws(self) -> bool:
+        """
+        Read frames until the connection ends. True when it was replaced by a
+        reconnect (op 7 or 9) and reading should go on with the new one.
+        """
         async for msg in self.ws:
+            received = perf_counter()
+            dispatched = False
             try:
                 if msg.type == WSMsgType.BINARY:
+                    if self._recorder is not None:
+                        self._recorder.write(True, msg.data)
                     data: dict = orjson.loads(self.decompressor.decompress(msg.data))
                 elif msg.type == WSMsgType.TEXT:
+                    if self._recorder is not None:
+                        self._recorder.write(False, msg.data)
                     data: dict = orjson.loads(msg.data)  # No compression
                 elif msg.type == WSMsgType.ERROR:
-                    print(
-                        f"Coda: {Fore.RED}Shard {self.shard_id}/{self.shard_count} websocket error: {msg.data}{Fore.RESET}"
+                    self._log.error(
+                        "Shard %s/%s websocket error: %s",
+                        self.shard_id,
+                        self.shard_count,
+                        msg.data,
                     )
                     break
                 if data["op"] == 0:  # Dispatch
                     self._last_sequence = data["s"]
+                    dispatched = True
+                    counter = self._event_counters.get(data["t"])
+                    if counter is None:
+                        counter = self._event_counters[data["t"]] = (
+                            GATEWAY_EVENTS.labels(self.shard_id, data["t"])
+                        )
+                    counter.inc()
+                    # Session bookkeeping frames are never filtered out.
+                    if self._dispatch_filter and data["t"] not in (
+                        "READY",
+                        "RESUMED",
+                    ):
+                        d = data["d"] or {}
+                        guild_id = d.get("guild_id")
+                        if guild_id is None and data["t"] in _GUILD_EVENTS:
+                            guild_id = d.get("id")
+                        channel_id = d.get("channel_id")
+                        if not self._dispatch_filter(
+                            data["t"],
+                            None if guild_id is None else snowflake(guild_id),
+                            None if channel_id is None else snowflake(channel_id),
+                        ):
+                            continue
+                    if data["t"] in self._raw_events_tree:
+                        await self._trigger(self._raw_events_tree[data["t"]], data["d"])
+                    if data["t"] not in _HANDLED_DISPATCHES:
+                        continue
                     if data["t"] == "READY":
                         self._resume_gateway_url = data["d"]["resume_gateway_url"]
                         self.session_id = data["d"]["session_id"]
+                        if self.intents & Intents.GUILDS.value:
+                            self._pending_guilds = {
+                                snowflake(g["id"]) for g in data["d"].get("guilds", ())
+                            }
+                        else:
+                            self._pending_guilds = set()
+                        self._guilds_ready.clear()
+                        self._last_guild_create = asyncio.get_running_loop().time()
+                        if self._guilds_ready_task is not None:
+                            self._guilds_ready_task.cancel()
+                        self._guilds_ready_task = asyncio.create_task(
+                            self._wait_for_guilds()
+                        )
                         if "on_ready" in self._events_tree:
                             await self._trigger(self._events_tree["on_ready"])
                     if data["t"] == "MESSAGE_CREATE":
@@ -320,81 +775,25 @@ class WebSocket:
                                     ),
                                 ),
                             )
-                        if self._command_tree:
-                            content = data.get("d", {}).get("content")
-                            if not content:
-                                return
-                            cmd, *rest = content.split(" ", 1)
-                            command_data = self._command_tree.get(cmd)
-                            if command_data:
-                                args = rest[0].split(" ") if rest else []
-                                req_arg_count = (
-                                    command_data["required_arguments_count"] - 1
-                                )
-                                max_arg_count = command_data["arguments_sum"] - 1
-                                prov_args_count_len = len(args)
-                                if prov_args_count_len in range(
-                                    req_arg_count, max_arg_count + 1
-                                ):
-                                    channel = await self.get_channel(
-                                        data["d"]["channel_id"]
-                                    )
-                                    await self._trigger(
-                                        command_data["coro"],
-                                        Message(
-                                            tree=data["d"],
-                                            session=self.session,
-                                            auth=self._auth,
-                                            channel=channel,
-                                        ),
-                                        *args,
-                                    )
-                                else:
-                                    raise UnSufficientArguments(
-                                        f"Coda: Not enough arguments passed. Required: {req_arg_count}"
-                                        if prov_args_count_len < req_arg_count
-                                        else f"Coda: Arguments limit exceeded. Max: {max_arg_count}"
-                                    )
-                    if data["t"] == "INTERACTION_CREATE":
-                        if (
-                            data["d"]["type"]
-                            == InteractionType.APPLICATION_COMMAND.value
-                        ):
-                            interaction = Interaction(
-                                self.session, data["d"], self._auth
-                            )
-                            cmd_name = interaction.data.get("name")
-                            if cmd_name in self._slash_commands_tree:
-                                kwargs = {}
-                                if "options" in interaction.data:
-                                    for option in interaction.data["options"]:
-                                        kwargs[option["name"]] = option["value"]
-
-                                await self._trigger(
-                                    self._slash_commands_tree[cmd_name]["coro"],
-                                    interaction,
-                                    **kwargs,
-                                )
-                        elif (
-                            data["d"]["type"] == InteractionType.MESSAGE_COMPONENT.value
-                        ):
-                            interaction = Interaction(
-                                self.session, data["d"], self._auth
-                            )
-                            custom_id = interaction.data.get("custom_id")
-                            if custom_id in self._component_handlers:
+                        content = data["d"].get("content")
+                        if self._command_router and content:
+                            guild_id = data["d"].get("guild_id")
+                            if self._command_router.needs_resolve(guild_id):
+                                # The prefix resolver may do I/O, keep it off
+                                # the reader loop.
                                 await self._trigger(
-                                    self._component_handlers[custom_id], interaction
+                                    self._route_command, content, data["d"]
                                 )
-                        elif data["d"]["type"] == InteractionType.MODAL_SUBMIT.value:
-                            interaction = Interaction(
-                                self.session, data["d"], self._auth
-                            )
-                            custom_id = interaction.data.get("custom_id")
-                            if custom_id in self._modal_handlers:
+                            elif match := await self._command_router.match(
+                                content, guild_id
+                            ):
+                                # Argument parsing runs in the command's own task,
+                                # never in the reader loop.
                                 await self._trigger(
-                                    self._modal_handlers[custom_id], interaction
+                                    self._invoke_command, *match, data["d"]
                                 )
+                    if data["t"] == "INTERACTION_CREATE":
+                        await self._dispatch_interaction(data["d"])
 
                     if data["t"] == "MESSAGE_UPDATE":
                         if data["d"].get("poll"):
@@ -445,32 +844,104 @@ class WebSocket:
                             )
                     if data["t"] in ("GUILD_CREATE", "GUILD_UPDATE"):
                         guild_data = data["d"]
-                        self._guilds[guild_data["id"]] = Guild(id=guild_data["id"])
-                        if "channels" in guild_data:
-                            for c in guild_data["channels"]:
-                                self._channels[c["id"]] = Channel(
-                                    tree=c,
-                                    session=self.session,
-                                    id=c["id"],
-                                    auth=self._auth,
-                                )
+                        guild_id = snowflake(guild_data["id"])
+                        if self._lazy_guilds and data["t"] == "GUILD_CREATE":
+                            # A new GUILD_CREATE (e.g. after an outage) replaces
+                            # the guild, drop the copy built from the old one.
+                            if stale := self._guilds.pop(guild_id, None):
+                                for channel_id in stale.channels:
+                                    self._channels.pop(channel_id, None)
+                            self._lazy_guild_payloads[guild_id] = guild_data
+                            self._lazy_guild_updates.pop(guild_id, None)
+                            for c in guild_data.get("channels", ()):
+                                self._lazy_channel_index[snowflake(c["id"])] = guild_id
+                        elif guild_id in self._lazy_guild_payloads:
+                            # GUILD_UPDATE carries no channels, merge it into the
+                            # pending payload instead of materializing the guild.
+                            self._lazy_guild_payloads[guild_id].update(guild_data)
+                        elif data["t"] == "GUILD_UPDATE" and guild_id in self._guilds:
+                            self._guilds[guild_id].update(guild_data)
+                        else:
+                            self._cache_guild(guild_data)
+                        if data["t"] == "GUILD_CREATE" and self._pending_guilds:
+                            self._pending_guilds.discard(guild_id)
+                            self._last_guild_create = asyncio.get_running_loop().time()
+                            if not self._pending_guilds:
+                                self._guilds_ready.set()
+                    if data["t"] == "GUILD_DELETE":
+                        guild_id = snowflake(data["d"]["id"])
+                        guild_data = self._lazy_guild_payloads.pop(guild_id, None)
+                        self._lazy_guild_updates.pop(guild_id, None)
+                        if guild_data:
+                            for c in guild_data.get("channels", ()):
+                                self._lazy_channel_index.pop(snowflake(c["id"]), None)
+                        guild = self._guilds.pop(guild_id, None)
+                        if guild:
+                            for channel_id in guild.channels:
+                                self._channels.pop(channel_id, None)
                     if data["t"] in ("CHANNEL_CREATE", "CHANNEL_UPDATE"):
                         c = data["d"]
-                        self._channels[c["id"]] = Channel(
+                        channel = Channel(
                             tree=c, session=self.session, id=c["id"], auth=self._auth
                         )
+                        self._channels[snowflake(c["id"])] = channel
+                        # Entity events of lazy guilds are recorded rather than
+                        # building the guild, so `get_guild` below only finds
+                        # built ones.
+                        if not self._update_lazy_guild(
+                            c.get("guild_id"), "channels", c["id"], c
+                        ):
+                            if guild := self.get_guild(c.get("guild_id")):
+                                guild.channels[snowflake(c["id"])] = channel
+                    if data["t"] == "CHANNEL_DELETE":
+                        c = data["d"]
+                        self._channels.pop(snowflake(c["id"]), None)
+                        if not self._update_lazy_guild(
+                            c.get("guild_id"), "channels", c["id"]
+                        ):
+                            if guild := self.get_guild(c.get("guild_id")):
+                                guild.channels.pop(snowflake(c["id"]), None)
+                    if data["t"] in ("GUILD_ROLE_CREATE", "GUILD_ROLE_UPDATE"):
+                        d = data["d"]
+                        if not self._update_lazy_guild(
+                            d["guild_id"], "roles", d["role"]["id"], d["role"]
+                        ):
+                            if guild := self.get_guild(d["guild_id"]):
+                                guild.add_role(d["role"])
+                    if data["t"] == "GUILD_ROLE_DELETE":
+                        d = data["d"]
+                        if not self._update_lazy_guild(
+                            d["guild_id"], "roles", d["role_id"]
+                        ):
+                            if guild := self.get_guild(d["guild_id"]):
+                                guild.remove_role(d["role_id"])
+                    if data["t"] in ("GUILD_MEMBER_ADD", "GUILD_MEMBER_UPDATE"):
+                        d = data["d"]
+                        if not self._update_lazy_guild(
+                            d["guild_id"], "members", d["user"]["id"], d
+                        ):
+                            if guild := self.get_guild(d["guild_id"]):
+                                guild.add_member(d)
+                    if data["t"] == "GUILD_MEMBER_REMOVE":
+                        d = data["d"]
+                        if not self._update_lazy_guild(
+                            d["guild_id"], "members", d["user"]["id"]
+                        ):
+                            if guild := self.get_guild(d["guild_id"]):
+                                guild.remove_member(d["user"]["id"])
                 elif data["op"] == 7:  # Reconnect & resume
                     await self._reconnect_to_ws()
                     await self._resume()
-                    print(
-                        f"Coda: {Fore.GREEN}Shard {self.shard_id}/{self.shard_count} reconnected & resumed{Fore.RESET} to the {Fore.GREEN}gateway successfully {Fore.RESET} [{datetime.now(UTC).strftime('%Y-%m-%d %H:%M')}]"
+                    self._log.info(
+                        "Shard %s/%s reconnected & resumed to the gateway successfully",
+                        self.shard_id,
+                        self.shard_count,
                     )
                     self.decompressor = zlib.decompressobj()
-                    asyncio.create_task(self._ws_loop())
-                    return
+                    return True
                 elif data["op"] == 9:  # Invalid session
-                    print(
-                        f"Coda: {Fore.YELLOW}Shard {self.shard_id}/{self.shard_count} invalid session{Fore.RESET} [{datetime.now(UTC).strftime('%Y-%m-%d %H:%M')}]"
+                    self._log.warning(
+                        "Shard %s/%s invalid session", self.shard_id, self.shard_count
                     )
                     if data["d"]:
                         await self._resume()
@@ -478,42 +949,220 @@ class WebSocket:
                         await self._reconnect_to_ws()
                         await self._identify()
                         self.decompressor = zlib.decompressobj()
-                        asyncio.create_task(self._ws_loop())
-                        return
+                        return True
                 elif data["op"] == 10:  # Hello
+                    self._heartbeat_interval = (
+                        data.get("d", {}).get("heartbeat_interval") / 1000
+                    )
+                    self._heartbeat_acked = True
                     self._keep_alive_task = asyncio.create_task(
-                        self._keep_alive(
-                            data.get("d", {}).get("heartbeat_interval") / 1000
-                        )
+                        self._keep_alive(self._heartbeat_interval)
                     )
                 elif data["op"] == 11:
-                    if self._debug:
-                        print(
-                            f"Coda [debug]:{Fore.LIGHTCYAN_EX} Shard {self.shard_id}/{self.shard_count} heartbeat{Fore.RESET} was{Fore.GREEN} successful {Fore.RESET} [{datetime.now(UTC).strftime('%Y-%m-%d %H:%M')}]"
-                        )
+                    self._heartbeat_acked = True
+                    if self._heartbeat_sent is not None:
+                        self.latency = perf_counter() - self._heartbeat_sent
+                        self._heartbeat_rtt.set(self.latency)
+                    self._log.debug(
+                        "Shard %s/%s heartbeat was successful",
+                        self.shard_id,
+                        self.shard_count,
+                    )
                 else:
-                    print(
-                        f"Coda: {Fore.RED}Shard {self.shard_id}/{self.shard_count} unhandled operation code. ({data['op']}){Fore.RESET}"
+                    self._log.error(
+                        "Shard %s/%s unhandled operation code. (%s)",
+                        self.shard_id,
+                        self.shard_count,
+                        data["op"],
                     )
             except ClientConnectionError:
-                print(
-                    f"Coda: {Fore.RED}Shard {self.shard_id}/{self.shard_count} connection unsuccessful!{Fore.RESET} [{datetime.now(UTC).strftime('%Y-%m-%d %H:%M')}]"
+                self._log.error(
+                    "Shard %s/%s connection unsuccessful!",
+                    self.shard_id,
+                    self.shard_count,
                 )
                 break
 
             except Exception as e:
-                print(
-                    f"Coda: {Fore.RED}Shard {self.shard_id}/{self.shard_count} unexpected error: {e}{Fore.RESET} [{datetime.now(UTC).strftime('%Y-%m-%d %H:%M')}]"
+                self._log.exception(
+                    "Shard %s/%s unexpected error: %s",
+                    self.shard_id,
+                    self.shard_count,
+                    e,
                 )
+            finally:
+                if dispatched:
+                    self._dispatch_latency.observe(perf_counter() - received)
+        return False
+
+    def _cancel_tasks(self) -> None:
+        """
+        Cancel the heartbeat and the guilds-ready wait and stop exporting the
+        shard's gauges, before closing for good.
+        """
+        for task in (getattr(self, "_keep_alive_task", None), self._guilds_ready_task):
+            if task is not None:
+                task.cancel()
+        _drop_gauges(self._gauges)
 
     async def _keep_alive(self, heartbeat_interval: int) -> None:
         while True:
             await asyncio.sleep(heartbeat_interval)
+            self._heartbeat_sent = perf_counter()
+            self._heartbeat_acked = False
             await self.ws.send_bytes(orjson.dumps({"op": 1, "d": self._last_sequence}))
-            if self._debug:
-                print(
-                    f"Coda [debug]: Shard {self.shard_id}/{self.shard_count} Heartbeat{Fore.LIGHTCYAN_EX} sent{Fore.RESET}"
+            self._log.debug(
+                "Shard %s/%s heartbeat sent", self.shard_id, self.shard_count
+            )
+
+    def health(self) -> ShardHealth:
+        """
+        ZOMBIE when the shard has no open connection or its last heartbeat has
+        gone unacknowledged for a whole interval (Discord drops such
+        connections), DEGRADED when the heartbeat round trip is slow, otherwise
+        the status of the event loop (see `lag_monitor`), whichever is worst.
+        """
+        if self.ws is None or getattr(self.ws, "closed", False):
+            return ShardHealth.ZOMBIE
+        if (
+            not self._heartbeat_acked
+            and perf_counter() - self._heartbeat_sent > self._heartbeat_interval
+        ):
+            return ShardHealth.ZOMBIE
+        status = lag_monitor.status
+        if self.latency is not None and self.latency >= DEGRADED_LATENCY:
+            return max(status, ShardHealth.DEGRADED, key=lambda health: health.value)
+        return status
+
+    async def _wait_for_guilds(self) -> None:
+        """
+        Fire the `on_guilds_ready` event once every guild announced in READY has
+        been received, or once no GUILD_CREATE arrived for `guilds_ready_timeout`
+        seconds (unavailable guilds never send one).
+        """
+        loop = asyncio.get_running_loop()
+        while self._pending_guilds:
+            try:
+                await asyncio.wait_for(
+                    self._guilds_ready.wait(), self._guilds_ready_timeout
                 )
+            except asyncio.TimeoutError:
+                if loop.time() - self._last_guild_create >= self._guilds_ready_timeout:
+                    self._log.warning(
+                        "Shard %s/%s %s guilds unavailable",
+                        self.shard_id,
+                        self.shard_count,
+                        len(self._pending_guilds),
+                    )
+                    break
+        self._guilds_ready.set()
+        if "on_guilds_ready" in self._events_tree:
+            await self._trigger(self._events_tree["on_guilds_ready"])
+
+    async def wait_until_guilds_ready(self) -> None:
+        """
+        Wait until the startup guild stream (GUILD_CREATE after READY) is complete.
+        """
+        await self._guilds_ready.wait()
+
+    def _cache_guild(self, guild_data: dict, keep_newer: bool = False) -> Guild:
+        guild = Guild(tree=guild_data)
+        self._guilds[snowflake(guild.id)] = guild
+        for c in guild_data.get("channels", ()):
+            channel_id = snowflake(c["id"])
+            # When materializing a lazy guild, a CHANNEL_CREATE/UPDATE received
+            # after its GUILD_CREATE is newer than the raw payload, keep it.
+            if keep_newer and channel_id in self._channels:
+                channel = self._channels[channel_id]
+            else:
+                channel = Channel(
+                    tree=c,
+                    session=self.session,
+                    id=c["id"],
+                    auth=self._auth,
+                )
+                self._channels[channel_id] = channel
+            guild.channels[channel_id] = channel
+        return guild
+
+    def _update_lazy_guild(
+        self,
+        guild_id: Union[SnowflakeLike, None],
+        kind: str,
+        entity_id: SnowflakeLike,
+        data: dict = None,
+    ) -> bool:
+        """
+        Record a role, member or channel change (`data`, None for a removal) of
+        a guild still held as a raw payload. False when the guild is not lazy.
+        """
+        if guild_id is None:
+            return False
+        guild_id = snowflake(guild_id)
+        if guild_id not in self._lazy_guild_payloads:
+            return False
+        updates = self._lazy_guild_updates.setdefault(guild_id, {})
+        updates[(kind, snowflake(entity_id))] = data
+        if kind == "channels":
+            if data is None:
+                self._lazy_channel_index.pop(snowflake(entity_id), None)
+            else:
+                self._lazy_channel_index[snowflake(entity_id)] = guild_id
+        return True
+
+    def _materialize_guild(self, guild_id: int) -> Union[Guild, None]:
+        guild_data = self._lazy_guild_payloads.pop(guild_id, None)
+        if guild_data is None:
+            return self._guilds.get(guild_id)
+        for c in guild_data.get("channels", ()):
+            self._lazy_channel_index.pop(snowflake(c["id"]), None)
+        guild = self._cache_guild(guild_data, keep_newer=True)
+        updates = self._lazy_guild_updates.pop(guild_id, {})
+        for (kind, entity_id), data in updates.items():
+            if kind == "roles":
+                if data is None:
+                    guild.remove_role(entity_id)
+                else:
+                    guild.add_role(data)
+            elif kind == "members":
+                if data is None:
+                    guild.remove_member(entity_id)
+                else:
+                    guild.add_member(data)
+            else:
+                self._lazy_channel_index.pop(entity_id, None)
+                if data is None:
+                    guild.channels.pop(entity_id, None)
+                    self._channels.pop(entity_id, None)
+                elif channel := self._channels.get(entity_id):
+                    guild.channels[entity_id] = channel
+        return guild
+
+    def get_guild(self, guild_id: SnowflakeLike) -> Union[Guild, None]:
+        """
+        Retrieve a cached guild by ID, building it from its raw payload on first access
+        when running with `lazy_guilds`.
+        """
+        if guild_id is None:
+            return None
+        guild_id = snowflake(guild_id)
+        if guild_id in self._guilds:
+            return self._guilds[guild_id]
+        return self._materialize_guild(guild_id)
+
+    def record(self, path: str) -> GatewayRecorder:
+        """
+        Start recording the raw gateway frames of this shard to `path`.
+        Call it before `connect()` so the recording starts with the HELLO frame.
+        """
+        self.stop_recording()
+        self._recorder = GatewayRecorder(path)
+        return self._recorder
+
+    def stop_recording(self) -> None:
+        if self._recorder is not None:
+            self._recorder.close()
+            self._recorder = None
 
     async def change_presence(
         self,
@@ -548,12 +1197,17 @@ class WebSocket:
     async def get_webhook(self, webhook_url: str) -> Webhook:
         return Webhook(self.session, webhook_url)
 
-    async def get_channel(self, channel_id: int):
+    async def get_channel(self, channel_id: SnowflakeLike):
         """
         Retrieve a channel by ID. Checks the local cache first.
         """
+        channel_id = snowflake(channel_id)
         if channel_id in self._channels:
             return self._channels[channel_id]
+        if channel_id in self._lazy_channel_index:
+            self._materialize_guild(self._lazy_channel_index[channel_id])
+            if channel_id in self._channels:
+                return self._channels[channel_id]
 
         data = await _request(
             self.session,
@@ -578,6 +1232,32 @@ class WebSocket:
 
         return wrapper
 
+    def on_raw(self, event_name: str):
+        """
+        Decorator to register a raw dispatch handler.
+
+        The handler receives the decoded `d` payload of every `event_name` dispatch
+        (e.g. "TYPING_START", "PRESENCE_UPDATE") without any entity being built.
+        """
+
+        def wrapper(coro: callable):
+            self._raw_events_tree[event_name] = coro
+            return coro
+
+        return wrapper
+
+    def dispatch_filter(self, predicate: callable):
+        """
+        Decorator to register a pre-parse filter for dispatch frames.
+
+        The predicate is called as `predicate(event_name, guild_id, channel_id)`
+        (IDs are ints like the cache keys, None when the payload has none) and
+        returning a falsy value drops the frame before any handler, cache update
+        or entity construction.
+        """
+        self._dispatch_filter = predicate
+        return predicate
+
     def on_poll_end(self, poll_question: str = None):
         """
         Decorator to register a 'specefic' poll end event handler.
@@ -590,22 +1270,33 @@ class WebSocket:
 
         return wrapper
 
-    def command(self, name: str = None):
+    def command(self, name: str = None, aliases: Iterable[str] = None):
         """
         Decorator to register a prefix-based command.
+
+        The arguments are converted according to the callback's annotations (see
+        `compile_signature`). Returns the `Command`, whose `.error()` decorator
+        registers the handler for parsing and execution errors.
         """
 
         def wrapper(coro: callable):
-            func_name = name or coro.__name__
-            num_defaults = len(coro.__defaults__) if coro.__defaults__ else 0
-            required_arguments_count = coro.__code__.co_argcount - num_defaults
-            self._command_tree[self.prefix + func_name] = {
-                "coro": coro,
-                "required_arguments_count": required_arguments_count,
-                "default_arguments_count": num_defaults,
-                "arguments_sum": required_arguments_count + num_defaults,
-            }
-            return coro
+            command = Command(coro, name or coro.__name__, aliases)
+            self._command_router.add(command)
+            return command
+
+        return wrapper
+
+    def group(self, name: str = None, aliases: Iterable[str] = None):
+        """
+        Decorator to register a prefix-based command group.
+
+        Returns the `Command`, whose `.command()` decorator registers subcommands.
+        """
+
+        def wrapper(coro: callable):
+            command = Command(coro, name or coro.__name__, aliases)
+            self._command_router.add(command)
+            return command
 
         return wrapper
 
@@ -614,10 +1305,12 @@ class WebSocket:
         name: str = None,
         description: str = "---",
         options: List[Option] = None,
+        guild_ids: Iterable[Union[str, int]] = None,
     ):
         """
         Decorator to register a slash (application) command.
 
+        The command is global unless `guild_ids` restricts it to those guilds.
         Note: These must be synced with Discord using `.sync_commands()`.
         """
 
@@ -633,68 +1326,262 @@ class WebSocket:
                 "description": description,
                 "name": cmd_name,
                 "options": processed_options,
+                "guild_ids": guild_ids,
             }
+            self._slash_paths[(cmd_name,)] = coro
+            return coro
+
+        return wrapper
+
+    def slash_group(
+        self,
+        name: str,
+        description: str = "---",
+        guild_ids: Iterable[Union[str, int]] = None,
+    ) -> SlashGroup:
+        """
+        Register a slash command group (global unless `guild_ids` is given).
+
+        Subcommands (and one level of subcommand groups) are registered on the
+        returned `SlashGroup`, e.g. `@group.command()` or `group.group("roles")`.
+        """
+        group = SlashGroup(name, description, self._slash_paths.__setitem__)
+        self._slash_commands_tree[name] = {
+            "coro": None,
+            "description": description,
+            "name": name,
+            "options": group.options,
+            "guild_ids": guild_ids,
+        }
+        return group
+
+    def autocomplete(self, command: str, option: str):
+        """
+        Decorator to register the autocomplete handler of a slash command option.
+
+        `command` is the full command path separated by spaces (e.g. "config set").
+        The handler is called as `handler(interaction, current_value)` and returns
+        the choices to suggest (see `Interaction.autocomplete_response`); a
+        `PrefixIndex` makes this fast for large choice sets.
+        """
+
+        def wrapper(coro: callable):
+            self._autocomplete_handlers[(tuple(command.split()), option)] = coro
             return coro
 
         return wrapper
 
+    async def _run_autocomplete(
+        self, handler: callable, interaction: Interaction, value: str
+    ):
+        choices = await handler(interaction, value)
+        await interaction.autocomplete_response(choices or [])
+
     def component(self, custom_id: str):
         """
-        Decorator to register a handler for a specific message component (Button, Select).
+        Decorator to register a handler for a message component (Button, Select).
+
+        `custom_id` is either a literal ID or a template such as
+        `"vote:{poll_id:int}:{choice}"`, whose parsed placeholders are passed to
+        the handler as keyword arguments.
         """
 
         def wrapper(coro: callable):
-            self._component_handlers[custom_id] = coro
+            self._component_handlers.add(custom_id, coro)
             return coro
 
         return wrapper
 
     def on_modal_submit(self, custom_id: str):
         """
-        Decorator to register a handler for a specific modal submission.
+        Decorator to register a handler for a modal submission; `custom_id` accepts
+        the same templates as `component()`.
         """
 
         def wrapper(coro: callable):
-            self._modal_handlers[custom_id] = coro
+            self._modal_handlers.add(custom_id, coro)
             return coro
 
         return wrapper
 
-    async def sync_commands(self):
+    async def sync_commands(self, cache_path: str = None, force: bool = False):
         """
-        Bulk overwrite global application commands with the local registration tree.
+        Bring the application commands registered with Discord in line with the
+        local registration tree, global and guild-scoped alike.
+
+        Each scope's command set is hashed and compared with the hash stored in
+        `cache_path` by the previous sync (or, without a cache entry, with the
+        commands Discord currently has), and only scopes that differ are bulk
+        overwritten. Scopes in the cache with no local commands left are cleared.
+        `force` skips the comparison.
         """
-        if not self._slash_commands_tree:
+        cache_path = cache_path or self._sync_cache
+        base_url = f"{__base_url__}applications/{self.id}"
+        headers = {"Authorization": self._auth}
+        cached = {} if force else load_sync_cache(cache_path)
+        scopes = command_payloads(self._slash_commands_tree)
+        for scope in cached:
+            scopes.setdefault(scope, [])
+        if not scopes:
             return
 
-        url = f"{__base_url__}applications/{self.id}/commands"
+        hashes = {}
+        synced = 0
+        for scope, payload in scopes.items():
+            url = (
+                f"{base_url}/commands"
+                if scope == GLOBAL_SCOPE
+                else f"{base_url}/guilds/{scope}/commands"
+            )
+            digest = commands_hash(payload)
+            if not force:
+                if scope not in cached:
+                    cached[scope] = commands_hash(
+                        await _request(self.session, "GET", url, headers=headers) or []
+                    )
+                if cached[scope] == digest:
+                    if payload:
+                        hashes[scope] = digest
+                    continue
+            await _request(self.session, "PUT", url, json=payload, headers=headers)
+            synced += 1
+            if payload:
+                hashes[scope] = digest
+
+        save_sync_cache(cache_path, hashes)
+        if synced:
+            _interactions_log.info(
+                "Successfully synced slash commands in %s scope(s).", synced
+            )
+        else:
+            _interactions_log.debug("Slash commands already up to date, sync skipped.")
 
-        # Prepare the payload list for all commands
-        commands_payload = [
-            {
-                "name": data["name"],
-                "description": data["description"],
-                "type": 1,  # Chat Input
-                "options": data["options"],
-            }
-            for data in self._slash_commands_tree.values()
-        ]
+    async def _dispatch_interaction(
+        self, data: dict, callback: asyncio.Future = None
+    ) -> Union[asyncio.Task, None]:
+        """
+        Route an interaction payload (from the gateway or the HTTP endpoint) to
+        its handler. Returns the handler's task, or None when nothing handles it.
 
-        # Use PUT to bulk overwrite commands (Sync)
-        resp = await _request(
-            self.session,
-            "PUT",
-            url,
-            json=commands_payload,
-            headers={"Authorization": self._auth},
+        `callback` is forwarded to the `Interaction`, see `InteractionServer`.
+        """
+        if data["type"] == InteractionType.APPLICATION_COMMAND.value:
+            path, options = resolve_command_path(data["data"])
+            if path in self._slash_paths:
+                interaction = Interaction(
+                    self.session, data, self._auth, callback=callback
+                )
+                kwargs = {}
+                for option in options:
+                    kwargs[option["name"]] = option["value"]
+
+                return await self._trigger(
+                    self._slash_paths[path],
+                    interaction,
+                    **kwargs,
+                )
+        elif data["type"] == InteractionType.APPLICATION_COMMAND_AUTOCOMPLETE.value:
+            path, options = resolve_command_path(data["data"])
+            for option in options:
+                if option.get("focused"):
+                    handler = self._autocomplete_handlers.get((path, option["name"]))
+                    if handler:
+                        return await self._trigger(
+                            self._run_autocomplete,
+                            handler,
+                            Interaction(
+                                self.session, data, self._auth, callback=callback
+                            ),
+                            option.get("value", ""),
+                        )
+                    break
+        elif data["type"] == InteractionType.MESSAGE_COMPONENT.value:
+            interaction = Interaction(self.session, data, self._auth, callback=callback)
+            custom_id = interaction.data.get("custom_id", "")
+            if custom_id.startswith(VIEW_PREFIX):
+                handler = _view_store.resolve(custom_id)
+                route = (handler, {}) if handler else None
+            else:
+                route = self._component_handlers.match(custom_id)
+            if route is not None:
+                return await self._trigger(route[0], interaction, **route[1])
+        elif data["type"] == InteractionType.MODAL_SUBMIT.value:
+            interaction = Interaction(self.session, data, self._auth, callback=callback)
+            route = self._modal_handlers.match(interaction.data.get("custom_id", ""))
+            if route is not None:
+                return await self._trigger(route[0], interaction, **route[1])
+        return None
+
+    async def _route_command(self, content: str, message_data: dict) -> None:
+        match = await self._command_router.match(content, message_data.get("guild_id"))
+        if match:
+            await self._invoke_command(*match, message_data)
+
+    async def _invoke_command(
+        self, command: Command, arguments: str, message_data: dict
+    ) -> None:
+        message = Message(
+            tree=message_data,
+            session=self.session,
+            auth=self._auth,
+            channel=await self.get_channel(message_data["channel_id"]),
         )
-        if resp:
-            print(
-                f"Coda: {Fore.GREEN}Successfully synced {len(commands_payload)} slash commands.{Fore.RESET}"
-            )
+        try:
+            args, kwargs = await command.parse(message, arguments, self)
+            await command.coro(message, *args, **kwargs)
+        except Exception as error:
+            handler = command.error_handler
+            if handler:
+                await handler(message, error)
+            else:
+                _commands_log.error(
+                    "Command '%s' failed: %s",
+                    command.qualified_name,
+                    error,
+                    exc_info=error,
+                )
 
-    async def _trigger(self, target: callable, *args, **kwargs):
-        asyncio.create_task(target(*args, **kwargs))
+    def profile_handlers(
+        self,
+        slow_threshold: float = 1.0,
+        blocking_threshold: float = 0.05,
+        profiler: HandlerProfiler = None,
+    ) -> HandlerProfiler:
+        """
+        Instrument every handler this shard triggers from now on (see
+        `HandlerProfiler`). Pass `profiler` to share one between shards.
+        """
+        self._profiler = profiler or HandlerProfiler(slow_threshold, blocking_threshold)
+        return self._profiler
+
+    def stop_profiling(self) -> None:
+        self._profiler = None
+
+    def _event_of(self, target: callable) -> Union[str, None]:
+        for tree in (self._events_tree, self._raw_events_tree, self._slash_paths):
+            for event, handler in tree.items():
+                if handler is target:
+                    return " ".join(event) if isinstance(event, tuple) else event
+        return None
+
+    async def _trigger(self, target: callable, *args, **kwargs) -> asyncio.Task:
+        name = handler_name(target)
+        metrics = _handler_metrics.get(name)
+        if metrics is None:
+            metrics = _handler_metrics[name] = (
+                HANDLER_DURATION.labels(name),
+                HANDLER_ERRORS.labels(name),
+                name,
+            )
+        if self._profiler is not None:
+            coro = self._profiler.wrap(
+                target, args, kwargs, partial(self._event_of, target)
+            )
+        else:
+            coro = target(*args, **kwargs)
+        task = asyncio.create_task(coro)
+        task.add_done_callback(partial(_handler_done, metrics, perf_counter()))
+        return task
 
 
 class Client(WebSocket):
@@ -706,13 +1593,27 @@ class Client(WebSocket):
         self,
         token: str,
         intents: Union[Iterable[Intents], int],
-        prefix: str = "",
+        prefix: Union[str, Iterable[str]] = "",
         debug: bool = False,
         compress: bool = True,
         session: ClientSession = None,
+        lazy_guilds: bool = False,
+        base_url: str = None,
+        prefix_resolver: callable = None,
+        mention_prefix: bool = False,
+        sync_cache: str = None,
+        session_file: str = None,
+        guilds_ready_timeout: float = 2.0,
     ):
+        """
+        `session_file` is where `run()` saves the gateway session on shutdown
+        and resumes it from on the next start.
+        """
         self.session = session
         self._auth = f"Bot {token}"
+        self._session_file = session_file
+        if base_url:
+            set_base_url(base_url)
         super().__init__(
             token=token,
             intents=intents,
@@ -720,6 +1621,11 @@ class Client(WebSocket):
             debug=debug,
             compress=compress,
             session=session,
+            lazy_guilds=lazy_guilds,
+            guilds_ready_timeout=guilds_ready_timeout,
+            prefix_resolver=prefix_resolver,
+            mention_prefix=mention_prefix,
+            sync_cache=sync_cache,
             _gateway_data=None,
             _client_info=None,
             _shard_id=0,
@@ -740,12 +1646,59 @@ class Client(WebSocket):
         self.id = client_info["id"]
         self.user_name = client_info["username"]
         self.bio = client_info.get("bio", "")
+        self._command_router.set_user_id(self.id)
+
+    async def serve_interactions(
+        self,
+        public_key: str,
+        host: str = "0.0.0.0",
+        port: int = 8080,
+        path: str = "/interactions",
+        sync_app_commands: bool = True,
+    ) -> "InteractionServer":
+        """
+        Receive interactions through an HTTP endpoint instead of the gateway
+        (see `InteractionServer`). Call after `register()`; `public_key` is the
+        application's public key from the developer portal.
+        """
+        from .http_interactions import InteractionServer
+
+        if sync_app_commands:
+            await self.sync_commands()
+        return await InteractionServer(self, public_key, host, port, path).start()
+
+    def run(
+        self,
+        setup: Callable[["Client"], Awaitable] = None,
+        use_uvloop: bool = True,
+        executor_workers: int = None,
+    ) -> None:
+        """
+        Register, connect and run until SIGINT/SIGTERM or until the gateway
+        connection ends, on a new event loop (uvloop when installed, unless
+        `use_uvloop` is False). `setup(client)` is awaited after `register()`,
+        before connecting. `executor_workers` sizes the loop's default thread
+        pool (`run_in_executor`).
+
+        On shutdown pending batched messages are flushed, the gateway connection
+        is closed without ending the Discord session and the HTTP session is
+        closed. With `session_file` the next `run()` resumes that session.
+        """
+        _run(
+            self,
+            lambda: [self],
+            setup,
+            use_uvloop,
+            executor_workers,
+            stop_with_connection=True,
+        )
 
     async def connect_client(self):
         await self.setup()
         await self.connect()
 
     async def stop_client(self):
+        self._cancel_tasks()
         await self.ws.close()
         await self.session.close()
-        print(f"coda: {Fore.RED}Client stopped.{Fore.RESET}")
+        self._log.info("Client stopped.")
@@ -0,0 +1,3 @@
+from .replay import replay, ReplayReport, ReplayServer, write_synthetic_recording
+from .fake_server import FakeDiscord
+from .rest import measure_rest, RestReport
@@ -0,0 +1,533 @@
+import random
+import re
+import time
+import zlib
+import orjson
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from aiohttp import WSMsgType, web
+from .._core.snowflake import DISCORD_EPOCH, shard_for
+
+
+def _snowflake(counter: List[int]) -> str:
+    counter[0] += 1
+    return str(
+        ((int(time.time() * 1000) - DISCORD_EPOCH) << 22) | (counter[0] & 0x3FFFFF)
+    )
+
+
+class _GatewaySession:
+    """
+    One gateway connection to the fake server.
+    """
+
+    def __init__(self, ws: web.WebSocketResponse, compress: bool):
+        self.ws = ws
+        self.compressor = zlib.compressobj() if compress else None
+        self.sequence = 0
+        self.shard: Tuple[int, int] = (0, 1)
+        self.session_id: Optional[str] = None
+        self.heartbeats = 0
+
+    async def send(self, payload: dict) -> None:
+        data = orjson.dumps(payload)
+        if self.compressor:
+            await self.ws.send_bytes(
+                self.compressor.compress(data)
+                + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+            )
+        else:
+            await self.ws.send_str(data.decode())
+
+    async def dispatch(self, event: str, d: Any) -> None:
+        self.sequence += 1
+        await self.send({"op": 0, "t": event, "s": self.sequence, "d": d})
+
+
+class _RouteLimit:
+    def __init__(self):
+        self.remaining = 0
+        self.reset_at = 0.0
+
+
+class FakeDiscord:
+    """
+    In-process fake of the Discord REST API and gateway, for load testing and
+    tuning without touching Discord.
+
+    The gateway side speaks HELLO, IDENTIFY -> READY (+ GUILD_CREATE per guild of
+    the shard), heartbeat ACKs and RESUME. The REST side covers the routes Coda
+    uses and answers with X-RateLimit-* headers; `rate_limit`/`reset_after`
+    control the per-route buckets and `inject_429` (a 0-1 ratio) forces extra
+    429s, flagged global when `global_429` is set.
+
+    Point a client at it with `Client(..., base_url=server.base_url)`.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        guilds: int = 0,
+        channels_per_guild: int = 5,
+        heartbeat_interval: int = 41250,
+        shards: int = 1,
+        rate_limit: int = 5,
+        reset_after: float = 1.0,
+        inject_429: float = 0.0,
+        global_429: bool = False,
+        retry_after: float = 0.1,
+        application_id: str = "1",
+        seed: Optional[int] = None,
+    ):
+        self.host = host
+        self.port = port
+        self.guild_count = guilds
+        self.channels_per_guild = channels_per_guild
+        self.heartbeat_interval = heartbeat_interval
+        self.recommended_shards = shards
+        self.rate_limit = rate_limit
+        self.reset_after = reset_after
+        self.inject_429 = inject_429
+        self.global_429 = global_429
+        self.retry_after = retry_after
+        self.application_id = application_id
+        self.sessions: List[_GatewaySession] = []
+        self.commands: Dict[str, List[dict]] = {}
+        self.messages: Dict[str, Dict[str, dict]] = {}
+        self.stats: Dict[str, int] = {
+            "requests": 0,
+            "429": 0,
+            "identify": 0,
+            "resume": 0,
+            "heartbeat": 0,
+        }
+        self.route_stats: Dict[str, int] = {}
+        self._limits: Dict[str, _RouteLimit] = {}
+        self._random = random.Random(seed)
+        self._ids = [0]
+        self._runner: Optional[web.AppRunner] = None
+        self._routes: List[Tuple[str, str, Callable]] = [
+            ("GET", r"gateway", self._get_gateway),
+            ("GET", r"gateway/bot", self._get_gateway_bot),
+            ("GET", r"users/@me", self._get_me),
+            (
+                "GET",
+                r"applications/(?P<app>\d+)(?:/guilds/(?P<guild>\d+))?/commands",
+                self._get_commands,
+            ),
+            (
+                "PUT",
+                r"applications/(?P<app>\d+)(?:/guilds/(?P<guild>\d+))?/commands",
+                self._put_commands,
+            ),
+            ("GET", r"channels/(?P<channel>\d+)", self._get_channel),
+            ("DELETE", r"channels/(?P<channel>\d+)", self._no_content),
+            ("GET", r"channels/(?P<channel>\d+)/messages", self._get_messages),
+            ("POST", r"channels/(?P<channel>\d+)/messages", self._create_message),
+            (
+                "POST",
+                r"channels/(?P<channel>\d+)/messages/bulk-delete",
+                self._bulk_delete,
+            ),
+            (
+                "GET",
+                r"channels/(?P<channel>\d+)/messages/(?P<message>\d+)",
+                self._get_message,
+            ),
+            (
+                "PATCH",
+                r"channels/(?P<channel>\d+)/messages/(?P<message>\d+)",
+                self._edit_message,
+            ),
+            (
+                "DELETE",
+                r"channels/(?P<channel>\d+)/messages/(?P<message>\d+)",
+                self._delete_message,
+            ),
+            ("GET", r"channels/(?P<channel>\d+)/pins", self._get_pins),
+            (
+                "POST",
+                r"interactions/(?P<id>\d+)/(?P<token>[^/]+)/callback",
+                self._no_content,
+            ),
+            ("POST", r"webhooks/(?P<id>\d+)/(?P<token>[^/]+)", self._webhook_execute),
+            ("GET", r"webhooks/(?P<id>\d+)/(?P<token>[^/]+)", self._webhook_info),
+            (
+                "GET",
+                r"webhooks/(?P<id>\d+)/(?P<token>[^/]+)/messages/(?P<message>[^/]+)",
+                self._webhook_message,
+            ),
+            (
+                "PATCH",
+                r"webhooks/(?P<id>\d+)/(?P<token>[^/]+)/messages/(?P<message>[^/]+)",
+                self._webhook_message,
+            ),
+        ]
+        self._compiled = [
+            (method, re.compile(pattern + r"/?"), handler)
+            for method, pattern, handler in self._routes
+        ]
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/api/v10/"
+
+    @property
+    def gateway_url(self) -> str:
+        return f"ws://{self.host}:{self.port}/gateway"
+
+    async def start(self) -> "FakeDiscord":
+        # Multipart uploads are streamed to completion, whatever their size.
+        app = web.Application(client_max_size=1 << 40)
+        app.router.add_get("/gateway", self._gateway)
+        app.router.add_get("/gateway/", self._gateway)
+        app.router.add_route("*", "/api/v10/{path:.*}", self._rest)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self) -> None:
+        for session in list(self.sessions):
+            await session.ws.close()
+        if self._runner:
+            await self._runner.cleanup()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    def guild_ids(self, shard_id: int = 0, shard_count: int = 1) -> List[str]:
+        return [
+            str((g + 1) << 22)
+            for g in range(self.guild_count)
+            if shard_for((g + 1) << 22, shard_count) == shard_id
+        ]
+
+    def guild_payload(self, guild_id: str) -> dict:
+        return {
+            "id": guild_id,
+            "name": f"guild {guild_id}",
+            "owner_id": self.application_id,
+            "roles": [
+                {"id": guild_id, "name": "@everyone", "permissions": "104324673"}
+            ],
+            "channels": [
+                {
+                    "id": str(int(guild_id) + c + 1),
+                    "type": 0,
+                    "guild_id": guild_id,
+                    "name": f"channel-{c}",
+                    "permission_overwrites": [],
+                }
+                for c in range(self.channels_per_guild)
+            ],
+        }
+
+    async def _gateway(self, request: web.Request):
+        ws = web.WebSocketResponse(max_msg_size=0)
+        await ws.prepare(request)
+        session = _GatewaySession(ws, request.query.get("compress") == "zlib-stream")
+        self.sessions.append(session)
+        await session.send(
+            {"op": 10, "d": {"heartbeat_interval": self.heartbeat_interval}}
+        )
+        try:
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT and msg.type != WSMsgType.BINARY:
+                    break
+                payload = orjson.loads(msg.data)
+                op = payload.get("op")
+                if op == 1:
+                    session.heartbeats += 1
+                    self.stats["heartbeat"] += 1
+                    await session.send({"op": 11})
+                elif op == 2:
+                    self.stats["identify"] += 1
+                    await self._ready(session, payload["d"])
+                elif op == 6:
+                    self.stats["resume"] += 1
+                    session.session_id = payload["d"].get("session_id")
+                    session.sequence = payload["d"].get("seq") or 0
+                    await session.dispatch("RESUMED", {})
+        finally:
+            self.sessions.remove(session)
+        return ws
+
+    async def _ready(self, session: _GatewaySession, identify: dict) -> None:
+        shard_id, shard_count = identify.get("shard") or (0, 1)
+        session.shard = (shard_id, shard_count)
+        session.session_id = _snowflake(self._ids)
+        guild_ids = self.guild_ids(shard_id, shard_count)
+        await session.dispatch(
+            "READY",
+            {
+                "v": 10,
+                "session_id": session.session_id,
+                "resume_gateway_url": self.gateway_url,
+                "user": {"id": self.application_id, "username": "coda-fake"},
+                "application": {"id": self.application_id},
+                "shard": [shard_id, shard_count],
+                "guilds": [{"id": g, "unavailable": True} for g in guild_ids],
+            },
+        )
+        for guild_id in guild_ids:
+            await session.dispatch("GUILD_CREATE", self.guild_payload(guild_id))
+
+    async def dispatch(
+        self, event: str, d: Any, shard_id: Optional[int] = None
+    ) -> None:
+        """
+        Send a dispatch to every connected session (or those of one shard).
+        """
+        for session in self.sessions:
+            if shard_id is None or session.shard[0] == shard_id:
+                await session.dispatch(event, d)
+
+    async def burst(
+        self,
+        event: str,
+        payloads: List[Any],
+        shard_id: Optional[int] = None,
+    ) -> None:
+        """
+        Send a burst of dispatches as fast as the sockets accept them.
+        """
+        for d in payloads:
+            await self.dispatch(event, d, shard_id)
+
+    async def message_burst(
+        self, channel_id: str, count: int, content: str = "!ping", **fields
+    ) -> None:
+        payloads = [
+            {
+                "id": _snowflake(self._ids),
+                "channel_id": channel_id,
+                "content": content,
+                "author": {"id": "2", "username": "fake-user"},
+                "mentions": [],
+                "attachments": [],
+                "embeds": [],
+                **fields,
+            }
+            for _ in range(count)
+        ]
+        await self.burst("MESSAGE_CREATE", payloads)
+
+    def _route_key(self, method: str, path: str) -> str:
+        return f"{method} " + re.sub(r"messages/\d+", "messages/:id", path)
+
+    def _rate_limit(self, key: str) -> Optional[web.Response]:
+        now = time.monotonic()
+        limit = self._limits.get(key)
+        if limit is None:
+            limit = self._limits[key] = _RouteLimit()
+        if now >= limit.reset_at:
+            limit.remaining = self.rate_limit
+            limit.reset_at = now + self.reset_after
+        injected = self.inject_429 and self._random.random() < self.inject_429
+        if limit.remaining <= 0 or injected:
+            self.stats["429"] += 1
+            is_global = bool(injected and self.global_429)
+            retry_after = self.retry_after if injected else limit.reset_at - now
+            headers = {
+                "Retry-After": f"{retry_after:.3f}",
+                "X-RateLimit-Scope": "global" if is_global else "user",
+            }
+            if is_global:
+                headers["X-RateLimit-Global"] = "true"
+            else:
+                headers.update(self._limit_headers(key, limit, now))
+            return web.Response(
+                status=429,
+                body=orjson.dumps(
+                    {
+                        "message": "You are being rate limited.",
+                        "retry_after": retry_after,
+                        "global": is_global,
+                    }
+                ),
+                headers=headers,
+                content_type="application/json",
+            )
+        limit.remaining -= 1
+        return None
+
+    def _limit_headers(self, key: str, limit: _RouteLimit, now: float) -> dict:
+        return {
+            "X-RateLimit-Limit": str(self.rate_limit),
+            "X-RateLimit-Remaining": str(max(limit.remaining, 0)),
+            "X-RateLimit-Reset-After": f"{max(limit.reset_at - now, 0):.3f}",
+            "X-RateLimit-Bucket": key,
+        }
+
+    async def _rest(self, request: web.Request):
+        self.stats["requests"] += 1
+        path = request.match_info["path"]
+        key = self._route_key(request.method, path)
+        self.route_stats[key] = self.route_stats.get(key, 0) + 1
+        limited = self._rate_limit(key)
+        if limited is not None:
+            return limited
+        headers = self._limit_headers(key, self._limits[key], time.monotonic())
+        for method, pattern, handler in self._compiled:
+            if method != request.method:
+                continue
+            match = pattern.fullmatch(path)
+            if match:
+                status, body = await handler(request, **match.groupdict())
+                break
+        else:
+            status, body = 404, {"message": "404: Not Found", "code": 0}
+        if status == 204:
+            return web.Response(status=204, headers=headers)
+        return web.Response(
+            status=status,
+            body=orjson.dumps(body),
+            headers=headers,
+            content_type="application/json",
+        )
+
+    async def _read_payload(self, request: web.Request) -> dict:
+        if request.content_type.startswith("multipart/"):
+            payload = {}
+            attachments = []
+            reader = await request.multipart()
+            while (part := await reader.next()) is not None:
+                if part.name == "payload_json":
+                    payload = orjson.loads(await part.read())
+                else:
+                    size = 0
+                    while chunk := await part.read_chunk():
+                        size += len(chunk)
+                    attachments.append(
+                        {
+                            "id": _snowflake(self._ids),
+                            "filename": part.filename,
+                            "size": size,
+                        }
+                    )
+            payload["attachments"] = attachments
+            return payload
+        body = await request.read()
+        return orjson.loads(body) if body else {}
+
+    async def _no_content(self, request, **_):
+        await request.read()
+        return 204, None
+
+    async def _get_gateway(self, request):
+        return 200, {"url": self.gateway_url}
+
+    async def _get_gateway_bot(self, request):
+        return 200, {
+            "url": self.gateway_url,
+            "shards": self.recommended_shards,
+            "session_start_limit": {
+                "total": 1000,
+                "remaining": 1000,
+                "reset_after": 0,
+                "max_concurrency": 1,
+            },
+        }
+
+    async def _get_me(self, request):
+        return 200, {"id": self.application_id, "username": "coda-fake", "bio": ""}
+
+    async def _get_commands(self, request, app, guild=None):
+        return 200, self.commands.get(guild or "global", [])
+
+    async def _put_commands(self, request, app, guild=None):
+        commands = await self._read_payload(request)
+        for command in commands:
+            command.setdefault("id", _snowflake(self._ids))
+            command["application_id"] = app
+            if guild:
+                command["guild_id"] = guild
+        self.commands[guild or "global"] = commands
+        return 200, commands
+
+    async def _get_channel(self, request, channel):
+        return 200, {"id": channel, "type": 0, "name": f"channel-{channel}"}
+
+    def _message(self, channel: str, payload: dict) -> dict:
+        message = {
+            "id": _snowflake(self._ids),
+            "channel_id": channel,
+            "content": payload.get("content") or "",
+            "embeds": payload.get("embeds") or [],
+            "components": payload.get("components") or [],
+            "attachments": payload.get("attachments") or [],
+            "author": {"id": self.application_id, "username": "coda-fake", "bot": True},
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S+00:00", time.gmtime()),
+            "pinned": False,
+            "type": 0,
+        }
+        self.messages.setdefault(channel, {})[message["id"]] = message
+        return message
+
+    async def _create_message(self, request, channel):
+        return 200, self._message(channel, await self._read_payload(request))
+
+    async def _get_messages(self, request, channel):
+        limit = int(request.query.get("limit", 50))
+        before = request.query.get("before")
+        after = request.query.get("after")
+        messages = sorted(
+            self.messages.get(channel, {}).values(),
+            key=lambda m: int(m["id"]),
+            reverse=not after,
+        )
+        if before:
+            messages = [m for m in messages if int(m["id"]) < int(before)]
+        if after:
+            messages = [m for m in messages if int(m["id"]) > int(after)]
+            # Discord returns newest first even when paginating with `after`
+            messages = messages[:limit][::-1]
+        return 200, messages[:limit]
+
+    async def _get_message(self, request, channel, message):
+        found = self.messages.get(channel, {}).get(message)
+        if not found:
+            return 404, {"message": "Unknown Message", "code": 10008}
+        return 200, found
+
+    async def _edit_message(self, request, channel, message):
+        found = self.messages.get(channel, {}).get(message)
+        if not found:
+            return 404, {"message": "Unknown Message", "code": 10008}
+        found.update(await self._read_payload(request))
+        return 200, found
+
+    async def _delete_message(self, request, channel, message):
+        self.messages.get(channel, {}).pop(message, None)
+        return 204, None
+
+    async def _bulk_delete(self, request, channel):
+        payload = await self._read_payload(request)
+        for message in payload.get("messages", ()):
+            self.messages.get(channel, {}).pop(message, None)
+        return 204, None
+
+    async def _get_pins(self, request, channel):
+        return 200, [m for m in self.messages.get(channel, {}).values() if m["pinned"]]
+
+    async def _webhook_execute(self, request, id, token):
+        payload = await self._read_payload(request)
+        message = self._message(id, payload)
+        # interaction follow-ups always return the message, webhooks only on ?wait
+        if request.query.get("wait") == "true" or id == self.application_id:
+            return 200, message
+        return 204, None
+
+    async def _webhook_info(self, request, id, token):
+        return 200, {"id": id, "token": token, "type": 1, "name": "fake-webhook"}
+
+    async def _webhook_message(self, request, id, token, message):
+        if request.method == "PATCH":
+            return 200, self._message(id, await self._read_payload(request))
+        return 200, self._message(id, {})
@@ -0,0 +1,84 @@
+import statistics
+import subprocess
+import sys
+import orjson
+from typing import Dict, Iterable, List
+
+# Import statements measured by default: the bare package, what a worker that
+# only builds payloads needs, and the full client.
+DEFAULT_TARGETS = (
+    "import Coda",
+    "from Coda import Intents, Embed, ActionRow, Button",
+    "from Coda import Client",
+)
+
+_PROBE = """
+import sys, time
+before = set(sys.modules)
+start = time.perf_counter()
+exec({statement!r})
+elapsed = time.perf_counter() - start
+import orjson
+sys.stdout.write(orjson.dumps({{
+    "elapsed": elapsed,
+    "modules": len(set(sys.modules) - before),
+    "aiohttp": "aiohttp" in sys.modules,
+}}).decode())
+"""
+
+
+def _probe(statement: str) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(statement=statement)],
+        capture_output=True,
+        check=True,
+    )
+    return orjson.loads(result.stdout)
+
+
+class ImportReport:
+    """
+    Import cost of each statement, measured in fresh interpreters.
+    """
+
+    def __init__(self, samples: Dict[str, List[dict]]):
+        self.results = {
+            statement: {
+                "median_ms": statistics.median(run["elapsed"] for run in runs) * 1e3,
+                "min_ms": min(run["elapsed"] for run in runs) * 1e3,
+                "modules": runs[-1]["modules"],
+                "aiohttp": runs[-1]["aiohttp"],
+            }
+            for statement, runs in samples.items()
+        }
+
+    def to_dict(self) -> dict:
+        return self.results
+
+    def __str__(self) -> str:
+        return "\n".join(
+            f"{statement:<52} {result['median_ms']:7.1f}ms median "
+            f"{result['min_ms']:7.1f}ms min  {result['modules']:4} modules"
+            f"{'  (aiohttp)' if result['aiohttp'] else ''}"
+            for statement, result in self.results.items()
+        )
+
+
+def measure_imports(
+    targets: Iterable[str] = DEFAULT_TARGETS, runs: int = 10
+) -> ImportReport:
+    """
+    Time each import statement `runs` times, every run in a new interpreter
+    so nothing is cached in `sys.modules` (bytecode caches are, as in
+    production).
+    """
+    targets = list(targets)
+    for statement in targets:
+        _probe(statement)  # warm the bytecode cache
+    return ImportReport(
+        {statement: [_probe(statement) for _ in range(runs)] for statement in targets}
+    )
+
+
+if __name__ == "__main__":
+    print(measure_imports())
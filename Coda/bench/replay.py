@@ -0,0 +1,304 @@
+import asyncio
+import gc
+import sys
+import time
+import tracemalloc
+import zlib
+import orjson
+from typing import Callable, List, Optional, Tuple
+from aiohttp import ClientSession, WSMsgType, web
+from .._core.constants import Intents
+from .._core.recorder import (
+    GatewayRecorder,
+    read_recording,
+    FRAME_BINARY,
+    FRAME_RESET,
+)
+from .._core.ws import WebSocket
+
+
+def load_frames(path: str) -> List[Tuple[bool, bytes]]:
+    """
+    Load the frames of the first gateway connection stored in a recording.
+    """
+    frames = []
+    for _, kind, data in read_recording(path):
+        if kind == FRAME_RESET:
+            if frames:
+                break
+            continue
+        frames.append((kind == FRAME_BINARY, data))
+    return frames
+
+
+def write_synthetic_recording(
+    path: str,
+    guilds: int = 100,
+    messages: int = 10000,
+    typing: int = 10000,
+    compress: bool = True,
+) -> None:
+    """
+    Write a synthetic recording (HELLO, READY, GUILD_CREATE burst, then
+    interleaved MESSAGE_CREATE and TYPING_START dispatches) for when no real
+    capture is at hand.
+    """
+    compressor = zlib.compressobj() if compress else None
+    recorder = GatewayRecorder(path)
+    sequence = 0
+
+    def emit(payload: dict):
+        data = orjson.dumps(payload)
+        if compressor:
+            data = compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            recorder.write(True, data)
+        else:
+            recorder.write(False, data)
+
+    def dispatch(event: str, d: dict):
+        nonlocal sequence
+        sequence += 1
+        emit({"op": 0, "t": event, "s": sequence, "d": d})
+
+    emit({"op": 10, "d": {"heartbeat_interval": 41250}})
+    dispatch(
+        "READY",
+        {
+            "v": 10,
+            "session_id": "replay",
+            "resume_gateway_url": "ws://127.0.0.1",
+            "user": {"id": "1", "username": "coda"},
+            "guilds": [
+                {"id": str(10_000 + g), "unavailable": True} for g in range(guilds)
+            ],
+        },
+    )
+    for g in range(guilds):
+        guild_id = str(10_000 + g)
+        dispatch(
+            "GUILD_CREATE",
+            {
+                "id": guild_id,
+                "name": f"guild {g}",
+                "owner_id": "2",
+                "roles": [{"id": guild_id, "permissions": "104324673"}],
+                "channels": [
+                    {
+                        "id": f"{guild_id}{c:02d}",
+                        "type": 0,
+                        "guild_id": guild_id,
+                        "name": f"channel-{c}",
+                        "permission_overwrites": [],
+                    }
+                    for c in range(20)
+                ],
+            },
+        )
+    for i in range(max(messages, typing)):
+        guild_id = str(10_000 + i % guilds)
+        channel_id = f"{guild_id}{i % 20:02d}"
+        if i < messages:
+            dispatch(
+                "MESSAGE_CREATE",
+                {
+                    "id": str(1_000_000 + i),
+                    "channel_id": channel_id,
+                    "guild_id": guild_id,
+                    "content": f"message number {i}",
+                    "author": {"id": "3", "username": "user"},
+                    "member": {"roles": []},
+                    "mentions": [],
+                    "attachments": [],
+                    "embeds": [],
+                },
+            )
+        if i < typing:
+            dispatch(
+                "TYPING_START",
+                {"channel_id": channel_id, "guild_id": guild_id, "user_id": "3"},
+            )
+    recorder.close()
+
+
+class _TimedSocket:
+    """
+    Wraps the client websocket and measures, for every frame, the time `_ws_loop`
+    spends on it (from the moment the frame is handed over until the next one is
+    requested).
+    """
+
+    def __init__(self, ws):
+        self._ws = ws
+        self.latencies: List[float] = []
+        self.frames = 0
+
+    def __getattr__(self, name):
+        return getattr(self._ws, name)
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        perf_counter = time.perf_counter
+        latencies = self.latencies
+        async for msg in self._ws:
+            if msg.type not in (WSMsgType.BINARY, WSMsgType.TEXT):
+                yield msg
+                continue
+            self.frames += 1
+            start = perf_counter()
+            yield msg
+            latencies.append(perf_counter() - start)
+
+
+class ReplayReport:
+    """
+    Result of a replay run.
+    """
+
+    def __init__(
+        self,
+        frames: int,
+        elapsed: float,
+        latencies: List[float],
+        peak_memory: Optional[int] = None,
+        allocated_blocks: Optional[int] = None,
+    ):
+        self.frames = frames
+        self.elapsed = elapsed
+        self.events_per_second = frames / elapsed if elapsed else 0.0
+        ordered = sorted(latencies)
+        self.p50 = ordered[len(ordered) // 2] if ordered else 0.0
+        self.p99 = (
+            ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] if ordered else 0.0
+        )
+        self.peak_memory = peak_memory
+        self.allocated_blocks = allocated_blocks
+
+    def to_dict(self) -> dict:
+        return {
+            "frames": self.frames,
+            "elapsed": self.elapsed,
+            "events_per_second": self.events_per_second,
+            "p50_us": self.p50 * 1e6,
+            "p99_us": self.p99 * 1e6,
+            "peak_memory": self.peak_memory,
+            "allocated_blocks": self.allocated_blocks,
+        }
+
+    def __str__(self) -> str:
+        lines = [
+            f"frames:            {self.frames}",
+            f"elapsed:           {self.elapsed:.3f}s",
+            f"events/sec:        {self.events_per_second:,.0f}",
+            f"dispatch p50:      {self.p50 * 1e6:.1f}us",
+            f"dispatch p99:      {self.p99 * 1e6:.1f}us",
+        ]
+        if self.peak_memory is not None:
+            lines.append(f"peak traced mem:   {self.peak_memory / 1024:,.0f} KiB")
+            lines.append(f"live blocks delta: {self.allocated_blocks:+,}")
+        return "\n".join(lines)
+
+
+class ReplayServer:
+    """
+    Local websocket server that pushes recorded frames to every client as fast
+    as possible, then closes the connection.
+    """
+
+    def __init__(self, frames: List[Tuple[bool, bytes]], host: str = "127.0.0.1"):
+        self.frames = frames
+        self.host = host
+        self.port = None
+        self._runner = None
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    async def _handler(self, request: web.Request):
+        ws = web.WebSocketResponse(max_msg_size=0)
+        await ws.prepare(request)
+        for binary, data in self.frames:
+            if binary:
+                await ws.send_bytes(data)
+            else:
+                await ws.send_str(data.decode())
+        await ws.close()
+        return ws
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/", self._handler)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+
+
+async def _replay_once(
+    server: ReplayServer,
+    compress: bool,
+    setup: Optional[Callable[[WebSocket], None]],
+) -> _TimedSocket:
+    async with ClientSession() as session:
+        shard = WebSocket(
+            intents=Intents.ALL,
+            prefix="",
+            compress=compress,
+            session=session,
+            _gateway_data={"url": server.url},
+        )
+        if setup:
+            setup(shard)
+        await shard._create_ws_connection()
+        shard.ws = timed = _TimedSocket(shard.ws)
+        await shard._ws_loop()
+        if hasattr(shard, "_keep_alive_task"):
+            shard._keep_alive_task.cancel()
+        # let handler tasks scheduled by the last frames finish
+        await asyncio.sleep(0)
+        return timed
+
+
+async def replay(
+    path: str,
+    setup: Optional[Callable[[WebSocket], None]] = None,
+    trace_allocations: bool = True,
+) -> ReplayReport:
+    """
+    Replay a gateway recording into a `WebSocket` through a local server at full
+    speed and report throughput, per-frame dispatch latency and allocations.
+
+    `setup` is called with the shard before it connects, to register the
+    handlers that should be part of the measurement. Allocations are measured in
+    a second pass so tracemalloc does not skew the timings.
+    """
+    frames = load_frames(path)
+    compress = any(binary for binary, _ in frames)
+    server = ReplayServer(frames)
+    await server.start()
+    try:
+        gc.collect()
+        start = time.perf_counter()
+        timed = await _replay_once(server, compress, setup)
+        elapsed = time.perf_counter() - start
+
+        peak = blocks = None
+        if trace_allocations:
+            gc.collect()
+            blocks_before = sys.getallocatedblocks()
+            tracemalloc.start()
+            await _replay_once(server, compress, setup)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            gc.collect()
+            blocks = sys.getallocatedblocks() - blocks_before
+    finally:
+        await server.stop()
+    return ReplayReport(timed.frames, elapsed, timed.latencies, peak, blocks)
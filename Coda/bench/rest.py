@@ -0,0 +1,102 @@
+import asyncio
+import time
+from typing import List
+from .._core.constants import Intents
+from .._core.ws import Client
+from .fake_server import FakeDiscord
+
+
+class RestReport:
+    """
+    Result of a REST benchmark run.
+    """
+
+    def __init__(
+        self,
+        requests: int,
+        elapsed: float,
+        latencies: List[float],
+        rate_limited: int,
+        errors: int,
+    ):
+        self.requests = requests
+        self.elapsed = elapsed
+        self.requests_per_second = requests / elapsed if elapsed else 0.0
+        ordered = sorted(latencies)
+        self.p50 = ordered[len(ordered) // 2] if ordered else 0.0
+        self.p99 = (
+            ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] if ordered else 0.0
+        )
+        self.rate_limited = rate_limited
+        self.errors = errors
+
+    def to_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "elapsed": self.elapsed,
+            "requests_per_second": self.requests_per_second,
+            "p50_ms": self.p50 * 1e3,
+            "p99_ms": self.p99 * 1e3,
+            "rate_limited": self.rate_limited,
+            "errors": self.errors,
+        }
+
+    def __str__(self) -> str:
+        return "\n".join(
+            [
+                f"requests:          {self.requests}",
+                f"elapsed:           {self.elapsed:.3f}s",
+                f"requests/sec:      {self.requests_per_second:,.0f}",
+                f"latency p50:       {self.p50 * 1e3:.2f}ms",
+                f"latency p99:       {self.p99 * 1e3:.2f}ms",
+                f"429 responses:     {self.rate_limited}",
+                f"errors:            {self.errors}",
+            ]
+        )
+
+
+async def measure_rest(
+    requests: int = 2000,
+    concurrency: int = 50,
+    channels: int = 10,
+    rate_limit: int = None,
+    inject_429: float = 0.0,
+) -> RestReport:
+    """
+    Send `requests` messages spread over `channels` channels through a `Client`
+    against a local `FakeDiscord`, `concurrency` at a time, and report
+    throughput and per-request latency including rate limit waits.
+
+    `rate_limit` is the per-channel bucket size of the fake server, by default
+    large enough that only `inject_429` causes 429s.
+    """
+    async with FakeDiscord(
+        rate_limit=rate_limit or requests, inject_429=inject_429, retry_after=0.05
+    ) as fake:
+        client = Client("bench", Intents.ALL, base_url=fake.base_url)
+        await client.register()
+        try:
+            targets = [
+                await client.get_channel(str(channel)) for channel in range(channels)
+            ]
+            latencies = []
+            errors = 0
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def send(index: int):
+                nonlocal errors
+                async with semaphore:
+                    start = time.perf_counter()
+                    try:
+                        await targets[index % channels].send(content=f"bench {index}")
+                    except Exception:
+                        errors += 1
+                        return
+                    latencies.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            await asyncio.gather(*(send(index) for index in range(requests)))
+            elapsed = time.perf_counter() - start
+        finally:
+            await client.session.close()
+        return RestReport(requests, elapsed, latencies, fake.stats["429"], errors)
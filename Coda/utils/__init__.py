@@ -1,2 +1 @@
-from .helpers import *
 from .tools import *
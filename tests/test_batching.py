@@ -0,0 +1,120 @@
+import asyncio
+import gc
+from Coda._core import batching
+from Coda._core.batching import MessageBatcher, batcher_for
+
+
+class FakeChannel:
+    def __init__(self, id: str):
+        self.id = id
+        self.sent = []
+
+    async def send(self, content=None, embeds=None):
+        self.sent.append(content)
+        return len(self.sent)
+
+
+class SlowChannel(FakeChannel):
+    """
+    The first send is the slowest, so concurrent sends would finish out of order.
+    """
+
+    def __init__(self, id: str):
+        super().__init__(id)
+        self.delays = [0.02, 0.0]
+
+    async def send(self, content=None, embeds=None):
+        await asyncio.sleep(self.delays.pop(0) if self.delays else 0)
+        return await super().send(content, embeds)
+
+
+class FailingChannel(FakeChannel):
+    async def send(self, content=None, embeds=None):
+        raise RuntimeError("no access")
+
+
+def test_batches_coalesce_in_order():
+    async def main():
+        channel = FakeChannel("1")
+        batcher = batcher_for(channel, 0.01)
+        futures = [batcher.send(f"line {index}") for index in range(3)]
+        assert await asyncio.gather(*futures) == [1, 1, 1]
+        assert channel.sent == ["line 0\nline 1\nline 2"]
+
+    asyncio.run(main())
+
+
+def test_flushed_batchers_are_evicted():
+    async def main():
+        channels = [FakeChannel(str(index)) for index in range(100)]
+        for channel in channels:
+            batcher_for(channel, 0.01).send("hi")
+        assert len(batching._batchers) == 100
+        await MessageBatcher.flush_all()
+        assert not batching._batchers
+
+        # A batcher kept by the caller registers again when reused.
+        batcher = batcher_for(channels[0], 0.01)
+        await batcher.flush()
+        assert not batching._batchers
+        future = batcher.send("again")
+        assert batching._batchers == {"0": batcher}
+        await future
+        await asyncio.sleep(0)
+        assert not batching._batchers
+        assert channels[0].sent == ["hi", "again"]
+
+    asyncio.run(main())
+
+
+def test_direct_flush_waits_for_the_window_flush():
+    async def main():
+        channel = SlowChannel("2")
+        batcher = batcher_for(channel, 0)
+        batcher.send("first")
+        await asyncio.sleep(0.001)  # the window flush is now sending
+        batcher.send("second")
+        await batcher.flush()
+        assert channel.sent == ["first", "second"]
+
+    asyncio.run(main())
+
+
+def test_evicted_batcher_hands_over_to_its_replacement():
+    async def main():
+        channel = FakeChannel("3")
+        old = batcher_for(channel, 0.01)
+        await old.flush()
+        new = batcher_for(channel, 0.01)
+        assert new is not old
+        await asyncio.gather(old.send("a"), new.send("b"))
+        assert channel.sent == ["a\nb"]
+        assert len(old) == 0
+
+    asyncio.run(main())
+
+
+def test_failed_sends_are_logged_not_left_unretrieved(caplog):
+    contexts = []
+
+    async def main():
+        asyncio.get_running_loop().set_exception_handler(
+            lambda loop, context: contexts.append(context)
+        )
+        batcher = batcher_for(FailingChannel("4"), 0.01)
+        batcher.send("lost")
+        await batcher.flush()
+        gc.collect()
+
+    asyncio.run(main())
+    assert contexts == []
+    assert "Batched send to channel 4 failed" in caplog.text
+
+
+def test_embeds_split_on_the_total_size():
+    big = {"title": "t", "description": "x" * 3999}
+    messages = MessageBatcher._pack([("", [big, big], None), ("", [big], None)])
+    assert [len(embeds) for _, embeds, _ in messages] == [1, 1, 1]
+    small = {"title": "t", "description": "x" * 10}
+    messages = MessageBatcher._pack([("", [small] * 12, None)])
+    assert [len(embeds) for _, embeds, _ in messages] == [10, 2]
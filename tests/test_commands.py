@@ -0,0 +1,117 @@
+import asyncio
+import pytest
+from Coda._core.commands import Command, CommandRouter
+from Coda._core.exceptions import BadArgument
+from Coda._core.trie import PrefixTrie
+
+
+async def _noop(message, *args):
+    pass
+
+
+def _router(prefixes, **kwargs) -> CommandRouter:
+    router = CommandRouter(prefixes, **kwargs)
+    router.add(Command(_noop, name="ping", aliases=["p"]))
+    return router
+
+
+def _match(router, content, guild_id=None):
+    match = asyncio.run(router.match(content, guild_id))
+    return match and (match[0].name, match[1])
+
+
+def test_trie_prefixes_shortest_first():
+    trie = PrefixTrie()
+    trie.insert("!", 1)
+    trie.insert("!!", 2)
+    assert list(trie.prefixes("!!x")) == [(1, 1), (2, 2)]
+    assert trie.longest_prefix("?x") is None
+    trie.remove("!")
+    assert trie.get("!") is None and trie.get("!!") == 2 and len(trie) == 1
+
+
+def test_longest_prefix_and_aliases():
+    router = _router(["!", "!!"])
+    assert _match(router, "!!p 3") == ("ping", "3")
+    assert _match(router, "!ping") == ("ping", "")
+    assert _match(router, "?ping") is None
+
+
+def test_empty_prefix_matches_every_message():
+    router = _router("")
+    assert _match(router, "ping 3") == ("ping", "3")
+    assert _match(router, "hello") is None
+
+
+def test_mention_prefix():
+    router = _router("!", mention_prefix=True)
+    router.set_user_id("42")
+    assert _match(router, "<@42>  ping x") == ("ping", "x")
+
+
+def test_resolver_called_once_per_guild_even_without_prefixes():
+    calls = []
+
+    async def resolver(guild_id):
+        calls.append(guild_id)
+        return []
+
+    router = _router("!", prefix_resolver=resolver)
+    assert router.needs_resolve("1")
+    for _ in range(3):
+        assert _match(router, "!ping", "1") is None
+    assert calls == [1]
+    assert not router.needs_resolve("1") and not router.needs_resolve(1)
+    router.invalidate_prefix(1)
+    assert router.needs_resolve("1")
+
+
+def _parse(coro, arguments: str):
+    command = Command(coro, name="c")
+    return asyncio.run(command.parse(None, arguments, None))
+
+
+def test_converters_from_annotations():
+    async def add(message, a: int, b: float = 1.0, *rest: bool):
+        pass
+
+    assert _parse(add, '2 "3.5" yes off') == ([2, 3.5, True, False], {})
+
+
+def test_optional_annotations_convert_the_inner_type():
+    from typing import Optional
+
+    async def old(message, n: Optional[int] = None):
+        pass
+
+    async def new(message, n: int | None = None):
+        pass
+
+    assert _parse(old, "3") == ([3], {})
+    assert _parse(new, "3") == ([3], {})
+    assert _parse(new, "") == ([None], {})
+
+
+def test_keyword_only_parameter_takes_the_rest():
+    async def say(message, target: int, *, text: str):
+        pass
+
+    assert _parse(say, '5   hello   "world"') == ([5], {"text": 'hello   "world"'})
+
+
+def test_callable_annotations_fail_as_bad_argument():
+    class NeedsDict:
+        def __init__(self, tree: dict):
+            self.id = tree["id"]
+
+    async def show(message, target: NeedsDict):
+        pass
+
+    async def hexa(message, value: lambda raw: int(raw, 16)):
+        pass
+
+    assert _parse(hexa, "ff") == ([255], {})
+    with pytest.raises(BadArgument):
+        _parse(hexa, "zz")
+    with pytest.raises(BadArgument):
+        _parse(show, "123")
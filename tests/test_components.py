@@ -0,0 +1,89 @@
+import orjson
+import pytest
+from Coda._core.components import (
+    ActionRow,
+    Button,
+    ChannelSelect,
+    SelectOption,
+    StringSelect,
+)
+from Coda._core.models import Embed
+
+
+def _row() -> ActionRow:
+    return ActionRow(
+        [
+            Button(label="Yes", custom_id="vote:yes", emoji={"name": "✅"}),
+            StringSelect(
+                "pick",
+                [SelectOption("One", "1"), SelectOption("Two", "2", "second")],
+                placeholder="…",
+            ),
+            ChannelSelect("where", channel_types=[0, 5]),
+        ]
+    )
+
+
+def _embed() -> Embed:
+    embed = Embed("Title", "Description ü", color=0x5865F2, timestamp="2024")
+    return embed.add_field("a", "1").add_field("b", "2", inline=True)
+
+
+def _payload(row: ActionRow, embed: Embed) -> bytes:
+    return orjson.dumps(
+        {"content": "hi", "embeds": [embed.tree], "components": [row.tree]}
+    )
+
+
+def test_frozen_payload_serializes_byte_identically():
+    row, embed = _row(), _embed()
+    unfrozen = _payload(row, embed)
+    assert row.freeze() is row and embed.freeze() is embed
+    assert isinstance(row.tree, orjson.Fragment)
+    assert isinstance(embed.tree, orjson.Fragment)
+    assert _payload(row, embed) == unfrozen
+    # Freezing again keeps the first serialization.
+    fragment = row.tree
+    assert row.freeze().tree is fragment
+    assert _payload(row, embed) == unfrozen
+
+
+def test_frozen_embed_rejects_changes():
+    embed = _embed().freeze()
+    before = orjson.dumps(embed.tree)
+    with pytest.raises(ValueError):
+        embed.add_field("c", "3")
+    assert orjson.dumps(embed.tree) == before
+
+
+def test_frozen_row_rejects_changes():
+    row = _row()
+    button, select, channels = row.components
+    row.freeze()
+    before = orjson.dumps(row.tree)
+    with pytest.raises(ValueError):
+        row.add_component(Button(label="No"))
+    with pytest.raises(AttributeError):
+        row.components.append(Button(label="No"))
+    with pytest.raises(ValueError):
+        button.label = "No"
+    with pytest.raises(ValueError):
+        select.options[0].label = "Uno"
+    with pytest.raises(AttributeError):
+        select.options.append(SelectOption("Three", "3"))
+    with pytest.raises(AttributeError):
+        channels.channel_types.append(2)
+    assert orjson.dumps(row.tree) == before
+
+
+def test_unfrozen_components_stay_mutable():
+    row = _row()
+    row.components[0].label = "No"
+    row.add_component(Button(label="Maybe", custom_id="vote:maybe"))
+    tree = orjson.loads(orjson.dumps(row.tree))
+    assert [c.get("label") for c in tree["components"]] == [
+        "No",
+        None,
+        None,
+        "Maybe",
+    ]
@@ -0,0 +1,77 @@
+import asyncio
+import io
+import orjson
+from aiohttp import ClientSession, web
+from Coda._core.files import File
+from Coda._core.http import _request
+
+
+class Upload:
+    """
+    Answers the first request with a 429 and records the parts of every attempt.
+    """
+
+    def __init__(self, limited: int = 1):
+        self.limited = limited
+        self.attempts = []
+
+    async def handle(self, request: web.Request):
+        parts = {}
+        reader = await request.multipart()
+        while (part := await reader.next()) is not None:
+            parts[part.filename or part.name] = bytes(await part.read())
+        self.attempts.append(parts)
+        if self.limited:
+            self.limited -= 1
+            return web.json_response({"retry_after": 0.01, "global": False}, status=429)
+        return web.json_response({"id": "1"})
+
+    async def send(self, files) -> dict:
+        app = web.Application()
+        app.router.add_post("/upload", self.handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        try:
+            async with ClientSession() as session:
+                return await _request(
+                    session,
+                    "POST",
+                    f"http://127.0.0.1:{port}/upload",
+                    json={"content": "hi"},
+                    files=files,
+                )
+        finally:
+            await runner.cleanup()
+
+
+def test_rate_limited_upload_resends_every_file(tmp_path):
+    data = bytes(range(256)) * 1024
+    path = tmp_path / "big.bin"
+    path.write_bytes(data)
+    stream = open(path, "rb")
+    stream.read(16)  # streamed from where the caller left it
+    files = [
+        File(str(path)),
+        File(stream, filename="stream.bin"),
+        File(io.BytesIO(b"buffer"), filename="buffer.txt"),
+        File(b"raw", filename="raw.txt"),
+    ]
+    upload = Upload()
+    assert asyncio.run(upload.send(files)) == {"id": "1"}
+    assert len(upload.attempts) == 2
+    first, second = upload.attempts
+    assert first == second
+    assert second["big.bin"] == data
+    assert second["stream.bin"] == data[16:]
+    assert second["buffer.txt"] == b"buffer" and second["raw.txt"] == b"raw"
+    assert orjson.loads(second["payload_json"])["attachments"][1] == {
+        "id": 1,
+        "filename": "stream.bin",
+    }
+    # The caller's file object stays open, paths opened per attempt are closed.
+    assert not stream.closed
+    assert files[0]._opened is None
+    stream.close()
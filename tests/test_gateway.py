@@ -0,0 +1,182 @@
+import asyncio
+import orjson
+from aiohttp import WSMsgType
+from Coda._core.constants import Intents
+from Coda._core.ws import WebSocket
+
+
+class _Message:
+    def __init__(self, payload: dict):
+        self.type = WSMsgType.TEXT
+        self.data = orjson.dumps(payload).decode()
+
+
+class FakeSocket:
+    def __init__(self, *payloads: dict):
+        self.payloads = payloads
+        self.sent = []
+        self.closed = False
+        self.close_code = None
+
+    async def __aiter__(self):
+        for payload in self.payloads:
+            yield _Message(payload)
+
+    async def send_bytes(self, data: bytes):
+        self.sent.append(orjson.loads(data))
+
+    async def close(self, code: int = 1000):
+        self.closed = True
+        self.close_code = code
+
+
+def dispatch(event: str, d: dict, s: int = 1) -> dict:
+    return {"op": 0, "t": event, "s": s, "d": d}
+
+
+def _shard(**kwargs) -> WebSocket:
+    return WebSocket(intents=Intents.ALL, prefix="!", compress=False, **kwargs)
+
+
+def test_reconnect_keeps_reading_in_place():
+    async def scenario():
+        shard = _shard()
+        shard.session_id = "s"
+        shard._last_sequence = 0
+        after = FakeSocket(dispatch("RESUMED", {}, 2), dispatch("TYPING_START", {}, 3))
+        seen = []
+
+        async def reconnect():
+            shard.ws = after
+
+        async def typing(d):
+            seen.append(d)
+
+        shard._reconnect_to_ws = reconnect
+        shard._raw_events_tree["TYPING_START"] = typing
+        shard.ws = FakeSocket({"op": 7, "d": None})
+        await shard._ws_loop()
+        await asyncio.sleep(0)
+        return seen, after.sent, shard._last_sequence
+
+    seen, sent, sequence = asyncio.run(scenario())
+    assert seen == [{}]
+    assert sent[0]["op"] == 6
+    assert sequence == 3
+
+
+def test_dispatch_filter_sees_the_id_of_guild_events():
+    async def scenario():
+        shard = _shard()
+        seen = []
+
+        @shard.dispatch_filter
+        def only_guild_one(event, guild_id, channel_id):
+            seen.append((event, guild_id))
+            return guild_id == 1
+
+        shard.ws = FakeSocket(
+            dispatch("GUILD_CREATE", {"id": "1", "name": "a"}),
+            dispatch("GUILD_CREATE", {"id": "2", "name": "b"}),
+            dispatch("GUILD_DELETE", {"id": "1"}, 3),
+            dispatch("CHANNEL_CREATE", {"id": "9", "guild_id": "2", "type": 0}, 4),
+        )
+        await shard._ws_loop()
+        return seen, shard
+
+    seen, shard = asyncio.run(scenario())
+    assert seen == [
+        ("GUILD_CREATE", 1),
+        ("GUILD_CREATE", 2),
+        ("GUILD_DELETE", 1),
+        ("CHANNEL_CREATE", 2),
+    ]
+    assert shard.get_guild("2") is None and shard._channels == {}
+
+
+def _guild_create(guild_id: str, name: str, channels, s: int) -> dict:
+    return dispatch(
+        "GUILD_CREATE",
+        {"id": guild_id, "name": name, "channels": [{"id": c} for c in channels]},
+        s,
+    )
+
+
+def test_lazy_guild_is_rebuilt_from_a_newer_guild_create():
+    async def scenario():
+        shard = _shard(lazy_guilds=True)
+        shard.ws = FakeSocket(_guild_create("1", "old", ["10", "11"], 1))
+        await shard._ws_loop()
+        old = shard.get_guild(1)
+        shard.ws = FakeSocket(_guild_create("1", "new", ["10"], 2))
+        await shard._ws_loop()
+        return old, shard
+
+    old, shard = asyncio.run(scenario())
+    assert old.name == "old"
+    assert shard.get_guild("1").name == "new"
+    assert list(shard._channels) == [10]
+
+
+def test_guilds_ready_fires_and_its_task_is_kept():
+    async def scenario():
+        shard = _shard(lazy_guilds=True)
+        fired = []
+
+        async def ready():
+            fired.append(True)
+
+        shard._events_tree["on_guilds_ready"] = ready
+        shard.ws = FakeSocket(
+            dispatch(
+                "READY",
+                {"resume_gateway_url": "x", "session_id": "s", "guilds": [{"id": "1"}]},
+            ),
+            _guild_create("1", "a", [], 2),
+        )
+        await shard._ws_loop()
+        task = shard._guilds_ready_task
+        await asyncio.wait_for(task, 1)
+        await asyncio.sleep(0)
+        shard._cancel_tasks()
+        return fired, task
+
+    fired, task = asyncio.run(scenario())
+    assert fired == [True] and task.done()
+
+
+def test_entity_events_do_not_build_lazy_guilds():
+    async def scenario():
+        shard = _shard(lazy_guilds=True)
+        guild = _guild_create("1", "a", ["10", "11"], 1)
+        guild["d"]["roles"] = [{"id": "1", "permissions": "0"}]
+        guild["d"]["members"] = [{"user": {"id": "5"}, "roles": []}]
+        shard.ws = FakeSocket(
+            guild,
+            dispatch(
+                "GUILD_ROLE_CREATE",
+                {"guild_id": "1", "role": {"id": "2", "permissions": "8"}},
+                2,
+            ),
+            dispatch("GUILD_MEMBER_ADD", {"guild_id": "1", "user": {"id": "6"}}, 3),
+            dispatch("GUILD_MEMBER_REMOVE", {"guild_id": "1", "user": {"id": "5"}}, 4),
+            dispatch("CHANNEL_CREATE", {"id": "12", "guild_id": "1", "type": 0}, 5),
+            dispatch("CHANNEL_DELETE", {"id": "11", "guild_id": "1", "type": 0}, 6),
+        )
+        await shard._ws_loop()
+        assert shard._guilds == {} and 1 in shard._lazy_guild_payloads
+        return shard, shard.get_guild(1)
+
+    shard, guild = asyncio.run(scenario())
+    assert sorted(guild.roles) == [1, 2]
+    assert sorted(guild.members) == [6]
+    assert sorted(guild.channels) == [10, 12]
+    assert sorted(shard._channels) == [10, 12]
+    assert shard._lazy_guild_updates == {} and shard._lazy_channel_index == {}
+
+
+def test_clients_pass_guilds_ready_timeout():
+    from Coda._core.ws import Client
+
+    client = Client("token", Intents.ALL, guilds_ready_timeout=7.5)
+    assert client._guilds_ready_timeout == 7.5
@@ -0,0 +1,121 @@
+import asyncio
+import time
+from Coda._core import ws
+from Coda._core.constants import ShardHealth
+from Coda._core.health import DEGRADED_LATENCY, LoopLagMonitor
+from test_gateway import FakeSocket, _shard
+
+
+def test_lag_thresholds_are_inclusive():
+    monitor = LoopLagMonitor(degraded_threshold=0.25, zombie_threshold=5.0, window=1)
+    for lag, status in [
+        (0.0, ShardHealth.HEALTHY),
+        (0.2499, ShardHealth.HEALTHY),
+        (0.25, ShardHealth.DEGRADED),
+        (4.999, ShardHealth.DEGRADED),
+        (5.0, ShardHealth.ZOMBIE),
+        (0.1, ShardHealth.HEALTHY),
+    ]:
+        monitor.record(lag)
+        assert monitor.status is status, lag
+        assert monitor.lag == lag
+
+
+def test_lag_status_follows_the_window_and_notifies_changes(caplog):
+    changes = []
+    monitor = LoopLagMonitor(degraded_threshold=0.25, zombie_threshold=5.0, window=3)
+
+    @monitor.on_lag
+    def broken(lag, status):
+        raise RuntimeError("callback bug")
+
+    @monitor.on_lag
+    def track(lag, status):
+        changes.append((lag, status))
+
+    monitor.record(0.3)
+    # The spike keeps the shard degraded until it leaves the window.
+    monitor.record(0.0)
+    monitor.record(0.0)
+    assert monitor.status is ShardHealth.DEGRADED and monitor.max_lag == 0.3
+    monitor.record(0.0)
+    assert monitor.status is ShardHealth.HEALTHY and monitor.max_lag == 0.0
+    monitor.record(6.0)
+    assert changes == [
+        (0.3, ShardHealth.DEGRADED),
+        (0.0, ShardHealth.HEALTHY),
+        (6.0, ShardHealth.ZOMBIE),
+    ]
+    assert "callback bug" in caplog.text
+
+
+def test_coroutine_callbacks_are_scheduled():
+    async def main():
+        notified = asyncio.Event()
+        monitor = LoopLagMonitor(degraded_threshold=0.25)
+
+        @monitor.on_lag
+        async def shed(lag, status):
+            notified.set()
+
+        monitor.record(1.0)
+        await asyncio.wait_for(notified.wait(), 1)
+
+    asyncio.run(main())
+
+
+def test_blocked_loop_is_measured():
+    async def main():
+        monitor = LoopLagMonitor(
+            interval=0.01, degraded_threshold=0.05, zombie_threshold=60
+        ).start()
+        await asyncio.sleep(0.015)
+        time.sleep(0.1)
+        await asyncio.sleep(0.03)
+        monitor.stop()
+        return monitor
+
+    monitor = asyncio.run(main())
+    assert monitor.max_lag >= 0.05
+    assert monitor.status is ShardHealth.DEGRADED
+
+
+def test_shard_health_transitions(monkeypatch):
+    clock = [100.0]
+    loop_monitor = LoopLagMonitor(degraded_threshold=0.25, zombie_threshold=5.0)
+    monkeypatch.setattr(ws, "perf_counter", lambda: clock[0])
+    monkeypatch.setattr(ws, "lag_monitor", loop_monitor)
+
+    shard = _shard()
+    assert shard.health() is ShardHealth.ZOMBIE  # never connected
+    shard.ws = FakeSocket()
+    shard._heartbeat_interval = 40.0
+    assert shard.health() is ShardHealth.HEALTHY
+
+    shard.latency = DEGRADED_LATENCY - 0.001
+    assert shard.health() is ShardHealth.HEALTHY
+    shard.latency = DEGRADED_LATENCY
+    assert shard.health() is ShardHealth.DEGRADED
+    # The worst of the heartbeat and the event loop status wins.
+    loop_monitor.record(5.0)
+    assert shard.health() is ShardHealth.ZOMBIE
+    loop_monitor = LoopLagMonitor(degraded_threshold=0.25, window=1)
+    monkeypatch.setattr(ws, "lag_monitor", loop_monitor)
+    loop_monitor.record(0.3)
+    shard.latency = 0.05
+    assert shard.health() is ShardHealth.DEGRADED
+    loop_monitor.record(0.0)
+    assert shard.health() is ShardHealth.HEALTHY
+
+    # A heartbeat left unacknowledged for a whole interval.
+    shard._heartbeat_sent = clock[0]
+    shard._heartbeat_acked = False
+    clock[0] += 40.0
+    assert shard.health() is ShardHealth.HEALTHY
+    clock[0] += 0.001
+    assert shard.health() is ShardHealth.ZOMBIE
+    shard._heartbeat_acked = True
+    assert shard.health() is ShardHealth.HEALTHY
+
+    shard.ws.closed = True
+    assert shard.health() is ShardHealth.ZOMBIE
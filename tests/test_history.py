@@ -0,0 +1,98 @@
+import asyncio
+import time
+from Coda._core.constants import Intents, __base_url__
+from Coda._core.http import set_base_url
+from Coda._core.snowflake import time_snowflake
+from Coda._core.ws import Client
+from Coda.bench.fake_server import FakeDiscord
+
+_DAY = 24 * 3600
+
+
+def _seed(fake: FakeDiscord, channel: str, ids) -> None:
+    messages = fake.messages.setdefault(channel, {})
+    for message_id in ids:
+        messages[str(message_id)] = {
+            "id": str(message_id),
+            "channel_id": channel,
+            "content": "",
+            "author": {"id": "1", "username": "x"},
+        }
+
+
+def _run(scenario):
+    async def main():
+        async with FakeDiscord() as fake:
+            client = Client("token", Intents.ALL, base_url=fake.base_url)
+            await client.register()
+            try:
+                return await scenario(fake, await client.get_channel("1"))
+            finally:
+                await client.session.close()
+                set_base_url(__base_url__)
+
+    return asyncio.run(main())
+
+
+def test_history_pages_past_100_messages():
+    ids = [time_snowflake(time.time()) + index for index in range(250)]
+
+    async def scenario(fake, channel):
+        _seed(fake, "1", ids)
+        newest = [int(m.id) async for m in channel.history(limit=None)]
+        limited = [int(m.id) async for m in channel.history(limit=150)]
+        before = [int(m.id) async for m in channel.history(limit=5, before=ids[10])]
+        return newest, limited, before, fake.route_stats["GET channels/1/messages"]
+
+    newest, limited, before, requests = _run(scenario)
+    assert newest == ids[::-1]
+    assert limited == ids[:-151:-1]
+    assert before == ids[9:4:-1]
+    # 3 pages for the whole history, 2 for 150, 1 for 5.
+    assert requests == 6
+
+
+def test_history_after_is_oldest_first():
+    ids = [time_snowflake(time.time()) + index for index in range(230)]
+
+    async def scenario(fake, channel):
+        _seed(fake, "1", ids)
+        after = [int(m.id) async for m in channel.history(limit=None, after=ids[9])]
+        between = [
+            int(m.id)
+            async for m in channel.history(limit=None, before=ids[20], after=ids[14])
+        ]
+        return after, between
+
+    after, between = _run(scenario)
+    assert after == ids[10:]
+    assert between == ids[19:14:-1]
+
+
+def test_purge_bulk_deletes_recent_and_deletes_old_one_by_one():
+    now = time.time()
+    old = [time_snowflake(now - 20 * _DAY) + index for index in range(3)]
+    recent = [time_snowflake(now - 60) + index for index in range(120)]
+
+    async def scenario(fake, channel):
+        _seed(fake, "1", old + recent)
+        deleted = await channel.purge(limit=None)
+        return deleted, fake.messages["1"], fake.route_stats
+
+    deleted, left, stats = _run(scenario)
+    assert deleted == 123 and left == {}
+    assert stats["POST channels/1/messages/bulk-delete"] == 2
+    assert stats["DELETE channels/1/messages/:id"] == 3
+
+
+def test_purge_check_filters_messages():
+    ids = [time_snowflake(time.time()) + index for index in range(10)]
+
+    async def scenario(fake, channel):
+        _seed(fake, "1", ids)
+        deleted = await channel.purge(check=lambda m: int(m.id) % 2 == 0)
+        return deleted, sorted(map(int, fake.messages["1"]))
+
+    deleted, left = _run(scenario)
+    assert deleted == 5
+    assert left == [i for i in ids if i % 2]
@@ -0,0 +1,20 @@
+from Coda._core.http import RateLimiter, route_template
+
+
+def test_route_template_hides_tokens_and_ids():
+    assert route_template("webhooks/123/SECRET") == "webhooks/:id/:token"
+    assert (
+        route_template("interactions/1/a.b-c/callback")
+        == "interactions/:id/:token/callback"
+    )
+    assert route_template("channels/55/messages/66") == "channels/:id/messages/:id"
+    assert route_template("gateway/bot") == "gateway/bot"
+
+
+def test_buckets_keep_tokens_but_label_by_template():
+    limiter = RateLimiter()
+    first = limiter.get_bucket("POST", "https://discord.com/api/webhooks/1/a?wait=true")
+    second = limiter.get_bucket("POST", "http://127.0.0.1:8080/api/v10/webhooks/1/b")
+    assert first is not second
+    assert first.key == "POST webhooks/1/a"
+    assert first.route == second.route == "POST webhooks/:id/:token"
@@ -0,0 +1,185 @@
+import asyncio
+import os
+import subprocess
+import sys
+import time
+import orjson
+from aiohttp import ClientSession
+from nacl.signing import SigningKey
+from Coda._core import interactions
+from Coda._core.http_interactions import InteractionServer
+from Coda._core.interactions import Interaction, InteractionCallback
+
+_KEY = SigningKey.generate()
+_COMMAND = {
+    "id": "1",
+    "application_id": "2",
+    "token": "tok",
+    "type": 2,
+    "data": {"name": "ping"},
+}
+
+
+class FakeClient:
+    def __init__(self, handler):
+        self.handler = handler
+        self.session = None
+
+    async def _dispatch_interaction(self, data, callback):
+        interaction = Interaction(self.session, data, "Bot x", callback=callback)
+        return asyncio.create_task(self.handler(interaction))
+
+
+def _server(handler, **kwargs) -> InteractionServer:
+    return InteractionServer(
+        FakeClient(handler),
+        _KEY.verify_key.encode().hex(),
+        host="127.0.0.1",
+        port=0,
+        defer_after=0.05,
+        **kwargs,
+    )
+
+
+def _signed(body: bytes, timestamp: str = None) -> dict:
+    timestamp = timestamp or str(int(time.time()))
+    signature = _KEY.sign(timestamp.encode() + body).signature.hex()
+    return {"X-Signature-Ed25519": signature, "X-Signature-Timestamp": timestamp}
+
+
+async def _post(server: InteractionServer, data: dict):
+    body = orjson.dumps(data)
+    async with ClientSession() as session:
+        async with session.post(
+            f"http://127.0.0.1:{server.port}{server.path}",
+            data=body,
+            headers=_signed(body),
+        ) as response:
+            return response.status, await response.read()
+
+
+def _verify_args(headers: dict) -> dict:
+    return {
+        "signature": headers["X-Signature-Ed25519"],
+        "timestamp": headers["X-Signature-Timestamp"],
+    }
+
+
+def test_verify_rejects_stale_timestamps():
+    server = _server(None)
+    body = b"{}"
+    assert server.verify(**_verify_args(_signed(body)), body=body)
+    stale = str(int(time.time()) - 3600)
+    assert not server.verify(**_verify_args(_signed(body, stale)), body=body)
+    assert not server.verify(**_verify_args(_signed(body, "soon")), body=body)
+
+
+def test_handler_that_never_responds_gets_500():
+    async def handler(interaction):
+        raise RuntimeError("boom")
+
+    async def main():
+        async with _server(handler) as server:
+            status, _ = await _post(server, _COMMAND)
+        assert status == 500
+
+    asyncio.run(main())
+
+
+def test_late_ephemeral_response_after_public_deferral(monkeypatch):
+    requests = []
+
+    async def fake_request(session, method, url, **kwargs):
+        requests.append((method, url.split("/api/")[-1], kwargs.get("json")))
+        return {}
+
+    monkeypatch.setattr(interactions, "_request", fake_request)
+
+    async def main():
+        finished = asyncio.Event()
+
+        async def handler(interaction):
+            await asyncio.sleep(0.2)
+            await interaction.respond(content="secret", ephemeral=True)
+            finished.set()
+
+        async with _server(handler) as server:
+            status, body = await _post(server, _COMMAND)
+            assert status == 200
+            assert orjson.loads(body) == {"type": 5}
+            await asyncio.wait_for(finished.wait(), 2)
+
+    asyncio.run(main())
+    (delete, _, _), (post, url, json) = requests
+    assert delete == "DELETE"
+    assert post == "POST" and url.endswith("webhooks/2/tok")
+    assert json["flags"] == 64
+
+
+def test_ephemeral_defer_sends_flags():
+    async def handler(interaction):
+        await asyncio.sleep(0.2)
+
+    async def main():
+        async with _server(handler, ephemeral_defer=True) as server:
+            _, body = await _post(server, _COMMAND)
+        assert orjson.loads(body) == {"type": 5, "data": {"flags": 64}}
+
+    asyncio.run(main())
+
+
+def test_client_import_does_not_load_the_server_side():
+    code = (
+        "import sys; from Coda import Client; "
+        "assert 'aiohttp.web' not in sys.modules; "
+        "assert 'Coda._core.http_interactions' not in sys.modules"
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    subprocess.run([sys.executable, "-c", code], check=True, cwd=root)
+
+
+def test_late_response_waits_for_the_deferral(monkeypatch):
+    requests = []
+
+    async def fake_request(session, method, url, **kwargs):
+        requests.append(method)
+        return {"id": "3"}
+
+    monkeypatch.setattr(interactions, "_request", fake_request)
+
+    async def main():
+        callback = InteractionCallback()
+        callback.deferred = True
+        callback.response.cancel()
+        data = dict(_COMMAND, channel_id="5")
+        interaction = Interaction(None, data, "Bot x", callback=callback)
+        late = asyncio.create_task(interaction.respond(content="done"))
+        await asyncio.sleep(0.01)
+        # The deferred HTTP response is still being written.
+        assert requests == []
+        callback.sent.set()
+        await late
+        assert requests == ["PATCH"]
+
+    asyncio.run(main())
+
+
+def test_late_autocomplete_is_dropped(monkeypatch):
+    requests = []
+
+    async def fake_request(session, method, url, **kwargs):
+        requests.append(method)
+
+    monkeypatch.setattr(interactions, "_request", fake_request)
+
+    async def main():
+        callback = InteractionCallback()
+        callback.deferred = True
+        callback.response.cancel()
+        callback.sent.set()
+        data = dict(_COMMAND, type=4)
+        interaction = Interaction(None, data, "Bot x", callback=callback)
+        await interaction.autocomplete_response(["a", "b"])
+
+    asyncio.run(main())
+    assert requests == []
@@ -0,0 +1,33 @@
+import gc
+from Coda._core.health import SHARD_HEALTH
+from Coda._core.metrics import CACHE_SIZE, Gauge
+from test_gateway import _shard
+
+
+def test_collected_shards_leave_the_registry():
+    shard = _shard(_shard_id=90)
+    assert ("90",) in SHARD_HEALTH.collect()
+    assert CACHE_SIZE.collect()[("90", "channels")] == 0
+    del shard
+    gc.collect()
+    assert ("90",) not in SHARD_HEALTH.collect()
+    assert ("90", "guilds") not in CACHE_SIZE.collect()
+
+
+def test_stopped_shards_leave_the_registry_but_not_their_successor():
+    old = _shard(_shard_id=91)
+    new = _shard(_shard_id=91)
+    old._cancel_tasks()
+    assert ("91",) in SHARD_HEALTH.collect()
+    new._cancel_tasks()
+    assert ("91",) not in SHARD_HEALTH.collect()
+    assert ("91", "channels") not in CACHE_SIZE.collect()
+
+
+def test_gauge_remove_checks_the_function():
+    gauge = Gauge("test_gauge", "test", ("name",))
+    gauge.labels("a").set_function(lambda: 1.0)
+    gauge.remove("a", function=lambda: 2.0)
+    assert gauge.collect() == {("a",): 1.0}
+    gauge.remove("a")
+    assert gauge.collect() == {}
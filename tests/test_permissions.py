@@ -0,0 +1,70 @@
+from Coda._core.constants import Permissions as P
+from Coda._core.entities import Channel, Guild
+
+
+def _guild() -> Guild:
+    return Guild(
+        {
+            "id": "1",
+            "owner_id": "99",
+            "roles": [
+                {
+                    "id": "1",
+                    "permissions": str(P.VIEW_CHANNEL.value | P.SEND_MESSAGES.value),
+                },
+                {"id": "5", "permissions": str(P.MANAGE_MESSAGES.value)},
+                {"id": "6", "permissions": str(P.ADMINISTRATOR.value)},
+            ],
+            "members": [{"user": {"id": "7"}, "roles": ["5"]}],
+        }
+    )
+
+
+def _channel() -> Channel:
+    return Channel(
+        {
+            "id": "10",
+            "permission_overwrites": [
+                {
+                    "id": "1",
+                    "type": 0,
+                    "allow": "0",
+                    "deny": str(P.SEND_MESSAGES.value),
+                },
+                {
+                    "id": "7",
+                    "type": 1,
+                    "allow": str(P.SEND_MESSAGES.value),
+                    "deny": "0",
+                },
+            ],
+        },
+        id="10",
+        session=None,
+        auth=None,
+    )
+
+
+def test_overwrites_apply_in_order():
+    guild, channel = _guild(), _channel()
+    assert guild.has_permissions("7", channel, P.SEND_MESSAGES, P.MANAGE_MESSAGES)
+    assert not guild.has_permissions("8", channel, P.SEND_MESSAGES)
+    assert guild.has_permissions("8", None, P.SEND_MESSAGES)
+
+
+def test_owner_and_administrator_get_everything():
+    guild = _guild()
+    assert guild.permissions_for("99") == P.ALL.value
+    assert guild.permissions_for("8", _channel(), roles=["6"]) == P.ALL.value
+
+
+def test_int_and_string_ids_resolve_the_same():
+    guild, channel = _guild(), _channel()
+    assert guild.permissions_for(99) == P.ALL.value
+    assert guild.get_member(7) is guild.get_member("7")
+    assert guild.permissions_for(7, channel) == guild.permissions_for("7", channel)
+    assert guild.permissions_for(8, channel, roles=[5]) == guild.permissions_for(
+        "8", channel, roles=["5"]
+    )
+    guild.remove_role(5)
+    assert not guild.has_permissions(7, None, P.MANAGE_MESSAGES)
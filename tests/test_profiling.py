@@ -0,0 +1,43 @@
+import asyncio
+from Coda._core.profiling import HandlerProfiler
+
+
+def marker():
+    pass
+
+
+async def handler(delay: float = 0.01):
+    marker()
+    await asyncio.sleep(delay)
+    marker()
+
+
+def _marker_calls(stats) -> int:
+    return sum(value[1] for key, value in stats.stats.items() if key[2] == "marker")
+
+
+def test_sample_budget_holds_for_concurrent_invocations():
+    async def main():
+        profiler = HandlerProfiler()
+        sampled = profiler.sample("handler", calls=2)
+        runs = [profiler.wrap(handler, (), {}) for _ in range(5)]
+        await asyncio.gather(*runs)
+        return await sampled, profiler
+
+    stats, profiler = asyncio.run(main())
+    assert _marker_calls(stats) == 4
+    assert profiler.stats["handler"].calls == 5
+
+
+def test_sample_waits_for_every_sampled_invocation():
+    async def main():
+        profiler = HandlerProfiler()
+        sampled = profiler.sample("handler", calls=2)
+        first = asyncio.ensure_future(profiler.wrap(handler, (), {}))
+        second = asyncio.ensure_future(profiler.wrap(handler, (0.05,), {}))
+        await first
+        assert not sampled.done()
+        await second
+        return await sampled
+
+    assert _marker_calls(asyncio.run(main())) == 4
@@ -0,0 +1,58 @@
+import pytest
+from Coda._core.routing import CustomIdRouter
+
+
+def _handler(name):
+    def handler(interaction, **kwargs):
+        return name
+
+    handler.__name__ = name
+    return handler
+
+
+def test_exact_ids_win_over_templates():
+    router = CustomIdRouter()
+    exact, template = _handler("exact"), _handler("template")
+    router.add("vote:1:yes", exact)
+    router.add("vote:{poll_id:int}:{choice}", template)
+    assert router.match("vote:1:yes") == (exact, {})
+    assert router.match("vote:2:no") == (template, {"poll_id": 2, "choice": "no"})
+    assert len(router) == 2
+
+
+def test_placeholder_types_convert_and_reject():
+    router = CustomIdRouter()
+    handler = _handler("scale")
+    router.add("scale:{factor:float}", handler)
+    assert router.match("scale:1.5") == (handler, {"factor": 1.5})
+    assert router.match("scale:-2") == (handler, {"factor": -2.0})
+    assert router.match("scale:big") is None
+    assert "scale:big" not in router
+    with pytest.raises(ValueError):
+        router.add("x:{y:bytes}", handler)
+
+
+def test_longest_prefix_first():
+    router = CustomIdRouter()
+    short, long = _handler("short"), _handler("long")
+    router.add("ticket:{rest}", short)
+    router.add("ticket:close:{id:int}", long)
+    assert router.match("ticket:close:7") == (long, {"id": 7})
+    # The longer template does not match, so the shorter one is tried next.
+    assert router.match("ticket:close:x") == (short, {"rest": "close:x"})
+    assert router.match("other:1") is None
+
+
+def test_replace_and_remove():
+    router = CustomIdRouter()
+    first, second = _handler("first"), _handler("second")
+    router.add("page:{n:int}", first)
+    router.add("page:{n:int}", second)
+    assert router.match("page:3") == (second, {"n": 3})
+    assert len(router) == 1
+    router.remove("page:{n:int}")
+    router.remove("page:{n:int}")
+    assert router.match("page:3") is None and len(router) == 0
+    router.add("plain", first)
+    router.remove("plain")
+    assert "plain" not in router
@@ -0,0 +1,66 @@
+import asyncio
+from Coda._core.runner import RESUMABLE_CLOSE_CODE, load_sessions, shutdown
+from test_gateway import FakeSocket, _shard
+
+
+class FakeSession:
+    closed = False
+
+    def __init__(self):
+        self.urls = []
+
+    async def ws_connect(self, url, **kwargs):
+        self.urls.append(url)
+        return FakeSocket()
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeClient:
+    def __init__(self, session_file):
+        self._session_file = session_file
+        self.session = FakeSession()
+
+
+def test_shutdown_keeps_the_session_and_the_next_start_resumes(tmp_path):
+    path = str(tmp_path / "sessions.json")
+
+    async def stop():
+        shard = _shard()
+        shard.restore_session(
+            {"session_id": "abc", "seq": 42, "resume_gateway_url": "wss://resume"}
+        )
+        shard.ws = socket = FakeSocket()
+        await shutdown(FakeClient(path), [shard])
+        return socket
+
+    socket = asyncio.run(stop())
+    assert socket.close_code == RESUMABLE_CLOSE_CODE
+
+    async def start():
+        shard = _shard(session=FakeSession())
+        load_sessions(path, [shard])
+        await shard.connect(sync_app_commands=False)
+        shard._cancel_tasks()
+        return shard
+
+    shard = asyncio.run(start())
+    assert shard.session.urls[0].startswith("wss://resume/")
+    assert shard.ws.sent[0] == {
+        "op": 6,
+        "d": {"token": None, "session_id": "abc", "seq": 42},
+    }
+
+
+def test_fresh_shards_identify():
+    async def start():
+        shard = _shard(session=FakeSession())
+        shard.gateway_url = "wss://gateway"
+        load_sessions(None, [shard])
+        await shard.connect(sync_app_commands=False)
+        return shard
+
+    shard = asyncio.run(start())
+    assert shard.session_state() is None
+    assert shard.ws.sent[0]["op"] == 2
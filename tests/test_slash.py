@@ -0,0 +1,103 @@
+import asyncio
+import pytest
+from Coda._core.autocomplete import PrefixIndex
+from Coda._core.interactions import resolve_command_path
+from test_gateway import _shard
+
+_SUB_COMMAND, _SUB_COMMAND_GROUP, _STRING = 1, 2, 3
+
+
+def test_prefix_index_is_case_insensitive_and_bounded():
+    index = PrefixIndex(["banana", "Apple", ("apricot", 2), "avocado", "zebra"])
+    assert len(index) == 5
+    assert [c["name"] for c in index.search("A")] == ["Apple", "apricot", "avocado"]
+    assert index.search("apr") == [{"name": "apricot", "value": 2}]
+    assert [c["name"] for c in index.search("a", limit=2)] == ["Apple", "apricot"]
+    assert [c["name"] for c in index.search("")] == [
+        "Apple",
+        "apricot",
+        "avocado",
+        "banana",
+        "zebra",
+    ]
+    # Past both ends of the sorted keys.
+    assert index.search("aa") == []
+    assert index.search("zz") == []
+    assert index.search("zebra") == [{"name": "zebra", "value": "zebra"}]
+    assert PrefixIndex().search("a") == []
+
+
+def test_resolve_command_path():
+    leaf = [{"type": _STRING, "name": "name", "value": "mods"}]
+    data = {
+        "name": "admin",
+        "options": [
+            {
+                "type": _SUB_COMMAND_GROUP,
+                "name": "roles",
+                "options": [{"type": _SUB_COMMAND, "name": "add", "options": leaf}],
+            }
+        ],
+    }
+    assert resolve_command_path(data) == (("admin", "roles", "add"), leaf)
+    assert resolve_command_path({"name": "ping", "options": leaf}) == (
+        ("ping",),
+        leaf,
+    )
+    assert resolve_command_path({"name": "ping"}) == (("ping",), [])
+
+
+def _command(*path, options=()):
+    *groups, leaf = path[1:]
+    node = {"type": _SUB_COMMAND, "name": leaf, "options": list(options)}
+    for group in reversed(groups):
+        node = {"type": _SUB_COMMAND_GROUP, "name": group, "options": [node]}
+    data = {"name": path[0], "options": [node]}
+    return {
+        "id": "1",
+        "application_id": "2",
+        "token": "t",
+        "type": 2,
+        "channel_id": "3",
+        "data": data,
+    }
+
+
+async def _invoke(shard, data):
+    await (await shard._dispatch_interaction(data))
+
+
+def test_slash_groups_route_nested_subcommands():
+    async def main():
+        shard = _shard()
+        calls = []
+        admin = shard.slash_group("admin", "Admin tools")
+
+        @admin.command(description="Ban someone")
+        async def ban(interaction, user):
+            calls.append(("ban", user))
+
+        roles = admin.group("roles")
+
+        @roles.command()
+        async def add(interaction, name):
+            calls.append(("roles add", name))
+
+        with pytest.raises(ValueError):
+            roles.group("deeper")
+
+        option = [{"type": _STRING, "name": "name", "value": "mods"}]
+        await _invoke(shard, _command("admin", "roles", "add", options=option))
+        user = [{"type": _STRING, "name": "user", "value": "42"}]
+        await _invoke(shard, _command("admin", "ban", options=user))
+        assert await shard._dispatch_interaction(_command("admin", "kick")) is None
+        assert (
+            await shard._dispatch_interaction(_command("admin", "roles", "x")) is None
+        )
+        return calls, shard
+
+    calls, shard = asyncio.run(main())
+    assert calls == [("roles add", "mods"), ("ban", "42")]
+    tree = shard._slash_commands_tree["admin"]
+    assert [o["name"] for o in tree["options"]] == ["ban", "roles"]
+    assert tree["options"][1]["options"][0]["name"] == "add"
@@ -0,0 +1,78 @@
+from Coda._core.sync import (
+    GLOBAL_SCOPE,
+    command_payloads,
+    commands_hash,
+    load_sync_cache,
+    save_sync_cache,
+)
+
+_LOCAL = [
+    {
+        "name": "ping",
+        "description": "pong",
+        "type": 1,
+        "options": [
+            {"type": 3, "name": "text", "description": "say", "required": True},
+        ],
+    },
+    {"name": "about", "description": "info", "type": 1, "options": []},
+]
+
+
+def test_hash_ignores_order_and_api_fields():
+    remote = [
+        {
+            "id": "9",
+            "application_id": "1",
+            "version": "5",
+            "default_member_permissions": None,
+            "name": "about",
+            "description": "info",
+            "type": 1,
+        },
+        {
+            "id": "8",
+            "name": "ping",
+            "description": "pong",
+            "type": 1,
+            "options": [
+                {"required": True, "description": "say", "name": "text", "type": 3}
+            ],
+        },
+    ]
+    assert commands_hash(remote) == commands_hash(_LOCAL)
+
+
+def test_hash_changes_with_commands():
+    changed = [dict(_LOCAL[0], description="PONG"), _LOCAL[1]]
+    assert commands_hash(changed) != commands_hash(_LOCAL)
+    optional = [
+        dict(_LOCAL[0], options=[dict(_LOCAL[0]["options"][0], required=False)]),
+        _LOCAL[1],
+    ]
+    assert commands_hash(optional) != commands_hash(_LOCAL)
+
+
+def test_command_payloads_split_scopes():
+    tree = {
+        "ping": {"name": "ping", "description": "pong", "options": []},
+        "admin": {
+            "name": "admin",
+            "description": "staff",
+            "options": [],
+            "guild_ids": [1, "2"],
+        },
+    }
+    scopes = command_payloads(tree)
+    assert sorted(scopes) == ["1", "2", GLOBAL_SCOPE]
+    assert [c["name"] for c in scopes[GLOBAL_SCOPE]] == ["ping"]
+    assert [c["name"] for c in scopes["1"]] == ["admin"]
+
+
+def test_sync_cache_round_trip(tmp_path):
+    path = str(tmp_path / "sync.json")
+    assert load_sync_cache(path) == {}
+    save_sync_cache(path, {GLOBAL_SCOPE: "abc"})
+    assert load_sync_cache(path) == {GLOBAL_SCOPE: "abc"}
+    (tmp_path / "sync.json").write_text("not json")
+    assert load_sync_cache(path) == {}
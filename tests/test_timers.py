@@ -0,0 +1,100 @@
+import asyncio
+from Coda._core.timers import TimerWheel
+from Coda._core.views import View, ViewStore
+
+
+def _ticks(wheel: TimerWheel, count: int) -> None:
+    for _ in range(count):
+        wheel._advance()
+
+
+def test_wheel_fires_after_delay_and_wraps():
+    async def main():
+        fired = []
+        wheel = TimerWheel(resolution=1000, slots=4)
+        wheel.schedule("short", 2000, lambda: fired.append("short"))
+        # More ticks than slots: goes round the wheel before firing.
+        wheel.schedule("long", 9000, lambda: fired.append("long"))
+        _ticks(wheel, 1)
+        assert fired == []
+        _ticks(wheel, 1)
+        assert fired == ["short"]
+        _ticks(wheel, 6)
+        assert fired == ["short"]
+        _ticks(wheel, 1)
+        assert fired == ["short", "long"]
+        assert len(wheel) == 0
+        wheel._task.cancel()
+
+    asyncio.run(main())
+
+
+def test_wheel_reschedule_and_cancel():
+    async def main():
+        fired = []
+        wheel = TimerWheel(resolution=1000, slots=8)
+        wheel.schedule("a", 1000, lambda: fired.append("first"))
+        wheel.schedule("a", 3000, lambda: fired.append("second"))
+        wheel.schedule("b", 1000, lambda: fired.append("b"))
+        assert wheel.cancel("b") and not wheel.cancel("b")
+        _ticks(wheel, 2)
+        assert fired == [] and "a" in wheel
+        _ticks(wheel, 1)
+        assert fired == ["second"] and "a" not in wheel
+        wheel._task.cancel()
+
+    asyncio.run(main())
+
+
+def test_wheel_keeps_going_after_a_failing_callback():
+    async def main():
+        fired = []
+        wheel = TimerWheel(resolution=1000, slots=8)
+        wheel.schedule("bad", 1000, lambda: 1 / 0)
+        wheel.schedule("good", 1000, lambda: fired.append("good"))
+        _ticks(wheel, 1)
+        assert fired == ["good"]
+        wheel._task.cancel()
+
+    asyncio.run(main())
+
+
+def test_wheel_task_fires_in_real_time():
+    async def main():
+        fired = asyncio.Event()
+        wheel = TimerWheel(resolution=0.01)
+        wheel.schedule("key", 0.03, fired.set)
+        await asyncio.wait_for(fired.wait(), 1)
+        await asyncio.sleep(0.02)
+        assert wheel._task.done()
+
+    asyncio.run(main())
+
+
+def test_view_expiry_and_touch():
+    async def main():
+        store = ViewStore(TimerWheel(resolution=1000, slots=8))
+        view = View(timeout=2000)
+        timed_out = asyncio.Event()
+
+        @view.button(label="go")
+        async def go(interaction):
+            pass
+
+        @view.on_timeout
+        async def expired():
+            timed_out.set()
+
+        store.add(view)
+        custom_id = view.rows[0].components[0].custom_id
+        _ticks(store.wheel, 1)
+        # A click resets the timeout.
+        assert store.resolve(custom_id) is go
+        _ticks(store.wheel, 1)
+        assert store.resolve(custom_id) is go
+        _ticks(store.wheel, 2)
+        assert store.resolve(custom_id) is None and len(store) == 0
+        await asyncio.wait_for(timed_out.wait(), 1)
+        store.wheel._task.cancel()
+
+    asyncio.run(main())
@@ -0,0 +1,88 @@
+import asyncio
+import pytest
+from aiohttp import ClientSession
+from Coda._core.exceptions import NotFound
+from Coda._core.files import File
+from Coda._core.ws import WebhookPool
+from Coda.bench.fake_server import FakeDiscord
+
+
+def _run(scenario):
+    async def main():
+        async with FakeDiscord() as fake, ClientSession() as session:
+            await scenario(fake, session)
+
+    asyncio.run(main())
+
+
+def _url(fake: FakeDiscord, id: str) -> str:
+    return f"{fake.base_url}webhooks/{id}/token"
+
+
+def test_broadcast_reaches_every_webhook_once():
+    async def scenario(fake, session):
+        urls = [_url(fake, str(id)) for id in (11, 12, 13)]
+        pool = WebhookPool(session, urls + [urls[0]], concurrency=2)
+        assert len(pool) == 3
+        results = await pool.broadcast("hello", wait=True)
+        assert list(results) == urls
+        assert [result["content"] for result in results.values()] == ["hello"] * 3
+
+        pool.remove(urls[1])
+        pool.add(_url(fake, "14"))
+        pool.add(_url(fake, "14"))
+        results = await pool.broadcast("again")
+        assert list(results) == [urls[0], urls[2], _url(fake, "14")]
+        assert all(result is None for result in results.values())
+        assert {id: len(fake.messages[id]) for id in ("11", "12", "13", "14")} == {
+            "11": 2,
+            "12": 1,
+            "13": 2,
+            "14": 1,
+        }
+
+    _run(scenario)
+
+
+def test_missing_webhooks_are_reported_and_pruned():
+    async def scenario(fake, session):
+        good, gone = _url(fake, "21"), _url(fake, "deleted")
+        kept = WebhookPool(session, [good, gone])
+        results = await kept.broadcast("hi")
+        assert results[good] is None
+        assert isinstance(results[gone], NotFound)
+        assert kept.webhook_urls == [good, gone]
+
+        pruned = WebhookPool(session, [gone, good], prune_missing=True)
+        results = await pruned.broadcast("hi")
+        assert isinstance(results[gone], NotFound)
+        assert pruned.webhook_urls == [good]
+        assert list(await pruned.broadcast("hi")) == [good]
+        assert len(fake.messages["21"]) == 3
+
+    _run(scenario)
+
+
+def test_empty_pool_sends_nothing():
+    async def scenario(fake, session):
+        pool = WebhookPool(session)
+        assert len(pool) == 0
+        assert await pool.broadcast("nobody") == {}
+        with pytest.raises(ValueError):
+            await pool.broadcast()
+        assert fake.stats["requests"] == 0
+
+    _run(scenario)
+
+
+def test_attachments_are_streamed_to_every_webhook():
+    async def scenario(fake, session):
+        urls = [_url(fake, str(id)) for id in (31, 32)]
+        pool = WebhookPool(session, urls)
+        file = File(b"x" * 1000, filename="log.txt")
+        results = await pool.broadcast("see file", files=[file], wait=True)
+        for result in results.values():
+            assert result["attachments"][0]["filename"] == "log.txt"
+            assert result["attachments"][0]["size"] == 1000
+
+    _run(scenario)